@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Property, ContactMessage, UserProfile, FavoriteProperty  # Add VacancyHistory if defined
+from .models import Property, ContactMessage, UserProfile, FavoriteProperty, OutboundEmail, UserStats, ReportSnapshot, DistrictReport  # Add VacancyHistory if defined
 
 @admin.register(Property)
 class PropertyAdmin(admin.ModelAdmin):
@@ -9,8 +9,8 @@ class PropertyAdmin(admin.ModelAdmin):
 
 @admin.register(ContactMessage)
 class ContactMessageAdmin(admin.ModelAdmin):
-    list_display = ['tenant_name', 'tenant_email', 'property', 'created_at']  # Changed 'name' to 'tenant_name', 'email' to 'tenant_email'
-    list_filter = ['created_at']
+    list_display = ['tenant_name', 'tenant_email', 'property', 'is_read', 'created_at']  # Changed 'name' to 'tenant_name', 'email' to 'tenant_email'
+    list_filter = ['is_read', 'created_at']
     search_fields = ['tenant_name', 'tenant_email']
 
 @admin.register(UserProfile)
@@ -25,6 +25,29 @@ class FavoritePropertyAdmin(admin.ModelAdmin):
     list_filter = ['user']
     search_fields = ['user__username']
 
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['to', 'subject']
+
+@admin.register(UserStats)
+class UserStatsAdmin(admin.ModelAdmin):
+    list_display = ['user', 'total_properties', 'vacant_properties', 'favorites', 'unread_messages', 'updated_at']
+    search_fields = ['user__username']
+    readonly_fields = ['baseline', 'baseline_at', 'updated_at']
+
+class DistrictReportInline(admin.TabularInline):
+    model = DistrictReport
+    extra = 0
+    can_delete = False
+
+@admin.register(ReportSnapshot)
+class ReportSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'total_properties', 'pending_approval', 'vacancy_rate', 'total_users', 'duration_ms']
+    date_hierarchy = 'created_at'
+    inlines = [DistrictReportInline]
+
 # Comment out VacancyHistoryAdmin if model is undefined
 # @admin.register(VacancyHistory)
 # class VacancyHistoryAdmin(admin.ModelAdmin):
@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'api'
\ No newline at end of file
+    name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .metrics import install_query_recorder
+        connection_created.connect(install_query_recorder)
+        from .search import ensure_search_index
+        post_migrate.connect(ensure_search_index, sender=self)
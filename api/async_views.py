@@ -0,0 +1,241 @@
+"""
+Native async versions of the read-heavy endpoints, for ASGI deployments.
+
+Each view answers GET/HEAD itself and hands every other method (and
+requests for the browsable API) to the DRF view it mirrors. Filtering,
+pagination, cache keys, validators and serialization are the DRF view's own
+methods; only the database and cache I/O is awaited, through the async ORM,
+so a slow client costs an idle coroutine rather than a worker thread.
+
+``api.urls`` routes to these views when ASYNC_READ_VIEWS is on, which
+``backend/asgi.py`` does by default.
+"""
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.decorators import classonlymethod
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.request import Request
+
+from .auth import CachedJWTAuthentication
+from .cache import LIST_GENERATION, aget_generations, get_response_cache
+from .conditional import aproperty_detail_state, aproperty_list_state
+from .fragments import FragmentJSONRenderer
+from .metrics import record_cache
+from .models import FavoriteProperty, UserProfile
+from .serializers import wants_field
+from .stats import aget_user_stats
+from .viewcounter import view_counter
+from .views import DashboardView, FavoritePropertyView, ProfileView, PropertyDetailView, PropertyListView
+
+logger = logging.getLogger(__name__)
+
+
+def render(data, status=200, headers=None):
+    return HttpResponse(FragmentJSONRenderer().render(data), status=status, content_type='application/json', headers=headers)
+
+
+def wants_json(request):
+    # Anything else (the browsable API) is left to DRF's content negotiation.
+    return request.GET.get('format', 'json') == 'json' and 'text/html' not in request.headers.get('Accept', '')
+
+
+async def aget_profile(user):
+    if User.profile.is_cached(user):
+        return user.profile
+    profile, _created = await UserProfile.objects.aget_or_create(user=user, defaults={'is_landlord': False})
+    return profile
+
+
+async def aprime_favorite_ids(context, property_ids):
+    """``prime_favorite_ids`` for async views."""
+    user = context['request'].user
+    if user.is_authenticated and property_ids and wants_field(context, 'is_favorited'):
+        rows = FavoriteProperty.objects.filter(user=user, property_id__in=property_ids).values_list('property_id', flat=True)
+        context['favorite_ids'] = {property_id async for property_id in rows}
+    else:
+        context['favorite_ids'] = set()
+
+
+class AsyncReadView(View):
+    """
+    Serve GET/HEAD natively async on top of the DRF view in ``api_view_class``.
+
+    Subclasses implement ``get``; ``self.api_view`` is an initialized
+    instance of the DRF view. Its methods that may query (``get_queryset``
+    for search) are called through ``sync_to_async``.
+    """
+    api_view_class = None
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Unsafe methods go to the DRF view, which is csrf_exempt itself.
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or not wants_json(request):
+            return await sync_to_async(self.api_view_class.as_view())(request, *args, **kwargs)
+        self.authenticator = CachedJWTAuthentication()
+        try:
+            self.api_view = await self.initial(request, *args, **kwargs)
+            return await self.get(self.api_view.request, *args, **kwargs)
+        except Http404:
+            return self.handle_exception(request, exceptions.NotFound())
+        except exceptions.APIException as exc:
+            return self.handle_exception(request, exc)
+
+    async def initial(self, request, *args, **kwargs):
+        auth = await self.authenticator.aauthenticate(request)
+        api_request = Request(request, authenticators=[self.authenticator])
+        api_request.user, api_request.auth = auth if auth else (AnonymousUser(), None)
+        api_request.accepted_renderer = FragmentJSONRenderer()
+        api_request.accepted_media_type = FragmentJSONRenderer.media_type
+        view = self.api_view_class()
+        view.setup(request, *args, **kwargs)
+        view.request = api_request
+        view.format_kwarg = None
+        view.headers = {}
+        for permission in view.get_permissions():
+            if not permission.has_permission(api_request, view):
+                if not api_request.user.is_authenticated:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied()
+        return view
+
+    def handle_exception(self, request, exc):
+        # Same status codes and bodies as DRF's default exception handler.
+        headers = {}
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            headers['WWW-Authenticate'] = self.authenticator.authenticate_header(request)
+            exc.status_code = 401
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        return render(data, exc.status_code, headers)
+
+    async def cache_generations(self):
+        view = self.api_view
+        if not hasattr(view, '_cache_generations'):
+            view._cache_generations = await aget_generations(*view.get_cache_generation_names())
+        return view._cache_generations
+
+    async def cached_response(self, request, validator_state, build):
+        """
+        The ConditionalGetMixin and CachedAnonymousReadMixin flow: answer 304
+        from ``validator_state``, else serve the cached body or ``await build()``.
+        """
+        view = self.api_view
+        etag, last_modified = view.make_validators(request, *validator_state)
+        if etag is not None:
+            not_modified = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                return view.set_validator_headers(not_modified, etag, last_modified)
+        data, key = None, None
+        if view.is_cacheable(request):
+            response_cache = get_response_cache()
+            key = view.get_response_cache_key(request, await self.cache_generations())
+            data = await response_cache.aget(key)
+            record_cache(hit=data is not None)
+        if data is None:
+            data = await build()
+            if key is not None:
+                await response_cache.aset(key, view.detach_data(data), getattr(settings, 'PROPERTY_CACHE_TIMEOUT', 300))
+        response = render(data)
+        return view.set_validator_headers(response, etag, last_modified) if etag is not None else response
+
+
+class AsyncPropertyListView(AsyncReadView):
+    api_view_class = PropertyListView
+
+    async def get(self, request, *args, **kwargs):
+        generation = (await self.cache_generations())[LIST_GENERATION]
+        # Search reads the place vocabulary and probes for FTS while building the query.
+        queryset = await sync_to_async(self.api_view.get_queryset)()
+        state = await aproperty_list_state(queryset, request.user, generation)
+        return await self.cached_response(request, state, lambda: self.list(queryset))
+
+    async def list(self, queryset):
+        view = self.api_view
+        paginated = view.is_paginated()
+        if paginated:
+            rows = view.paginator.paginate_rows([obj async for obj in view.paginator.page_queryset(queryset, view.request)])
+        else:
+            rows = [obj async for obj in queryset]
+        context = view.get_serializer_context()
+        await aprime_favorite_ids(context, [obj.pk for obj in rows])
+        data = view.get_serializer_class()(rows, many=True, context=context).data
+        return view.paginator.get_paginated_response(data).data if paginated else data
+
+
+class AsyncPropertyDetailView(AsyncReadView):
+    api_view_class = PropertyDetailView
+
+    async def get(self, request, pk):
+        state = await aproperty_detail_state(pk, request.user)
+        response = await self.cached_response(request, state, lambda: self.retrieve(pk))
+        if response.status_code in (200, 304):
+            await view_counter.arecord(pk)
+        return response
+
+    async def retrieve(self, pk):
+        instance = await self.api_view.get_queryset().filter(pk=pk).afirst()
+        if instance is None:
+            raise Http404
+        context = self.api_view.get_serializer_context()
+        await aprime_favorite_ids(context, [instance.pk])
+        return self.api_view.get_serializer_class()(instance, context=context).data
+
+
+class AsyncFavoritePropertyView(AsyncReadView):
+    api_view_class = FavoritePropertyView
+
+    async def get(self, request):
+        favorites = self.api_view.get_queryset()
+        paginator = self.api_view.pagination_class()
+        if paginator.is_enabled(request):
+            page = paginator.paginate_rows([favorite async for favorite in paginator.page_queryset(favorites, request)])
+            return render(paginator.get_paginated_response(self.serialize(page)).data)
+        return render(self.serialize([favorite async for favorite in favorites]))
+
+    def serialize(self, favorites):
+        return self.api_view.serializer_class(favorites, many=True, context=self.api_view.get_serializer_context()).data
+
+
+class AsyncDashboardView(AsyncReadView):
+    api_view_class = DashboardView
+
+    async def get(self, request):
+        view, user = self.api_view, request.user
+        try:
+            profile = await aget_profile(user)
+            user_stats = await aget_user_stats(user)
+            messages = [msg async for msg in view.get_recent_activity(user, profile.is_landlord)]
+        except Exception as e:
+            logger.error("Dashboard error for user %s: %s", user.username, e)
+            return render({'error': 'Internal server error'}, 500)
+        return render({
+            'stats': view.get_stats(user_stats, profile.is_landlord),
+            'recentActivity': [view.activity_row(msg) for msg in messages],
+            'upcomingTasks': []
+        })
+
+
+class AsyncProfileView(AsyncReadView):
+    api_view_class = ProfileView
+
+    async def get(self, request):
+        return render(self.api_view.get_data(request.user, await aget_profile(request.user)))
+
+
+ASYNC_VIEWS = {
+    PropertyListView: AsyncPropertyListView,
+    PropertyDetailView: AsyncPropertyDetailView,
+    FavoritePropertyView: AsyncFavoritePropertyView,
+    DashboardView: AsyncDashboardView,
+    ProfileView: AsyncProfileView,
+}
@@ -1,18 +1,191 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connections
 from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .metrics import record_cache
+from .models import UserProfile
+
+
+def find_login_user(identifier):
+    """
+    Resolve a username or email, case-insensitively, with the profile joined.
+
+    One query over the LOWER() indexes (migration 0011). An exact username wins over a
+    case-insensitive one, which wins over an email match; ties go to the
+    oldest account.
+    """
+    UserModel = get_user_model()
+    folded = identifier.lower()
+    candidates = list(
+        UserModel.objects.select_related('profile')
+        .alias(username_lower=Lower('username'), email_lower=Lower('email'))
+        .filter(Q(username_lower=folded) | Q(email_lower=folded))
+        .order_by('pk')[:10]
+    )
+
+    def rank(user):
+        if user.username == identifier:
+            return 0
+        return 1 if user.username.lower() == folded else 2
+
+    return min(candidates, key=rank, default=None)
+
+
+def search_users(queryset, prefix):
+    """
+    Users whose username or email starts with ``prefix``, case-insensitively,
+    over the LOWER() indexes.
+    """
+    folded = prefix.lower()
+    queryset = queryset.alias(username_lower=Lower('username'), email_lower=Lower('email'))
+    if connections[queryset.db].vendor == 'postgresql':
+        return queryset.filter(Q(username_lower__startswith=folded) | Q(email_lower__startswith=folded))
+    # Elsewhere LIKE cannot use the expression index, but a range can.
+    upper = folded + '\U0010ffff'
+    return queryset.filter(
+        Q(username_lower__gte=folded, username_lower__lt=upper) | Q(email_lower__gte=folded, email_lower__lt=upper)
+    )
+
 
 class EmailBackend(ModelBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
         UserModel = get_user_model()
-        try:
-            user = UserModel.objects.get(Q(username=username) | Q(email=username))
-            if user.check_password(password):
-                return user
-        except UserModel.DoesNotExist:
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if not username or password is None:
+            return None
+        user = find_login_user(username)
+        if user is None:
+            # Hash once anyway so unknown and known identifiers take the same time.
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+
+def instantiate(model, field_names, values):
+    """Model.from_db for a subset of fields given in any order."""
+    given = dict(zip(field_names, values))
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in given]
+    return model.from_db(DEFAULT_DB_ALIAS, names, [given[name] for name in names])
+
+
+class UserStateCache:
+    """
+    Process-local LRU of the user fields needed to authenticate a request.
+
+    Entries expire after AUTH_USER_CACHE_TTL seconds, which bounds how long
+    another worker can serve stale flags; in this process they are dropped
+    as soon as the user or profile is saved (see api.signals).
+    """
+    USER_FIELDS = ('id', 'username', 'email', 'is_active', 'is_staff', 'is_superuser')
+    PROFILE_FIELDS = ('id', 'user_id', 'is_landlord', 'is_verified')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and entry[0] < time.monotonic():
+                del self.entries[user_id]
+                entry = None
+            if entry is not None:
+                self.entries.move_to_end(user_id)
+        record_cache(hit=entry is not None)
+        return (entry[1], entry[2]) if entry is not None else None
+
+    def set(self, user_id, user_values, profile_values):
+        ttl = getattr(settings, 'AUTH_USER_CACHE_TTL', 60)
+        if ttl <= 0:
+            return
+        with self.lock:
+            self.entries[user_id] = (time.monotonic() + ttl, user_values, profile_values)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > getattr(settings, 'AUTH_USER_CACHE_SIZE', 10000):
+                self.entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def rows(self, user_id):
+        return User.objects.filter(pk=user_id).values_list(
+            *self.USER_FIELDS, *(f'profile__{name}' for name in self.PROFILE_FIELDS)
+        )
+
+    def store(self, user_id, row):
+        if row is None:
             return None
-        except UserModel.MultipleObjectsReturned:
-            user = UserModel.objects.filter(Q(username=username) | Q(email=username)).first()
-            if user and user.check_password(password):
-                return user
-        return None
\ No newline at end of file
+        split = len(self.USER_FIELDS)
+        cached = row[:split], (row[split:] if row[split] is not None else None)
+        self.set(user_id, *cached)
+        return cached
+
+    def load(self, user_id):
+        """Return the user, with its profile attached, from the cache or one joined query."""
+        cached = self.get(user_id) or self.store(user_id, self.rows(user_id).first())
+        return self.build(*cached) if cached else None
+
+    async def aload(self, user_id):
+        cached = self.get(user_id) or self.store(user_id, await self.rows(user_id).afirst())
+        return self.build(*cached) if cached else None
+
+    def build(self, user_values, profile_values):
+        # Fresh instances per request; fields not cached stay deferred and load on access.
+        user = instantiate(User, self.USER_FIELDS, user_values)
+        if profile_values is not None:
+            user.profile = instantiate(UserProfile, self.PROFILE_FIELDS, profile_values)
+        return user
+
+
+user_state_cache = UserStateCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves the user and profile flags from user_state_cache."""
+
+    def get_user(self, validated_token):
+        return self.check_user(user_state_cache.load(self.get_user_id(validated_token)))
+
+    async def aauthenticate(self, request):
+        """``authenticate`` for async views; the user lookup uses the async ORM."""
+        header = self.get_header(request)
+        raw_token = self.get_raw_token(header) if header is not None else None
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        user = self.check_user(await user_state_cache.aload(self.get_user_id(validated_token)))
+        return user, validated_token
+
+    def get_user_id(self, validated_token):
+        try:
+            return int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+    def check_user(self, user):
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
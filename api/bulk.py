@@ -0,0 +1,220 @@
+"""
+Streaming bulk import and export.
+
+Imports read CSV or NDJSON line by line, validate each row with
+PropertyImportSerializer (the same amount rules as PropertySerializer) and
+insert valid rows with ``bulk_create`` in chunks, one transaction per chunk.
+Invalid rows are skipped and reported by line number. ``bulk_create`` sends
+no signals, so each chunk bumps the list cache generation and the
+landlords' dashboard counters itself.
+
+Exports are generators over ``QuerySet.iterator()`` for StreamingHttpResponse
+(or a file), so memory use does not grow with the number of rows.
+"""
+import codecs
+import csv
+import json
+import logging
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from rest_framework import serializers
+
+from . import stats
+from .cache import LIST_GENERATION, bump_generations
+from .models import Property
+from .serializers import PropertyImportSerializer
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+# (column, lookup) pairs. Property columns match the import fields, so an
+# export can be re-imported by staff.
+PROPERTY_EXPORT_COLUMNS = (
+    ('id', 'id'), ('landlord', 'landlord_id'), ('landlord_username', 'landlord__username'),
+    ('area', 'area'), ('district', 'district'), ('rental_amount', 'rental_amount'), ('deposit', 'deposit'),
+    ('viewing_fee', 'viewing_fee'), ('status', 'status'), ('description', 'description'),
+    ('latitude', 'latitude'), ('longitude', 'longitude'), ('is_approved', 'is_approved'),
+    ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+)
+USER_EXPORT_COLUMNS = (
+    ('id', 'id'), ('username', 'username'), ('email', 'email'), ('first_name', 'first_name'),
+    ('last_name', 'last_name'), ('is_active', 'is_active'), ('is_staff', 'is_staff'),
+    ('is_landlord', 'profile__is_landlord'), ('is_verified', 'profile__is_verified'),
+    ('date_joined', 'date_joined'), ('last_login', 'last_login'),
+)
+
+
+class BulkFormatError(ValueError):
+    pass
+
+
+def detect_format(content_type='', filename=''):
+    content_type = content_type.split(';')[0].strip().lower()
+    for fmt, mime in FORMATS.items():
+        if content_type == mime or filename.lower().endswith(f'.{fmt}'):
+            return fmt
+    if content_type in ('application/jsonl', 'application/json-seq') or filename.lower().endswith('.jsonl'):
+        return 'ndjson'
+    return None
+
+
+def read_rows(lines, fmt):
+    """
+    Yield (line number, row dict or None, error) from an iterable of byte lines.
+
+    Decoding is incremental, so the upload is never held in memory at once.
+    """
+    text = codecs.iterdecode(lines, 'utf-8-sig')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            if None in row:
+                yield reader.line_num, None, 'Too many columns'
+                continue
+            # Empty cells mean "not given", so optional fields fall back to their defaults.
+            yield reader.line_num, {key.strip(): value for key, value in row.items() if key and value not in ('', None)}, None
+    elif fmt == 'ndjson':
+        for line_num, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_num, None, f'Invalid JSON: {e}'
+                continue
+            if not isinstance(row, dict):
+                yield line_num, None, 'Expected a JSON object'
+                continue
+            yield line_num, row, None
+    else:
+        raise BulkFormatError(f'Unsupported format: {fmt}')
+
+
+class PropertyImporter:
+    """
+    Validate and insert property rows for ``user``.
+
+    Landlords import their own listings as unapproved. Staff may also set
+    ``landlord`` (a user id) and ``is_approved`` per row.
+    """
+
+    def __init__(self, user, chunk_size=None, dry_run=False):
+        self.user = user
+        self.chunk_size = chunk_size or getattr(settings, 'BULK_IMPORT_CHUNK_SIZE', 500)
+        self.max_errors = getattr(settings, 'BULK_IMPORT_MAX_ERRORS', 1000)
+        self.dry_run = dry_run
+        self.serializer = PropertyImportSerializer()
+        self.landlords = {user.pk: True}
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def report(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+            'dry_run': self.dry_run,
+        }
+
+    def add_error(self, line_num, detail):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line_num, 'errors': detail})
+
+    def landlord_exists(self, landlord_id):
+        if landlord_id not in self.landlords:
+            self.landlords[landlord_id] = User.objects.filter(pk=landlord_id).exists()
+        return self.landlords[landlord_id]
+
+    def build(self, row):
+        """Return an unsaved Property for a valid row; raises ValidationError otherwise."""
+        landlord_id = self.user.pk
+        fields = dict(row)
+        landlord = fields.pop('landlord', None)
+        if not self.user.is_staff:
+            fields.pop('is_approved', None)
+        elif landlord not in (None, ''):
+            try:
+                landlord_id = int(landlord)
+            except (TypeError, ValueError):
+                raise serializers.ValidationError({'landlord': ['Expected a user id.']})
+            if not self.landlord_exists(landlord_id):
+                raise serializers.ValidationError({'landlord': [f'User {landlord_id} does not exist.']})
+        data = self.serializer.run_validation(fields)
+        prop = Property(landlord_id=landlord_id, **data)
+        prop.sync_geohash()  # bulk_create skips Property.save
+        return prop
+
+    def run(self, rows):
+        chunk = []
+        for line_num, row, error in rows:
+            if error:
+                self.add_error(line_num, {'non_field_errors': [error]})
+                continue
+            try:
+                chunk.append(self.build(row))
+            except serializers.ValidationError as e:
+                self.add_error(line_num, e.detail)
+                continue
+            if len(chunk) >= self.chunk_size:
+                self.write(chunk)
+                chunk = []
+        if chunk:
+            self.write(chunk)
+        logger.info("Bulk import by %s: %s created, %s failed", self.user.username, self.created, self.failed)
+        return self.report()
+
+    def write(self, chunk):
+        if self.dry_run:
+            self.created += len(chunk)
+            return
+        with transaction.atomic():
+            Property.objects.bulk_create(chunk)
+            # bulk_create skips post_save: refresh what the signal handlers would have.
+            deltas = defaultdict(Counter)
+            for prop in chunk:
+                deltas[prop.landlord_id].update(stats.property_deltas(prop.status, 1))
+            for landlord_id, counters in deltas.items():
+                stats.adjust(landlord_id, **counters)
+            bump_generations(LIST_GENERATION)
+        self.created += len(chunk)
+
+
+class Echo:
+    """Write target for csv.writer that hands each line straight back."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, columns, fmt, chunk_size=2000):
+    """Yield encoded CSV or NDJSON lines for ``columns`` of ``queryset``."""
+    names = [name for name, _lookup in columns]
+    rows = queryset.order_by('pk').values_list(*(lookup for _name, lookup in columns)).iterator(chunk_size=chunk_size)
+    if fmt == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(names).encode('utf-8')
+        for row in rows:
+            yield writer.writerow(row).encode('utf-8')
+    elif fmt == 'ndjson':
+        for row in rows:
+            yield (json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n').encode('utf-8')
+    else:
+        raise BulkFormatError(f'Unsupported format: {fmt}')
+
+
+def export_properties(queryset, fmt):
+    return export_rows(queryset, PROPERTY_EXPORT_COLUMNS, fmt)
+
+
+def export_users(queryset, fmt):
+    return export_rows(queryset, USER_EXPORT_COLUMNS, fmt)
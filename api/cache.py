@@ -0,0 +1,127 @@
+"""
+Response caching for anonymous property reads.
+
+Entries are keyed on the normalized query string, language, host and the
+current generation tokens of the data they depend on. Writes replace the
+tokens (see ``api.signals``), which orphans stale entries in every worker at
+once; the cache backend itself is whatever ``CACHES`` configures.
+"""
+import hashlib
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, router, transaction
+from django.utils import timezone, translation
+from rest_framework.response import Response
+
+from .metrics import record_cache
+from .models import CacheGeneration
+
+LIST_GENERATION = 'property-list'
+
+
+def property_generation(pk):
+    return f'property:{pk}'
+
+
+def get_generations(*names):
+    """Return {name: CacheGeneration} for ``names``, creating missing rows."""
+    generations = CacheGeneration.objects.in_bulk(names)
+    for name in names:
+        if name not in generations:
+            try:
+                with transaction.atomic():
+                    generations[name] = CacheGeneration.objects.create(name=name, token=uuid.uuid4().hex)
+            except IntegrityError:
+                # Created concurrently; read it back where it was written, not from a replica.
+                generations[name] = CacheGeneration.objects.using(router.db_for_write(CacheGeneration)).get(name=name)
+    return generations
+
+
+async def aget_generations(*names):
+    generations = await CacheGeneration.objects.ain_bulk(names)
+    missing = [name for name in names if name not in generations]
+    if missing:
+        # Rare: only the first read after a new property or a fresh cache table.
+        generations.update(await sync_to_async(get_generations)(*missing))
+    return generations
+
+
+def bump_generations(*names):
+    for name in names:
+        token = uuid.uuid4().hex
+        # update() skips auto_now; changed_at is the Last-Modified for deletions.
+        if not CacheGeneration.objects.filter(name=name).update(token=token, changed_at=timezone.now()):
+            get_generations(name)
+
+
+def get_response_cache():
+    return caches[getattr(settings, 'PROPERTY_CACHE_ALIAS', 'default')]
+
+
+def normalized_query(request):
+    params = []
+    for key in sorted(request.query_params):
+        values = [value.strip() for value in request.query_params.getlist(key) if value.strip()]
+        if values:
+            params.append((key, sorted(values)))
+    return params
+
+
+class CachedAnonymousReadMixin:
+    """
+    Serve anonymous GET requests from the response cache.
+
+    Authenticated requests bypass the cache by default (see ``is_cacheable``),
+    so per-user fields such as ``is_favorited`` are never shared between users.
+    """
+    cache_scope = None
+
+    def get_cache_generation_names(self):
+        raise NotImplementedError
+
+    def get_response_cache_key(self, request, generations):
+        parts = [
+            self.cache_scope,
+            request.build_absolute_uri(request.path),
+            translation.get_language() or '',
+            request.accepted_renderer.format,
+            repr(normalized_query(request)),
+            *(generations[name].token for name in sorted(generations)),
+        ]
+        digest = hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+        return f'response:{self.cache_scope}:{digest}'
+
+    def get_cache_generations(self):
+        if not hasattr(self, '_cache_generations'):
+            self._cache_generations = get_generations(*self.get_cache_generation_names())
+        return self._cache_generations
+
+    def is_cacheable(self, request):
+        return not request.user.is_authenticated
+
+    def get(self, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return super().get(request, *args, **kwargs)
+        response_cache = get_response_cache()
+        key = self.get_response_cache_key(request, self.get_cache_generations())
+        data = response_cache.get(key)
+        record_cache(hit=data is not None)
+        if data is not None:
+            return Response(data)
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            response_cache.set(key, self.detach_data(response.data), getattr(settings, 'PROPERTY_CACHE_TIMEOUT', 300))
+        return response
+
+    @staticmethod
+    def detach_data(data):
+        # ReturnList/ReturnDict keep a reference to the serializer; store plain containers.
+        if isinstance(data, dict):
+            data = dict(data)
+            if isinstance(data.get('results'), list):
+                data['results'] = list(data['results'])
+            return data
+        return list(data)
@@ -0,0 +1,124 @@
+"""
+Conditional GET (ETag / Last-Modified) for property reads.
+
+Validators come from a single aggregate query, so a client holding a current
+copy gets a 304 before anything is fetched in full or serialized.
+"""
+import hashlib
+
+from django.db.models import Count, Exists, Max, OuterRef, Sum
+from django.utils import translation
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .cache import normalized_query
+from .models import FavoriteProperty, Property
+
+VARY_HEADERS = ('Accept', 'Accept-Language', 'Authorization')
+FAVORITES_STATE = {'count': Count('id'), 'last': Max('id'), 'properties': Sum('property_id')}
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+
+class ConditionalGetMixin:
+    """
+    Answer If-None-Match / If-Modified-Since with 304 Not Modified.
+
+    Subclasses implement ``get_validator_state`` returning a tuple of values
+    that changes whenever the representation does, plus the newest
+    modification time (or None when the resource does not exist).
+    """
+
+    def get_validator_state(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    def get_validators(self, request, *args, **kwargs):
+        return self.make_validators(request, *self.get_validator_state(request, *args, **kwargs))
+
+    def make_validators(self, request, state, last_modified):
+        if last_modified is None and state is None:
+            return None, None
+        etag = make_etag(
+            request.build_absolute_uri(request.path),
+            repr(normalized_query(request)),
+            request.accepted_renderer.format,
+            translation.get_language() or '',
+            request.user.pk if request.user.is_authenticated else '',
+            *state,
+        )
+        return etag, int(last_modified.timestamp()) if last_modified else None
+
+    def set_validator_headers(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, VARY_HEADERS)
+        return response
+
+    def get(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request, *args, **kwargs)
+        if etag is None:
+            return super().get(request, *args, **kwargs)
+        conditional = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if conditional is not None:
+            return self.set_validator_headers(conditional, etag, last_modified)
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            self.set_validator_headers(response, etag, last_modified)
+        return response
+
+
+def favorites_state(user):
+    """A cheap fingerprint of the user's favorite set (empty for anonymous)."""
+    if not user.is_authenticated:
+        return ()
+    state = FavoriteProperty.objects.filter(user=user).aggregate(**FAVORITES_STATE)
+    return state['count'], state['last'], state['properties']
+
+
+async def afavorites_state(user):
+    if not user.is_authenticated:
+        return ()
+    state = await FavoriteProperty.objects.filter(user=user).aaggregate(**FAVORITES_STATE)
+    return state['count'], state['last'], state['properties']
+
+
+def list_state(state, user_state, generation):
+    # Deletions don't move max(updated_at); the list generation records them.
+    last_modified = max(filter(None, [state['last_modified'], generation.changed_at]))
+    return (state['count'], state['last_modified'], *user_state), last_modified
+
+
+def property_list_state(queryset, user, generation):
+    state = queryset.aggregate(count=Count('id'), last_modified=Max('updated_at'))
+    return list_state(state, favorites_state(user), generation)
+
+
+async def aproperty_list_state(queryset, user, generation):
+    state = await queryset.aaggregate(count=Count('id'), last_modified=Max('updated_at'))
+    return list_state(state, await afavorites_state(user), generation)
+
+
+def property_detail_rows(pk, user):
+    rows = Property.objects.filter(pk=pk)
+    if user.is_authenticated:
+        rows = rows.annotate(favorited=Exists(FavoriteProperty.objects.filter(user=user, property=OuterRef('pk'))))
+        return rows.values_list('updated_at', 'favorited')
+    return rows.values_list('updated_at')
+
+
+def detail_state(row):
+    if row is None:
+        return None, None
+    return row, row[0]
+
+
+def property_detail_state(pk, user):
+    return detail_state(property_detail_rows(pk, user).first())
+
+
+async def aproperty_detail_state(pk, user):
+    return detail_state(await property_detail_rows(pk, user).afirst())
@@ -0,0 +1,43 @@
+"""
+Facet counts for the search UI.
+
+Each facet is one grouped aggregate over the filtered listings; a facet
+ignores its own filter so the UI can show the alternatives (e.g. every
+status with its count while one status is selected).
+"""
+from django.db.models import Count, F, IntegerField, Value
+from django.db.models.functions import Cast, Floor
+
+DEFAULT_BUCKET_SIZE = 1000
+MIN_BUCKET_SIZE = 50
+MAX_BUCKETS = 100
+
+
+def value_counts(queryset, field):
+    rows = queryset.order_by().values(field).annotate(count=Count('id')).order_by('-count', field)
+    return [{'value': row[field], 'count': row['count']} for row in rows]
+
+
+def rent_histogram(queryset, bucket_size=DEFAULT_BUCKET_SIZE):
+    """
+    Listing counts per ``bucket_size`` band of rental_amount, from one grouped query.
+
+    Empty bands between the cheapest and dearest listing are filled in with
+    zero counts unless that would exceed MAX_BUCKETS.
+    """
+    bucket = Cast(Floor(F('rental_amount') / Value(bucket_size)), IntegerField())
+    counts = dict(
+        queryset.annotate(bucket=bucket).order_by().values('bucket')
+        .annotate(count=Count('id')).order_by('bucket').values_list('bucket', 'count')
+    )
+    if counts and max(counts) - min(counts) < MAX_BUCKETS:
+        indexes = range(min(counts), max(counts) + 1)
+    else:
+        indexes = sorted(counts)
+    return {
+        'bucket_size': bucket_size,
+        'buckets': [
+            {'min': index * bucket_size, 'max': (index + 1) * bucket_size, 'count': counts.get(index, 0)}
+            for index in indexes
+        ],
+    }
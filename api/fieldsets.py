@@ -0,0 +1,124 @@
+"""
+Sparse fieldsets (``?fields=``) and opt-in expansion (``?expand=``) for
+property representations.
+
+``?fields=id,area,district,rental_amount`` renders only those fields of each
+property, wherever properties appear: the property list and detail, the
+``property_detail`` of favorites and the report's ``most_viewed``. ``id`` is
+always included. ``?expand=landlord`` renders the landlord as
+``{"id", "username"}`` instead of a primary key.
+
+The fieldset also trims the SQL: ``trim_properties`` loads only the columns
+the requested fields read, joins the landlord only for ``landlord_username``
+or an expanded landlord, and prefetches images only for ``images``. Per-row
+lookups such as ``is_favorited`` are skipped unless requested.
+
+Without either parameter the full representation is served, as before.
+Fieldsets only apply to reads; writes always validate and return every field.
+"""
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+# Columns each PropertySerializer field reads, relative to the property.
+PROPERTY_COLUMNS = {
+    'id': ('id',),
+    'landlord': ('landlord',),
+    'landlord_username': ('landlord', 'landlord__id', 'landlord__username'),
+    'area': ('area',),
+    'district': ('district',),
+    'rental_amount': ('rental_amount',),
+    'deposit': ('deposit',),
+    'viewing_fee': ('viewing_fee',),
+    'status': ('status',),
+    'description': ('description',),
+    'latitude': ('latitude',),
+    'longitude': ('longitude',),
+    'distance_km': (),  # Annotated by api.geo.near
+    'is_favorited': (),
+    'image_url': ('image',),
+    'image_srcset': ('image_variants',),
+    'image_placeholder': ('image_placeholder',),
+    'images': (),  # Prefetched
+    'is_approved': ('is_approved',),
+}
+EXPANDABLE = {
+    'landlord': ('landlord', 'landlord__id', 'landlord__username'),
+}
+
+
+class Fieldset:
+    """The property fields a request asked for; ``fields`` is None for all of them."""
+
+    def __init__(self, fields=None, expand=()):
+        self.fields = None if fields is None else frozenset(fields) | {'id'} | frozenset(expand)
+        self.expand = frozenset(expand)
+
+    def __bool__(self):
+        return self.fields is not None or bool(self.expand)
+
+    def wants(self, name):
+        return self.fields is None or name in self.fields
+
+    def joins_landlord(self):
+        return self.wants('landlord_username') or 'landlord' in self.expand
+
+    def columns(self):
+        columns = {'updated_at', 'images_version'}  # The fragment cache key, see api.fragments
+        for name in self.fields:
+            columns.update(PROPERTY_COLUMNS[name])
+        for name in self.expand:
+            columns.update(EXPANDABLE[name])
+        return columns
+
+
+FULL = Fieldset()
+
+
+def split_param(request, name):
+    return [value.strip() for param in request.query_params.getlist(name) for value in param.split(',') if value.strip()]
+
+
+def parse_fieldset(request):
+    """Read ``?fields=`` and ``?expand=``, raising ValidationError for unknown names."""
+    if request.method not in SAFE_METHODS:
+        return FULL
+    fields, expand = split_param(request, 'fields'), split_param(request, 'expand')
+    errors = {}
+    unknown = sorted(set(fields) - set(PROPERTY_COLUMNS))
+    if unknown:
+        errors['fields'] = [f"Unknown field(s): {', '.join(unknown)}. Choose from: {', '.join(PROPERTY_COLUMNS)}."]
+    unknown = sorted(set(expand) - set(EXPANDABLE))
+    if unknown:
+        errors['expand'] = [f"Cannot expand: {', '.join(unknown)}. Choose from: {', '.join(EXPANDABLE)}."]
+    if errors:
+        raise serializers.ValidationError(errors)
+    return Fieldset(fields or None, expand)
+
+
+def trim_properties(queryset, fieldset, prefix='', keep=()):
+    """
+    Load only what ``fieldset`` renders. ``prefix`` is the path to the
+    property (``'property__'`` for favorites); ``keep`` names further columns
+    the caller needs, such as the pagination key.
+    """
+    if fieldset.joins_landlord():
+        queryset = queryset.select_related(prefix + 'landlord')
+    elif prefix:
+        queryset = queryset.select_related(prefix.rstrip('_'))
+    if fieldset.wants('images'):
+        queryset = queryset.prefetch_related(prefix + 'images')
+    if fieldset.fields is not None:
+        queryset = queryset.only(*keep, *(prefix + column for column in sorted(fieldset.columns())))
+    return queryset
+
+
+class FieldsetMixin:
+    """Parse the request's fieldset once per view and pass it to the serializer."""
+
+    def get_fieldset(self):
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = parse_fieldset(self.request)
+        return self._fieldset
+
+    def get_serializer_context(self):
+        return {'request': self.request, 'fieldset': self.get_fieldset()}
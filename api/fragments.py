@@ -0,0 +1,184 @@
+"""
+Pre-rendered JSON fragments for property representations.
+
+Most of the CPU time of a property list goes into PropertySerializer:
+formatting decimals, building absolute image URLs and serializing the
+nested images, for rows that rarely change between requests. Each
+property's representation is therefore kept as encoded JSON bytes in a
+per-process LRU cache bounded by PROPERTY_FRAGMENT_CACHE_BYTES (0 turns it
+off), keyed on the row's id, ``updated_at`` and ``images_version``, the
+rendered field set and the URL prefix.
+
+PropertySerializer returns a Fragment: the cached bytes plus an overlay of
+the per-request fields (``is_favorited``, ``distance_km``), which are
+computed on every request and never cached. FragmentJSONRenderer writes the
+bytes into the response as they are, so a list page is mostly stitched
+together from cached fragments. A Fragment still reads like a dict, decoding
+itself on first access, for code that inspects ``response.data``.
+"""
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from django.conf import settings
+from rest_framework.compat import INDENT_SEPARATORS, LONG_SEPARATORS, SHORT_SEPARATORS
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+# Fields that depend on the request rather than the row.
+PER_REQUEST_FIELDS = ('is_favorited', 'distance_km')
+
+# Stands in for a fragment while the rest of the response is encoded. The
+# random part keeps user data from ever matching it.
+MARK = f'\x00fragment-{uuid.uuid4().hex}\x00'
+ENCODED_MARK = json.dumps(MARK)
+
+# An entry's bookkeeping (key tuple, OrderedDict node) on top of its bytes.
+ENTRY_OVERHEAD = 200
+
+
+def dumps(data):
+    # Byte for byte what JSONRenderer produces for compact output.
+    text = json.dumps(data, cls=encoders.JSONEncoder, ensure_ascii=not api_settings.UNICODE_JSON, separators=SHORT_SEPARATORS)
+    return text.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode('utf-8')
+
+
+class FragmentCache:
+    """A thread-safe LRU of encoded fragments, bounded by total size."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = self.misses = self.evictions = 0
+        self.lock = threading.Lock()
+
+    @property
+    def max_bytes(self):
+        return getattr(settings, 'PROPERTY_FRAGMENT_CACHE_BYTES', 32 * 1024 * 1024)
+
+    def get(self, key):
+        with self.lock:
+            raw = self.entries.get(key)
+            if raw is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return raw
+
+    def set(self, key, raw):
+        cost = len(raw) + ENTRY_OVERHEAD
+        max_bytes = self.max_bytes
+        if cost > max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous) + ENTRY_OVERHEAD
+            self.entries[key] = raw
+            self.size += cost
+            while self.size > max_bytes:
+                _key, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted) + ENTRY_OVERHEAD
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries), 'bytes': self.size, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+            }
+
+
+fragment_cache = FragmentCache()
+
+
+class Fragment(Mapping):
+    """An encoded JSON object plus per-request fields to add when it is rendered."""
+
+    def __init__(self, raw, overlay=None):
+        self.raw = raw
+        self.overlay = overlay or {}
+        self._data = None
+
+    def encode(self):
+        if not self.overlay:
+            return self.raw
+        overlay = dumps(self.overlay)
+        if self.raw == b'{}':
+            return overlay
+        return self.raw[:-1] + b',' + overlay[1:]
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = {**json.loads(self.raw), **self.overlay}
+        return self._data
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        # Extra fields, like the report's view counts, go on the overlay.
+        self.overlay[key] = value
+        self._data = None
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return f'Fragment({self.data!r})'
+
+    def __getstate__(self):
+        return {'raw': self.raw, 'overlay': self.overlay, '_data': None}
+
+
+class FragmentEncoder(encoders.JSONEncoder):
+    def __init__(self, *args, fragments, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fragments = fragments
+
+    def default(self, obj):
+        if isinstance(obj, Fragment):
+            self.fragments.append(obj.encode())
+            return MARK
+        return super().default(obj)
+
+
+class FragmentJSONRenderer(JSONRenderer):
+    """JSONRenderer that copies Fragments into the output instead of re-encoding them."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # JSONRenderer.render, with FragmentEncoder collecting the fragments.
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is None:
+            separators = SHORT_SEPARATORS if self.compact else LONG_SEPARATORS
+        else:
+            separators = INDENT_SEPARATORS
+        fragments = []
+        text = json.dumps(
+            data, cls=FragmentEncoder, fragments=fragments, indent=indent,
+            ensure_ascii=self.ensure_ascii, allow_nan=not self.strict, separators=separators,
+        )
+        text = text.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+        if not fragments:
+            return text.encode('utf-8')
+        parts = text.split(ENCODED_MARK)
+        output = [parts[0].encode('utf-8')]
+        for fragment, part in zip(fragments, parts[1:]):
+            output += [fragment, part.encode('utf-8')]
+        return b''.join(output)
@@ -0,0 +1,129 @@
+"""
+Geospatial helpers that need no PostGIS or SpatiaLite.
+
+Listings store latitude/longitude plus a geohash. Bounding-box and radius
+queries are range scans on the (latitude, longitude) B-tree index; distance
+uses an equirectangular approximation, which is plain arithmetic in SQL and
+accurate to well under 1% at city scale. Map clusters group rows by a
+geohash prefix whose length follows the map zoom level.
+"""
+import math
+
+from django.db.models import Avg, Count, F, FloatField, Max, Min
+from django.db.models.functions import Sqrt, Substr
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9  # ~5 m cells
+KM_PER_DEGREE = 111.195
+MAX_RADIUS_KM = 100
+# Approximate geohash length giving a handful of clusters per map tile at each zoom level.
+ZOOM_PRECISION = (1, 1, 1, 2, 2, 3, 3, 3, 4, 4, 5, 5, 5, 6, 6, 7, 7, 7, 8, 8, 9)
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def parse_floats(value, count):
+    """Parse "a,b[,...]" into ``count`` floats; raises ValueError."""
+    parts = [float(part) for part in value.split(',')]
+    if len(parts) != count or not all(math.isfinite(part) for part in parts):
+        raise ValueError(f'expected {count} comma-separated numbers')
+    return parts
+
+
+def parse_bbox(value):
+    """"min_lat,min_lng,max_lat,max_lng" -> tuple; raises ValueError."""
+    min_lat, min_lng, max_lat, max_lng = parse_floats(value, 4)
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lng <= max_lng <= 180):
+        raise ValueError('bbox must be min_lat,min_lng,max_lat,max_lng')
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def parse_point(value):
+    latitude, longitude = parse_floats(value, 2)
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('near must be lat,lng')
+    return latitude, longitude
+
+
+def within_bbox(queryset, bbox):
+    min_lat, min_lng, max_lat, max_lng = bbox
+    return queryset.filter(
+        latitude__gte=min_lat, latitude__lte=max_lat,
+        longitude__gte=min_lng, longitude__lte=max_lng,
+    )
+
+
+def radius_bbox(latitude, longitude, radius_km):
+    lat_delta = radius_km / KM_PER_DEGREE
+    lng_delta = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    return (
+        max(-90.0, latitude - lat_delta), max(-180.0, longitude - lng_delta),
+        min(90.0, latitude + lat_delta), min(180.0, longitude + lng_delta),
+    )
+
+
+def near(queryset, latitude, longitude, radius_km):
+    """Listings within ``radius_km``, annotated with ``distance_km`` and ordered nearest first."""
+    radius_km = min(radius_km, MAX_RADIUS_KM)
+    scale = math.cos(math.radians(latitude))
+    distance = KM_PER_DEGREE * Sqrt(
+        (F('latitude') - latitude) * (F('latitude') - latitude)
+        + (F('longitude') - longitude) * scale * (F('longitude') - longitude) * scale,
+        output_field=FloatField(),
+    )
+    # The box prefilter is an index range; the distance test trims its corners.
+    return (
+        within_bbox(queryset, radius_bbox(latitude, longitude, radius_km))
+        .annotate(distance_km=distance)
+        .filter(distance_km__lte=radius_km)
+        .order_by('distance_km', 'id')
+    )
+
+
+def precision_for_zoom(zoom):
+    return ZOOM_PRECISION[max(0, min(int(zoom), len(ZOOM_PRECISION) - 1))]
+
+
+def clusters(queryset, precision):
+    """Aggregate listings into geohash cells of ``precision`` characters."""
+    rows = (
+        queryset.exclude(geohash='')
+        .annotate(cell=Substr('geohash', 1, precision))
+        .order_by().values('cell')
+        .annotate(
+            count=Count('id'), latitude=Avg('latitude'), longitude=Avg('longitude'),
+            min_rent=Min('rental_amount'), max_rent=Max('rental_amount'), first_id=Min('id'),
+        )
+        .order_by('cell')
+    )
+    return [
+        {
+            'geohash': row['cell'],
+            'count': row['count'],
+            'latitude': round(row['latitude'], 6),
+            'longitude': round(row['longitude'], 6),
+            'min_rent': row['min_rent'],
+            'max_rent': row['max_rent'],
+            # Single listings can be linked directly.
+            'property_id': row['first_id'] if row['count'] == 1 else None,
+        }
+        for row in rows
+    ]
@@ -0,0 +1,151 @@
+"""
+Derived image variants for property photos.
+
+Every uploaded image is resized into fixed thumb/card/full variants in WebP
+and JPEG, with EXIF stripped, plus a tiny inline placeholder (LQIP). Variant
+names carry a content hash so they can be served as immutable. Processing
+runs on a small thread pool after the upload's transaction commits.
+"""
+import base64
+import hashlib
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps, features
+
+from .models import Property, PropertyImage
+
+logger = logging.getLogger(__name__)
+
+VARIANT_SIZES = (
+    ('thumb', 320),
+    ('card', 640),
+    ('full', 1600),
+)
+FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+PLACEHOLDER_WIDTH = 16
+VARIANT_DIR = 'property_images/variants'
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2),
+            thread_name_prefix='image-variants',
+        )
+    return _executor
+
+
+def load_image(data):
+    image = Image.open(io.BytesIO(data))
+    # Apply the EXIF orientation before the metadata is dropped.
+    image = ImageOps.exif_transpose(image)
+    if image.mode != 'RGB':
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.split()[-1])
+        image = background
+    return image
+
+
+def encode(image, pil_format, options):
+    buffer = io.BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def make_placeholder(image):
+    height = max(1, round(image.height * PLACEHOLDER_WIDTH / image.width))
+    tiny = image.resize((PLACEHOLDER_WIDTH, height), Image.BILINEAR)
+    data = encode(tiny, 'JPEG', {'quality': 40})
+    return 'data:image/jpeg;base64,' + base64.b64encode(data).decode('ascii')
+
+
+def build_variants(field_file):
+    """Return (variants, placeholder) for an ImageField file."""
+    field_file.open('rb')
+    try:
+        data = field_file.read()
+    finally:
+        field_file.close()
+    digest = hashlib.sha1(data).hexdigest()[:12]
+    stem = os.path.splitext(os.path.basename(field_file.name))[0]
+    source = load_image(data)
+
+    variants = {'source': field_file.name}
+    for size, max_width in VARIANT_SIZES:
+        image = source.copy()
+        image.thumbnail((max_width, max_width), Image.LANCZOS)
+        variant = {'width': image.width, 'height': image.height}
+        for ext, pil_format, options in FORMATS:
+            if pil_format == 'WEBP' and not features.check('webp'):
+                continue
+            name = f'{VARIANT_DIR}/{stem}-{size}.{digest}.{ext}'
+            if not default_storage.exists(name):
+                name = default_storage.save(name, ContentFile(encode(image, pil_format, options)))
+            variant[ext] = name
+        variants[size] = variant
+    return variants, make_placeholder(source)
+
+
+def variants_stale(field_file, variants):
+    """True when ``variants`` were not generated from the current file."""
+    if not field_file:
+        return bool(variants)
+    return variants.get('source') != field_file.name
+
+
+def process_property_image(pk):
+    image = PropertyImage.objects.filter(pk=pk).first()
+    if image is None or not image.image or not variants_stale(image.image, image.variants):
+        return
+    image.variants, image.placeholder = build_variants(image.image)
+    image.save(update_fields=['variants', 'placeholder'])
+    logger.info("Generated variants for property image %s", pk)
+
+
+def process_property(pk):
+    prop = Property.objects.filter(pk=pk).first()
+    if prop is None or not variants_stale(prop.image, prop.image_variants):
+        return
+    if prop.image:
+        variants, placeholder = build_variants(prop.image)
+    else:
+        variants, placeholder = {}, ''
+    prop.image_variants, prop.image_placeholder = variants, placeholder
+    prop.save(update_fields=['image_variants', 'image_placeholder', 'updated_at'])
+    logger.info("Generated variants for property %s", pk)
+
+
+def _process(func, pk):
+    try:
+        func(pk)
+    except Exception as e:
+        logger.error("Image variant generation failed for %s(%s): %s", func.__name__, pk, e)
+
+
+def _process_in_worker(func, pk):
+    try:
+        _process(func, pk)
+    finally:
+        connections.close_all()
+
+
+def schedule(func, pk):
+    """Process after the current transaction commits, off the request thread."""
+    if not getattr(settings, 'IMAGE_VARIANTS_ASYNC', True):
+        _process(func, pk)
+        return
+    transaction.on_commit(lambda: get_executor().submit(_process_in_worker, func, pk))
@@ -0,0 +1,240 @@
+"""
+Non-blocking, structured logging.
+
+BackgroundHandler is a QueueHandler: the request thread only checks the
+level and filters and puts the LogRecord on a bounded in-memory queue. A
+QueueListener thread per process then does the expensive parts: %-formatting
+the message, rendering a JSON line, and writing it to a size- and
+time-rotated file (and to the console). Passing arguments instead of
+f-strings (``logger.info("Image %s deleted by %s", pk, username)``) keeps
+the formatting off the request path, and skips it entirely for disabled
+levels.
+
+When the queue is full, records are dropped rather than blocking the request.
+The listener then logs how many records were lost.
+
+High-volume info events pass ``extra=SAMPLED``. SampleFilter keeps only
+LOG_SAMPLE_RATE of them and stores the rate in the record, so counts can be
+scaled back up.
+"""
+import glob
+import json
+import logging
+import logging.handlers
+import math
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+
+SAMPLED = {'sampled': True}
+
+# Attributes every LogRecord has; anything else came from ``extra``.
+RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+CONSOLE_FORMAT = '{levelname} [{asctime}] {module} {message}'
+
+
+class SampleFilter(logging.Filter):
+    """Keep ``rate`` of the INFO-and-below records logged with ``extra=SAMPLED``."""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = float(rate)
+
+    def filter(self, record):
+        if not getattr(record, 'sampled', False) or record.levelno > logging.INFO:
+            return True
+        if random.random() >= self.rate:
+            return False
+        record.sample_rate = self.rate
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, with any ``extra`` fields alongside the message."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRS and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class SizeTimeRotatingFileHandler(logging.handlers.BaseRotatingHandler):
+    """
+    Rotate when the file reaches ``max_bytes`` or at each multiple of
+    ``interval`` seconds, keeping ``backup_count`` files named
+    ``<filename>.<UTC timestamp>``.
+
+    Every worker process writes to the same file. A process that finds the
+    file was rotated by another one reopens the new file instead of rotating
+    it again.
+    """
+
+    def __init__(self, filename, max_bytes=0, interval=0, backup_count=0, encoding='utf-8'):
+        super().__init__(filename, 'a', encoding=encoding, delay=True)
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.backup_count = backup_count
+        self.inode = None
+        self.rollover_at = self.next_rollover()
+
+    def next_rollover(self):
+        if not self.interval:
+            return math.inf
+        return (time.time() // self.interval + 1) * self.interval
+
+    def _open(self):
+        stream = super()._open()
+        self.inode = os.fstat(stream.fileno()).st_ino
+        return stream
+
+    def shouldRollover(self, record):
+        try:
+            stat = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            stat = None
+        if self.stream is not None and (stat is None or stat.st_ino != self.inode):
+            # Rotated by another process; emit() reopens the path.
+            self.stream.close()
+            self.stream = None
+            self.rollover_at = self.next_rollover()
+            return False
+        if stat is None or not stat.st_size:
+            return False
+        if time.time() >= self.rollover_at:
+            return True
+        return 0 < self.max_bytes <= stat.st_size
+
+    def doRollover(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.gmtime())
+        target, n = f'{self.baseFilename}.{stamp}', 0
+        while os.path.exists(target):
+            n += 1
+            target = f'{self.baseFilename}.{stamp}.{n}'
+        if os.path.exists(self.baseFilename):
+            self.rotate(self.baseFilename, self.rotation_filename(target))
+        if self.backup_count > 0:
+            for old in sorted(glob.glob(glob.escape(self.baseFilename) + '.*'))[:-self.backup_count]:
+                try:
+                    os.remove(old)
+                except FileNotFoundError:
+                    pass
+        self.rollover_at = self.next_rollover()
+
+
+class Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room rather than fail: the queue may be full, and the thread is draining it.
+        self.queue.put(self._sentinel)
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+
+class BackgroundHandler(logging.handlers.QueueHandler):
+    """
+    Enqueue records for a listener thread that writes them as JSON lines to
+    ``filename`` and, with ``console``, as text to stderr.
+    """
+
+    def __init__(self, filename, max_bytes=0, interval=0, backup_count=0, console=True, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.queue_size = queue_size
+        self.dropped = 0
+        self.dropped_lock = threading.Lock()
+        file_handler = SizeTimeRotatingFileHandler(filename, max_bytes, interval, backup_count)
+        file_handler.setFormatter(JSONFormatter())
+        self.targets = [file_handler]
+        if console:
+            console_handler = logging.StreamHandler(sys.stderr)
+            console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT, style='{'))
+            self.targets.append(console_handler)
+        self.listener = None
+        self.start()
+        running.add(self)
+
+    def start(self):
+        self.listener = Listener(self.queue, *self.targets, respect_handler_level=True)
+        self.listener.start()
+
+    def restart(self):
+        # The listener thread does not survive fork(); the queue's lock may not either.
+        self.queue = queue.Queue(self.queue_size)
+        self.dropped_lock = threading.Lock()
+        self.start()
+
+    def prepare(self, record):
+        # Same process, so the record is handed over as is; the listener formats it.
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self.dropped_lock:
+                self.dropped += 1
+            return
+        if self.dropped:
+            with self.dropped_lock:
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                notice = logging.makeLogRecord({
+                    'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': 'Logging queue full, %d records dropped', 'args': (dropped,),
+                })
+                try:
+                    self.queue.put_nowait(notice)
+                except queue.Full:
+                    with self.dropped_lock:
+                        self.dropped += dropped
+
+    def flush(self):
+        # Drain the queue so everything logged so far reaches the targets.
+        if self.listener is not None and self.listener.running:
+            self.listener.stop()
+            self.start()
+
+    def close(self):
+        running.discard(self)
+        if self.listener is not None and self.listener.running:
+            self.listener.stop()
+        for target in self.targets:
+            target.close()
+        super().close()
+
+
+running = weakref.WeakSet()
+
+
+def restart_listeners():
+    for handler in list(running):
+        handler.restart()
+
+
+os.register_at_fork(after_in_child=restart_listeners)
@@ -0,0 +1,403 @@
+import io
+import json
+import math
+import platform
+import random
+import re
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+import uuid
+from contextlib import ExitStack
+from datetime import datetime, timezone
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Count
+from django.test.utils import override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.models import ContactMessage, FavoriteProperty, Property, PropertyImage, UserProfile
+from api.urls import urlpatterns
+from api.viewcounter import view_counter
+
+RESULTS_VERSION = 1
+UNSAFE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+MIN_REQUESTS = 3
+SERIALIZE_TIMING = re.compile(r'serialize;dur=([\d.]+)')
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of an ascending list."""
+    if not values:
+        return None
+    return values[max(0, min(len(values) - 1, round(q / 100 * len(values)) - 1))]
+
+
+class Scenario:
+    """
+    One request shape against one route. ``path`` and ``data`` may be
+    callables taking the Fixtures, so each request can vary (ids, names).
+    """
+
+    def __init__(self, name, route, method, path, role=None, data=None, format='json', content_type=None, requires=None):
+        self.name = name
+        self.route = route
+        self.method = method
+        self.path = path
+        self.role = role
+        self.data = data
+        self.format = format
+        self.content_type = content_type
+        self.requires = requires  # A Fixtures attribute the dataset may lack
+
+    def resolve(self, value, fixtures):
+        return value(fixtures) if callable(value) else value
+
+
+class Fixtures:
+    """Users, tokens and ids from the existing dataset for the scenarios to use."""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.counter = 0
+        top = (
+            Property.objects.order_by().values('landlord').annotate(n=Count('id')).order_by('-n', 'landlord').first()
+        )
+        if top is None:
+            raise CommandError('The database has no properties; run `manage.py generate_dataset` first.')
+        self.landlord = User.objects.get(pk=top['landlord'])
+        tenant_id = FavoriteProperty.objects.order_by('user_id').values_list('user_id', flat=True).first()
+        if tenant_id is None:
+            tenant_id = UserProfile.objects.filter(is_landlord=False).order_by('user_id').values_list('user_id', flat=True).first()
+        if tenant_id is None:
+            raise CommandError('The database has no tenants; run `manage.py generate_dataset` first.')
+        self.tenant = User.objects.get(pk=tenant_id)
+        self.admin_password = uuid.uuid4().hex
+        self.admin = User.objects.create_user(
+            username=f'bench-admin-{uuid.uuid4().hex[:8]}', email=f'bench-admin-{uuid.uuid4().hex[:8]}@example.com',
+            password=self.admin_password, is_staff=True,
+        )
+        UserProfile.objects.create(user=self.admin)
+        self.tokens = {
+            role: f'Bearer {RefreshToken.for_user(user).access_token}'
+            for role, user in (('landlord', self.landlord), ('tenant', self.tenant), ('admin', self.admin))
+        }
+
+        last = Property.objects.order_by('-pk').values_list('pk', flat=True).first()
+        sample = self.rng.sample(range(1, last + 1), min(last, 500))
+        self.property_ids = sorted(Property.objects.filter(pk__in=sample, is_approved=True).values_list('pk', flat=True)[:100])
+        if not self.property_ids:
+            self.property_ids = list(Property.objects.order_by('pk').values_list('pk', flat=True)[:100])
+        owned = Property.objects.filter(landlord=self.landlord).annotate(image_count=Count('images')).order_by('pk')
+        self.own_property = owned.filter(image_count__lt=3).first() or owned.first()
+        self.own_image = PropertyImage.objects.filter(property__landlord=self.landlord).order_by('pk').first()
+        self.favorite_id = FavoriteProperty.objects.filter(user=self.tenant).order_by('pk').values_list('property_id', flat=True).first()
+        self.message_property = ContactMessage.objects.order_by('pk').values_list('property_id', flat=True).first()
+        png = io.BytesIO()
+        Image.new('RGB', (64, 48), (200, 120, 40)).save(png, 'PNG')
+        self.png = png.getvalue()
+
+    def next(self):
+        self.counter += 1
+        return self.counter
+
+    def property_id(self):
+        return self.property_ids[self.next() % len(self.property_ids)]
+
+    def upload(self):
+        upload = io.BytesIO(self.png)
+        upload.name = 'bench.png'
+        return {'property_id': self.own_property.pk, 'image': upload}
+
+    def delete(self):
+        User.objects.filter(pk=self.admin.pk).delete()
+
+
+def import_body(fixtures):
+    lines = ['area,district,rental_amount,status,description']
+    lines += [f'Bench Area {i},Maseru,{2000 + i * 50},vacant,Imported by bench_api' for i in range(10)]
+    return '\n'.join(lines) + '\n'
+
+
+SCENARIOS = [
+    Scenario('register', 'register', 'POST', '/api/register/', data=lambda f: {
+        'username': f'bench-user-{f.next()}', 'email': f'bench-user-{f.counter}@example.com',
+        'password': 'Bench-pass-123', 'profile': {'is_landlord': False},
+    }),
+    Scenario('token', 'token', 'POST', '/api/token/', data=lambda f: {'username': f.admin.username, 'password': f.admin_password}),
+    Scenario('profile', 'profile', 'GET', '/api/profile/', role='tenant'),
+    Scenario('property-list page', 'property-list', 'GET', '/api/properties/?page_size=20'),
+    Scenario('property-list filtered', 'property-list', 'GET', '/api/properties/?page_size=20&status=vacant&district=Maseru&ordering=rental_amount'),
+    Scenario('property-list limit', 'property-list', 'GET', '/api/properties/?limit=100'),
+    Scenario('property-list search', 'property-list', 'GET', '/api/properties/?q=maseru'),
+    Scenario('property-list near', 'property-list', 'GET', '/api/properties/?near=-29.31,27.48&radius=5'),
+    Scenario('property-list tenant', 'property-list', 'GET', '/api/properties/?page_size=20', role='tenant'),
+    Scenario('property-list landlord=self', 'property-list', 'GET', '/api/properties/?page_size=20&landlord=self', role='landlord'),
+    Scenario('property-list create', 'property-list', 'POST', '/api/properties/', role='landlord', data={
+        'area': 'Bench Area', 'district': 'Maseru', 'rental_amount': '2500.00', 'status': 'vacant', 'description': 'Created by bench_api',
+    }),
+    Scenario('property-facets', 'property-facets', 'GET', '/api/properties/facets/'),
+    Scenario('property-clusters', 'property-clusters', 'GET', '/api/properties/clusters/?bbox=-30.7,27.0,-28.5,29.5&zoom=8'),
+    Scenario('property-import', 'property-import', 'POST', '/api/properties/import/', role='landlord', data=import_body, content_type='text/csv'),
+    Scenario('property-export', 'property-export', 'GET', '/api/properties/export/', role='landlord'),
+    Scenario('property-detail', 'property-detail', 'GET', lambda f: f'/api/properties/{f.property_id()}/'),
+    Scenario('property-detail tenant', 'property-detail', 'GET', lambda f: f'/api/properties/{f.property_id()}/', role='tenant'),
+    Scenario('property-detail update', 'property-detail', 'PATCH', lambda f: f'/api/properties/{f.own_property.pk}/', role='landlord', data={'rental_amount': '2600.00'}),
+    Scenario('property-detail delete', 'property-detail', 'DELETE', lambda f: f'/api/properties/{f.own_property.pk}/', role='landlord'),
+    Scenario('tenant-list', 'tenant-list', 'GET', '/api/tenants/', role='landlord'),
+    Scenario('tenant-list search', 'tenant-list', 'GET', lambda f: f'/api/tenants/?search={f.tenant.username[:-1]}', role='landlord'),
+    Scenario('tenant-detail', 'tenant-detail', 'GET', lambda f: f'/api/tenants/{f.tenant.pk}/', role='landlord'),
+    Scenario('favorites', 'favorites', 'GET', '/api/favorites/', role='tenant'),
+    Scenario('favorites page', 'favorites', 'GET', '/api/favorites/?page_size=20', role='tenant'),
+    Scenario('favorites add', 'favorites', 'POST', '/api/favorites/', role='tenant', data=lambda f: {'property': f.property_id()}),
+    Scenario('favorites remove', 'favorites', 'DELETE', '/api/favorites/', role='tenant', data=lambda f: {'property': f.favorite_id}, requires='favorite_id'),
+    Scenario('favorite-ids', 'favorite-ids', 'GET', '/api/favorites/ids/', role='tenant'),
+    Scenario('favorite-batch', 'favorite-batch', 'POST', '/api/favorites/batch/', role='tenant', data=lambda f: {
+        'add': f.property_ids[:10], 'remove': [f.favorite_id] if f.favorite_id else [],
+    }),
+    Scenario('contact', 'contact', 'POST', '/api/contact/', data=lambda f: {
+        'property': f.message_property or f.property_id(), 'tenant_name': 'Bench Tenant',
+        'tenant_email': 'bench-tenant@example.com', 'message': 'Is this place still available?',
+    }),
+    Scenario('dashboard landlord', 'dashboard', 'GET', '/api/dashboard/', role='landlord'),
+    Scenario('dashboard tenant', 'dashboard', 'GET', '/api/dashboard/', role='tenant'),
+    Scenario('property-image upload', 'property-image-list', 'POST', '/api/property-images/', role='landlord', data=lambda f: f.upload(), format='multipart'),
+    Scenario('property-image delete', 'image-detail', 'DELETE', lambda f: f'/api/property-images/{f.own_image.pk}/', role='landlord', requires='own_image'),
+    Scenario('user-list', 'user-list', 'GET', '/api/users/', role='admin'),
+    Scenario('user-list verified', 'user-list', 'GET', '/api/users/?is_verified=true&ordering=username', role='admin'),
+    Scenario('user-export', 'user-export', 'GET', '/api/users/export/', role='admin'),
+    Scenario('user-detail', 'user-detail', 'GET', lambda f: f'/api/users/{f.tenant.pk}/', role='admin'),
+    Scenario('user-verify', 'user-verify', 'PUT', lambda f: f'/api/users/{f.tenant.pk}/verify/', role='admin', data={'profile': {'is_verified': True}}),
+    Scenario('reports', 'reports', 'GET', '/api/reports/', role='admin'),
+    Scenario('metrics', 'metrics', 'GET', '/api/metrics/', role='admin'),
+]
+
+
+def calibrate(rounds=5):
+    """Milliseconds for a fixed pure-Python workload (best of ``rounds``), to scale a baseline from a faster or slower machine."""
+    payload = [{'id': i, 'area': f'Area {i}', 'rental_amount': str(1000 + i), 'images': list(range(i % 4))} for i in range(2000)]
+    best = math.inf
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(10):
+            sorted(json.loads(json.dumps(payload)), key=lambda row: row['area'])
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return round(best, 2)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every route in api/urls.py in this process against the current database (see generate_dataset): '
+        'throughput, p50/p99 latency, serializer time, queries and peak memory per endpoint, as JSON. With --baseline, '
+        'compare against an earlier run and fail on regressions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help='Timed requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per endpoint first.')
+        parser.add_argument('--max-seconds', type=float, default=10, help='Stop warming up or timing an endpoint after this long (at least 3 timed requests).')
+        parser.add_argument('--memory-samples', type=int, default=1, help='Requests per endpoint run under tracemalloc.')
+        parser.add_argument('--only', action='append', default=[], help='Run scenarios whose name contains this (repeatable).')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Write the JSON results here instead of stdout.')
+        parser.add_argument('--baseline', help='Results of an earlier run to compare against.')
+        parser.add_argument('--threshold', type=float, default=0.25, help='Allowed p50 increase over the baseline (0.25 = 25%%); p99 may grow twice as much.')
+        parser.add_argument('--min-delta-ms', type=float, default=1.0, help='Ignore latency changes smaller than this.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+        scenarios = [s for s in SCENARIOS if not options['only'] or any(part in s.name for part in options['only'])]
+        if not scenarios:
+            raise CommandError('No scenario matches --only.')
+        self.check_coverage()
+
+        self.client = APIClient(raise_request_exception=False, HTTP_HOST='localhost')
+        self.fixtures = Fixtures(options['seed'])
+        endpoints = {}
+        try:
+            # Uploaded test images go to a scratch MEDIA_ROOT; every request would be a "slow request" to log.
+            # Server-Timing carries the serializer time.
+            with tempfile.TemporaryDirectory() as media_root, override_settings(
+                MEDIA_ROOT=media_root, METRICS_SLOW_REQUEST_MS=math.inf, METRICS_SERVER_TIMING=True,
+            ):
+                for scenario in scenarios:
+                    if scenario.requires and getattr(self.fixtures, scenario.requires) is None:
+                        self.stderr.write(f'{scenario.name:<30} skipped: the dataset has no {scenario.requires}')
+                        continue
+                    endpoints[scenario.name] = self.run_scenario(scenario, options)
+                    self.stderr.write(self.format_row(scenario.name, endpoints[scenario.name]))
+        finally:
+            self.fixtures.delete()
+            view_counter.take()  # Views recorded by the benchmark are not real traffic.
+
+        results = {
+            'version': RESULTS_VERSION,
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'environment': self.environment(),
+            'dataset': self.dataset(),
+            'options': {key: options[key] for key in ('requests', 'warmup', 'max_seconds', 'memory_samples', 'seed')},
+            'endpoints': endpoints,
+        }
+        if baseline is not None:
+            results['regressions'] = self.compare(baseline, results, options)
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+        if results.get('regressions'):
+            for regression in results['regressions']:
+                self.stderr.write(f'REGRESSION {regression["endpoint"]}: {regression["metric"]} {regression["baseline"]} -> {regression["current"]}')
+            raise CommandError(f'{len(results["regressions"])} regression(s) against {options["baseline"]}')
+
+    def check_coverage(self):
+        covered = {scenario.route for scenario in SCENARIOS}
+        missing = sorted(pattern.name for pattern in urlpatterns if pattern.name not in covered)
+        if missing:
+            self.stderr.write(f'Routes without a benchmark scenario: {", ".join(missing)}')
+
+    def request(self, scenario):
+        """Send one request; returns (ms, status, queries, serializer ms)."""
+        fixtures = self.fixtures
+        path = scenario.resolve(scenario.path, fixtures)
+        data = scenario.resolve(scenario.data, fixtures)
+        extra = {'secure': True}
+        if scenario.role:
+            extra['HTTP_AUTHORIZATION'] = fixtures.tokens[scenario.role]
+        if scenario.content_type:
+            extra['content_type'] = scenario.content_type
+        elif data is not None:
+            extra['format'] = scenario.format
+        send = getattr(self.client, scenario.method.lower())
+        counter = QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            if scenario.method in UNSAFE_METHODS:
+                # Roll writes back so every request sees the same data.
+                stack.enter_context(transaction.atomic())
+            started = time.perf_counter()
+            response = send(path, data, **extra)
+            if response.streaming:
+                for _chunk in response.streaming_content:
+                    pass
+            elapsed = (time.perf_counter() - started) * 1000
+            if scenario.method in UNSAFE_METHODS:
+                transaction.set_rollback(True)
+        serialize = SERIALIZE_TIMING.search(response.get('Server-Timing', ''))
+        return elapsed, response.status_code, counter.count, float(serialize[1]) if serialize else 0.0
+
+    def run_scenario(self, scenario, options):
+        deadline = time.monotonic() + options['max_seconds']
+        for _ in range(options['warmup']):
+            self.request(scenario)
+            if time.monotonic() >= deadline:
+                break
+        latencies, queries, serialize_ms, statuses = [], 0, 0.0, {}
+        deadline = time.monotonic() + options['max_seconds']
+        while len(latencies) < options['requests'] and (time.monotonic() < deadline or len(latencies) < MIN_REQUESTS):
+            ms, status, count, serialize = self.request(scenario)
+            latencies.append(ms)
+            queries += count
+            serialize_ms += serialize
+            statuses[status] = statuses.get(status, 0) + 1
+
+        peak = 0
+        tracemalloc.start()
+        try:
+            for _ in range(options['memory_samples']):
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                self.request(scenario)
+                peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+        finally:
+            tracemalloc.stop()
+
+        latencies.sort()
+        total = sum(latencies)
+        return {
+            'route': scenario.route,
+            'method': scenario.method,
+            'role': scenario.role or 'anonymous',
+            'requests': len(latencies),
+            'errors': sum(n for status, n in statuses.items() if status >= 400),
+            'statuses': {str(status): n for status, n in sorted(statuses.items())},
+            'rps': round(len(latencies) / total * 1000, 1) if total else None,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'mean_ms': round(total / len(latencies), 2),
+            'serialize_ms': round(serialize_ms / len(latencies), 2),
+            'queries': round(queries / len(latencies), 1),
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def format_row(self, name, result):
+        return (
+            f'{name:<30} {result["rps"] or 0:9.1f} req/s  p50 {result["p50_ms"]:8.2f}ms  p99 {result["p99_ms"]:8.2f}ms  '
+            f'serialize {result["serialize_ms"]:7.2f}ms  {result["queries"]:6.1f} queries  {result["peak_kb"]:9.1f} KB  {result["errors"]} errors'
+        )
+
+    def environment(self):
+        database = connections['default']
+        return {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': database.vendor,
+            'sqlite': sqlite3.sqlite_version if database.vendor == 'sqlite' else None,
+            'machine': platform.machine(),
+            'calibration_ms': calibrate(),
+        }
+
+    def dataset(self):
+        return {
+            'users': User.objects.count(),
+            'properties': Property.objects.count(),
+            'images': PropertyImage.objects.count(),
+            'favorites': FavoriteProperty.objects.count(),
+            'messages': ContactMessage.objects.count(),
+        }
+
+    def compare(self, baseline, results, options):
+        """
+        Endpoints slower than the baseline by more than the threshold (twice
+        that for p99), or running more queries or failing more often.
+        Latencies are scaled by the two runs' calibration, so a baseline from
+        another machine stays comparable.
+        """
+        if baseline.get('dataset') != results['dataset']:
+            self.stderr.write('Warning: the baseline was measured on a different dataset.')
+        then = baseline.get('environment', {}).get('calibration_ms')
+        now = results['environment']['calibration_ms']
+        scale = now / then if then else 1.0
+        regressions = []
+        for name, current in results['endpoints'].items():
+            previous = baseline.get('endpoints', {}).get(name)
+            if previous is None:
+                continue
+            for metric, threshold in (('p50_ms', options['threshold']), ('p99_ms', 2 * options['threshold'])):
+                expected = previous[metric] * scale
+                if current[metric] > expected * (1 + threshold) and current[metric] - expected >= options['min_delta_ms']:
+                    regressions.append({'endpoint': name, 'metric': metric, 'baseline': round(expected, 2), 'current': current[metric]})
+            for metric in ('queries', 'errors'):
+                if current[metric] > previous[metric]:
+                    regressions.append({'endpoint': name, 'metric': metric, 'baseline': previous[metric], 'current': current[metric]})
+        return regressions
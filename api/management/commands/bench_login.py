@@ -0,0 +1,47 @@
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from api.models import UserProfile
+from api.views import UserLoginView
+
+
+class Command(BaseCommand):
+    help = 'Measure login throughput of /api/token/ in this process (logins/sec for one worker thread).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Logins per scenario.')
+
+    def handle(self, *args, **options):
+        password = uuid.uuid4().hex
+        user = User.objects.create_user(username=f'bench-{uuid.uuid4().hex[:8]}', email=f'Bench-{uuid.uuid4().hex[:8]}@example.com', password=password)
+        UserProfile.objects.create(user=user)
+        scenarios = (
+            ('username', user.username, password, 200),
+            ('email, other case', user.email.upper(), password, 200),
+            ('wrong password', user.username, 'not-the-password', 401),
+            ('unknown user', 'nobody-' + uuid.uuid4().hex, password, 401),
+        )
+        view = UserLoginView.as_view()
+        factory = APIRequestFactory()
+        try:
+            for label, identifier, secret, expected in scenarios:
+                with CaptureQueriesContext(connection) as queries:
+                    response = view(factory.post('/api/token/', {'username': identifier, 'password': secret}, format='json'))
+                if response.status_code != expected:
+                    self.stderr.write(f'{label}: expected {expected}, got {response.status_code}')
+                started = time.perf_counter()
+                for _ in range(options['requests']):
+                    view(factory.post('/api/token/', {'username': identifier, 'password': secret}, format='json'))
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'{label:<20} {options["requests"] / elapsed:8.1f} logins/sec  '
+                    f'{elapsed / options["requests"] * 1000:7.1f} ms/login  {len(queries)} queries'
+                )
+        finally:
+            user.delete()
@@ -0,0 +1,160 @@
+import asyncio
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def process_tree(pid):
+    """``pid`` and its children (gunicorn master and workers), from /proc."""
+    pids = [pid]
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            pids += [int(child) for child in f.read().split()]
+    except OSError:
+        pass
+    return pids
+
+
+def rss_kb(pids):
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+        except (OSError, StopIteration):
+            pass
+    return total
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    headers = dict(
+        line.split(b':', 1) for line in head.split(b'\r\n')[1:] if b':' in line
+    )
+    headers = {key.strip().lower(): value.strip() for key, value in headers.items()}
+    if b'content-length' in headers:
+        await reader.readexactly(int(headers[b'content-length']))
+    elif headers.get(b'transfer-encoding') == b'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return status
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare WSGI (gthread) and ASGI (uvicorn) gunicorn workers: request throughput while '
+        'slow clients hold connections open, and resident memory per held connection.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=('wsgi', 'asgi', 'both'), default='both')
+        parser.add_argument('--path', default='/api/properties/?page_size=20')
+        parser.add_argument('--workers', type=int, default=2, help='Gunicorn worker processes.')
+        parser.add_argument('--slow', type=int, default=200, help='Slow clients holding a connection.')
+        parser.add_argument('--concurrency', type=int, default=20, help='Fast clients issuing requests.')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests across the fast clients.')
+        parser.add_argument('--timeout', type=float, default=10, help='Seconds before a request counts as failed.')
+        parser.add_argument('--port', type=int, default=8765)
+
+    def handle(self, *args, **options):
+        modes = ('wsgi', 'asgi') if options['mode'] == 'both' else (options['mode'],)
+        self.stdout.write(f'{"mode":<6} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"errors":>7} {"KB/conn":>8} {"RSS MB":>8}')
+        for mode in modes:
+            result = self.run_mode(mode, options)
+            self.stdout.write(
+                f'{mode:<6} {result["rate"]:8.1f} {result["p50"]:8.1f} {result["p95"]:8.1f} '
+                f'{result["errors"]:7d} {result["kb_per_conn"]:8.1f} {result["rss_mb"]:8.1f}'
+            )
+
+    def run_mode(self, mode, options):
+        env = dict(os.environ, SERVER_MODE=mode, SECURE_SSL_REDIRECT='False')
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{options["port"]}',
+             '--workers', str(options['workers']), '--log-level', 'warning'],
+            cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL,
+        )
+        try:
+            self.wait_for_port(options['port'], server)
+            return asyncio.run(self.measure(server.pid, options))
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+
+    def wait_for_port(self, port, server, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'gunicorn exited with status {server.returncode}')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f'gunicorn did not start listening on port {port}')
+
+    async def measure(self, pid, options):
+        port, path = options['port'], options['path']
+        request = f'GET {path} HTTP/1.1\r\nHost: localhost\r\nAccept: application/json\r\n'.encode()
+        # Warm up every worker before taking the memory baseline.
+        await self.fast_clients(port, request, options['workers'] * 4, options['workers'] * 2, options['timeout'])
+        baseline = rss_kb(process_tree(pid))
+
+        # Slow clients: send half a request and hold the connection, like a stalled mobile upload.
+        slow = []
+        for _ in range(options['slow']):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request)
+            await writer.drain()
+            slow.append((reader, writer))
+        await asyncio.sleep(1)
+        held = rss_kb(process_tree(pid))
+
+        started = time.perf_counter()
+        latencies, errors = await self.fast_clients(port, request, options['requests'], options['concurrency'], options['timeout'])
+        elapsed = time.perf_counter() - started
+
+        for reader, writer in slow:
+            writer.close()
+        latencies.sort()
+        return {
+            'rate': len(latencies) / elapsed if elapsed else 0.0,
+            'p50': statistics.median(latencies) * 1000 if latencies else 0.0,
+            'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0,
+            'errors': errors,
+            'kb_per_conn': (held - baseline) / options['slow'] if options['slow'] else 0.0,
+            'rss_mb': held / 1024,
+        }
+
+    async def fast_clients(self, port, request, total, concurrency, timeout):
+        latencies, errors = [], 0
+        remaining = iter(range(total))
+
+        async def client():
+            nonlocal errors
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            try:
+                for _ in remaining:
+                    started = time.perf_counter()
+                    writer.write(request + b'\r\n')
+                    status = await asyncio.wait_for(read_response(reader), timeout=timeout)
+                    latencies.append(time.perf_counter() - started)
+                    errors += status >= 400
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                # Timeouts are the interesting failure: every worker thread is held by a slow client.
+                errors += 1
+            finally:
+                writer.close()
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return latencies, errors
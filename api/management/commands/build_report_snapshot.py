@@ -0,0 +1,43 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.reports import build_snapshot, prune_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Compute an admin report snapshot (totals, district rents, vacancy, registrations) and prune old ones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep building snapshots until stopped.')
+        parser.add_argument('--interval', type=float, default=None, help='Seconds between snapshots (default: REPORT_SNAPSHOT_INTERVAL).')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or getattr(settings, 'REPORT_SNAPSHOT_INTERVAL', 900)
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        while self.running:
+            close_old_connections()
+            try:
+                snapshot = build_snapshot()
+                pruned = prune_snapshots()
+            except Exception as e:
+                self.stderr.write(f'Report snapshot failed: {e}')
+                if not options['loop']:
+                    raise
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Built report snapshot {snapshot.pk} in {snapshot.duration_ms}ms, pruned {pruned} rows'
+                ))
+            if not options['loop']:
+                break
+            deadline = time.monotonic() + interval
+            while self.running and time.monotonic() < deadline:
+                time.sleep(min(1.0, interval))
+
+    def stop(self, signum, frame):
+        self.running = False
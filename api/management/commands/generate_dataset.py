@@ -0,0 +1,272 @@
+import itertools
+import math
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from api import stats
+from api.cache import LIST_GENERATION, bump_generations, get_response_cache
+from api.geo import encode
+from api.models import ContactMessage, FavoriteProperty, OutboundEmail, Property, PropertyImage, PropertyViewDaily, UserProfile, UserStats
+from api.search import VOCABULARY_CACHE_KEY
+
+PREFIX = 'gen-'
+
+# Per district (api.search.DISTRICTS): its main town's (latitude, longitude), areas, and share of listings.
+DISTRICT_PROFILES = {
+    'Maseru': ((-29.31, 27.48), ('Maseru West', 'Ha Thetsane', 'Khubetsoana', 'Ha Abia', 'Upper Thamae', 'Motimposo', 'Roma'), 40),
+    'Leribe': ((-28.87, 28.05), ('Hlotse', 'Maputsoe', 'Peka'), 14),
+    'Berea': ((-29.15, 27.75), ('Teyateyaneng', 'Mapoteng', 'Ha Mokhethoaneng'), 12),
+    'Mafeteng': ((-29.82, 27.24), ('Mafeteng Town', 'Ha Ramohapi'), 8),
+    "Mohale's Hoek": ((-30.15, 27.48), ("Mohale's Hoek Town", 'Mekaling'), 7),
+    'Butha-Buthe': ((-28.77, 28.25), ('Butha-Buthe Town', 'Ha Sephapo'), 5),
+    'Quthing': ((-30.40, 27.70), ('Moyeni', 'Mount Moorosi'), 4),
+    "Qacha's Nek": ((-30.12, 28.69), ("Qacha's Nek Town", 'Sehlabathebe'), 3),
+    'Thaba-Tseka': ((-29.52, 28.61), ('Thaba-Tseka Town', 'Mantsonyane'), 4),
+    'Mokhotlong': ((-29.29, 29.06), ('Mokhotlong Town', 'Linakeng'), 3),
+}
+
+KINDS = ('flat', 'house', 'room', 'townhouse', 'cottage', 'bachelor flat')
+FEATURES = (
+    'Prepaid electricity', 'Borehole water', 'Secure parking', 'Walled and gated', 'Close to taxi rank',
+    'Built-in cupboards', 'Tiled floors', 'Near schools', 'DSTV connection', 'Garden', 'Fibre internet',
+)
+FIRST_NAMES = ('Thabo', 'Lerato', 'Palesa', 'Teboho', 'Mpho', 'Refiloe', 'Tumelo', 'Nthabiseng', 'Lineo', 'Karabo')
+LAST_NAMES = ('Mokoena', 'Molapo', 'Letsie', 'Ramoholi', 'Sekhonyana', 'Mohapi', 'Nkhahle', 'Makara')
+STATUSES = (('vacant', 60), ('occupied', 30), ('inactive', 10))
+MAX_IMAGES = 3  # PropertyImageView's limit
+
+
+@contextmanager
+def backdating(*models):
+    """Let bulk_create keep the timestamps we set on auto_now/auto_now_add fields."""
+    fields = [field for model in models for field in model._meta.concrete_fields if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def chunks(count, size):
+    for start in range(0, count, size):
+        yield range(start, min(start + size, count))
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a reproducible synthetic dataset (users with profiles, properties, images, favorites and '
+        f'contact messages) with bulk_create. Generated users are named "{PREFIX}<n>".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--properties', type=int, default=10000)
+        parser.add_argument('--users', type=int, help='Default: one user per 5 properties, at least 10.')
+        parser.add_argument('--landlord-share', type=float, default=0.2, help='Fraction of users who are landlords.')
+        parser.add_argument('--favorites-per-tenant', type=float, default=5, help='Average favorites per tenant.')
+        parser.add_argument('--messages', type=int, help='Contact messages. Default: one per 2 properties.')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--password', default='dataset-pass', help='Password of every generated user.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--clear', action='store_true', help='Delete previously generated data first.')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        users = options['users'] or max(10, options['properties'] // 5)
+        landlords = max(1, round(users * options['landlord_share']))
+        if landlords >= users:
+            raise CommandError('--landlord-share leaves no tenants.')
+        if connection.vendor == 'sqlite' and not connection.in_atomic_block:
+            # A throwaway dataset does not need to survive a power cut mid-load.
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA synchronous = OFF')
+        if options['clear']:
+            self.clear()
+        elif User.objects.filter(username__startswith=PREFIX).exists():
+            raise CommandError('Generated data already exists; pass --clear to replace it.')
+
+        started = time.monotonic()
+        with backdating(Property, PropertyImage, FavoriteProperty, ContactMessage):
+            landlord_ids, tenant_ids = self.timed('users', users, lambda: self.create_users(users, landlords, options['password']))
+            property_ids = self.timed('properties', options['properties'], lambda: self.create_properties(options['properties'], landlord_ids))
+            self.timed('images', None, lambda: self.create_images(property_ids))
+            self.timed('favorites', None, lambda: self.create_favorites(tenant_ids, property_ids, options['favorites_per_tenant']))
+            messages = options['messages'] if options['messages'] is not None else options['properties'] // 2
+            self.timed('contact messages', messages, lambda: self.create_messages(messages, tenant_ids, property_ids))
+
+        # bulk_create sends no signals: rebuild what the handlers maintain.
+        stats.rebuild_user_stats()
+        bump_generations(LIST_GENERATION)
+        cache.delete(VOCABULARY_CACHE_KEY)
+        self.stdout.write(f'Done in {time.monotonic() - started:.1f}s')
+
+    def timed(self, label, count, create):
+        started = time.monotonic()
+        result = create()
+        elapsed = time.monotonic() - started
+        created = count if count is not None else result
+        self.stdout.write(f'{label:<17} {created:>9} rows in {elapsed:6.1f}s ({created / elapsed if elapsed else 0:,.0f}/s)')
+        return result
+
+    def insert(self, model, objects):
+        with transaction.atomic():
+            model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def new_ids(self, model, create):
+        """Run ``create`` and return the ids it added (this command is the only writer)."""
+        before = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        create()
+        return list(model.objects.filter(pk__gt=before).order_by('pk').values_list('pk', flat=True))
+
+    def past(self, days):
+        return self.now - timedelta(seconds=self.rng.uniform(0, days * 86400))
+
+    def create_users(self, count, landlords, password):
+        password_hash = make_password(password)  # Hashed once; every user shares it.
+
+        def create():
+            for batch in chunks(count, self.batch_size):
+                rows = []
+                for n in batch:
+                    first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+                    rows.append(User(
+                        username=f'{PREFIX}{n}', email=f'{PREFIX}{n}@example.com', password=password_hash,
+                        first_name=first, last_name=last, date_joined=self.past(730),
+                    ))
+                self.insert(User, rows)
+
+        user_ids = self.new_ids(User, create)
+        self.first_tenant = landlords
+        for batch in chunks(len(user_ids), self.batch_size):
+            self.insert(UserProfile, [
+                UserProfile(user_id=user_ids[i], is_landlord=i < landlords, is_verified=self.rng.random() < 0.7)
+                for i in batch
+            ])
+        return user_ids[:landlords], user_ids[landlords:]
+
+    def create_properties(self, count, landlord_ids):
+        districts = list(DISTRICT_PROFILES)
+        district_weights = [DISTRICT_PROFILES[name][2] for name in districts]
+        # A few landlords own many listings; most own one or two.
+        landlord_weights = list(itertools.accumulate(1 / (rank + 1) ** 0.8 for rank in range(len(landlord_ids))))
+        statuses, status_weights = zip(*STATUSES)
+
+        self.image_counts = []
+
+        def create():
+            for batch in chunks(count, self.batch_size):
+                rows = []
+                for n in batch:
+                    district = self.rng.choices(districts, district_weights)[0]
+                    (latitude, longitude), areas, _share = DISTRICT_PROFILES[district]
+                    area = self.rng.choice(areas)
+                    rent = min(30000, max(500, round(math.exp(self.rng.gauss(math.log(2500), 0.6)) / 50) * 50))
+                    created_at = self.past(365)
+                    prop = Property(
+                        landlord_id=self.rng.choices(landlord_ids, cum_weights=landlord_weights)[0],
+                        area=area, district=district, rental_amount=Decimal(rent),
+                        deposit=Decimal(rent) if self.rng.random() < 0.8 else None,
+                        viewing_fee=Decimal(self.rng.choice((0, 50, 100, 150))) if self.rng.random() < 0.5 else None,
+                        status=self.rng.choices(statuses, status_weights)[0],
+                        description=self.description(area, district),
+                        is_approved=self.rng.random() < 0.9,
+                        created_at=created_at, updated_at=created_at,
+                    )
+                    images = self.rng.randint(0, MAX_IMAGES)
+                    self.image_counts.append(images)
+                    if images:
+                        prop.image = self.image_name(n, 0)  # The primary image is the first upload.
+                    if self.rng.random() < 0.85:
+                        prop.latitude = round(latitude + self.rng.gauss(0, 0.04), 6)
+                        prop.longitude = round(longitude + self.rng.gauss(0, 0.04), 6)
+                        prop.geohash = encode(prop.latitude, prop.longitude)
+                    rows.append(prop)
+                self.insert(Property, rows)
+
+        return self.new_ids(Property, create)
+
+    def description(self, area, district):
+        bedrooms = self.rng.randint(1, 4)
+        features = '. '.join(self.rng.sample(FEATURES, self.rng.randint(1, 3)))
+        return f'{bedrooms}-bedroom {self.rng.choice(KINDS)} in {area}, {district}. {features}.'
+
+    def image_name(self, n, j):
+        return f'property_images/{PREFIX}{n}-{j}.jpg'
+
+    def create_images(self, property_ids):
+        created = 0
+        for batch in chunks(len(property_ids), self.batch_size):
+            rows = [
+                PropertyImage(property_id=property_ids[n], image=self.image_name(n, j), uploaded_at=self.now)
+                for n in batch for j in range(self.image_counts[n])
+            ]
+            self.insert(PropertyImage, rows)
+            created += len(rows)
+        return created
+
+    def create_favorites(self, tenant_ids, property_ids, average):
+        created, rows = 0, []
+        for tenant_id in tenant_ids:
+            count = min(len(property_ids), self.rng.randint(0, round(2 * average)))
+            for index in self.rng.sample(range(len(property_ids)), count):
+                rows.append(FavoriteProperty(user_id=tenant_id, property_id=property_ids[index], created_at=self.past(180)))
+            if len(rows) >= self.batch_size:
+                self.insert(FavoriteProperty, rows)
+                created, rows = created + len(rows), []
+        self.insert(FavoriteProperty, rows)
+        return created + len(rows)
+
+    def create_messages(self, count, tenant_ids, property_ids):
+        for batch in chunks(count, self.batch_size):
+            rows = []
+            for n in batch:
+                tenant = self.first_tenant + self.rng.randrange(len(tenant_ids))
+                rows.append(ContactMessage(
+                    property_id=self.rng.choice(property_ids),
+                    tenant_name=f'{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}',
+                    tenant_email=f'{PREFIX}{tenant}@example.com',
+                    message='Hello, is this place still available? I would like to arrange a viewing.',
+                    is_read=self.rng.random() < 0.5,
+                    created_at=self.past(90),
+                ))
+            self.insert(ContactMessage, rows)
+
+    def clear(self):
+        """Delete generated users and everything hanging off them, without loading any rows."""
+        started = time.monotonic()
+        users = User.objects.filter(username__startswith=PREFIX)
+        properties = Property.objects.filter(landlord__in=users)
+        messages = ContactMessage.objects.filter(property__in=properties)
+        with transaction.atomic():
+            OutboundEmail.objects.filter(contact_message__in=messages).update(contact_message=None)
+            for queryset in (
+                messages,
+                FavoriteProperty.objects.filter(Q(user__in=users) | Q(property__in=properties)),
+                PropertyImage.objects.filter(property__in=properties),
+                PropertyViewDaily.objects.filter(property__in=properties),
+                properties,
+                UserStats.objects.filter(user__in=users),
+                UserProfile.objects.filter(user__in=users),
+                User.groups.through.objects.filter(user__in=users),
+                User.user_permissions.through.objects.filter(user__in=users),
+                users,
+            ):
+                queryset._raw_delete(queryset.db)
+        bump_generations(LIST_GENERATION)
+        get_response_cache().clear()
+        self.stdout.write(f'Cleared generated data in {time.monotonic() - started:.1f}s')
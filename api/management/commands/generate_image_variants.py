@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from api import imaging
+from api.models import Property, PropertyImage
+
+
+class Command(BaseCommand):
+    help = 'Generate missing or outdated thumbnail/card/full variants for property images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate variants even if they are current.')
+
+    def handle(self, *args, **options):
+        if options['force']:
+            PropertyImage.objects.update(variants={})
+            Property.objects.update(image_variants={})
+        processed = 0
+        # Materialize the rows first: SQLite cursors don't tolerate writes mid-iteration.
+        for image in list(PropertyImage.objects.only('pk', 'image', 'variants')):
+            if image.image and imaging.variants_stale(image.image, image.variants):
+                imaging.process_property_image(image.pk)
+                processed += 1
+        for prop in list(Property.objects.only('pk', 'image', 'image_variants')):
+            if imaging.variants_stale(prop.image, prop.image_variants):
+                imaging.process_property(prop.pk)
+                processed += 1
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} images'))
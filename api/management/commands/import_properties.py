@@ -0,0 +1,37 @@
+import json
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bulk import FORMATS, PropertyImporter, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk-import properties from a CSV or NDJSON file, streaming it in chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, or - for stdin.')
+        parser.add_argument('--user', required=True, help='Username importing the rows (staff may set landlord per row).')
+        parser.add_argument('--format', dest='fmt', choices=sorted(FORMATS), help='Input format (default: from the file extension).')
+        parser.add_argument('--chunk-size', type=int, default=None, help='Rows per bulk_create transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only; write nothing.')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist")
+        fmt = options['fmt'] or detect_format(filename=options['path'])
+        if fmt is None:
+            raise CommandError('Cannot tell the format from the file name; pass --format')
+        importer = PropertyImporter(user, chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        if options['path'] == '-':
+            report = importer.run(read_rows(sys.stdin.buffer, fmt))
+        else:
+            with open(options['path'], 'rb') as lines:
+                report = importer.run(read_rows(lines, fmt))
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {json.dumps(error['errors'])}")
+        verb = 'Validated' if report['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {report['created']} properties, {report['failed']} rows failed"))
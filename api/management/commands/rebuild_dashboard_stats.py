@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute dashboard counters (UserStats) from properties, favorites and contact messages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Only rebuild this user id (repeatable).')
+        parser.add_argument('--reset-trends', action='store_true', help='Also reset the trend baselines to the current values.')
+
+    def handle(self, *args, **options):
+        written = stats.rebuild_user_stats(options['users'], reset_trends=options['reset_trends'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt dashboard stats for {written} users'))
@@ -0,0 +1,43 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending outbox emails over a single reused mail connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Emails per batch (default: OUTBOX_BATCH_SIZE).')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new emails until stopped.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when the outbox is empty.')
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        total_sent = total_failed = 0
+        while self.running:
+            close_old_connections()
+            try:
+                sent, failed = drain_outbox(batch_size=options['batch_size'])
+            except Exception as e:
+                self.stderr.write(f'Outbox batch failed: {e}')
+                sent = failed = 0
+                if not options['loop']:
+                    raise
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Sent {total_sent} emails, {total_failed} failed'))
+
+    def stop(self, signum, frame):
+        # Finish the batch in flight, then exit.
+        self.running = False
@@ -0,0 +1,46 @@
+import signal
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database onto the SQLite replicas in DATABASE_REPLICAS, '
+        'standing in for replication when trying api.replicas locally.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep copying until stopped, like a lagging replica.')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between copies with --loop.')
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES[DEFAULT_DB_ALIAS]
+        replicas = [settings.DATABASES[alias] for alias in getattr(settings, 'DATABASE_REPLICAS', [])]
+        if not replicas:
+            raise CommandError('No replicas configured; set DATABASE_REPLICA_URLS.')
+        if any(db['ENGINE'] != 'django.db.backends.sqlite3' for db in [primary, *replicas]):
+            raise CommandError('sync_sqlite_replica only copies between SQLite databases.')
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        while self.running:
+            started = time.monotonic()
+            with sqlite3.connect(primary['NAME']) as source:
+                for replica in replicas:
+                    with sqlite3.connect(replica['NAME']) as target:
+                        source.backup(target)
+            self.stdout.write(
+                f'Copied {primary["NAME"]} to {len(replicas)} replica(s) in {(time.monotonic() - started) * 1000:.0f}ms'
+            )
+            if not options['loop']:
+                break
+            deadline = time.monotonic() + options['interval']
+            while self.running and time.monotonic() < deadline:
+                time.sleep(min(0.5, options['interval']))
+
+    def stop(self, signum, frame):
+        self.running = False
@@ -0,0 +1,146 @@
+"""
+Production media serving.
+
+Files under MEDIA_ROOT are served with ETag/Last-Modified validation, single
+HTTP Range requests and long-lived caching for content-hashed variant names.
+With MEDIA_OFFLOAD set, the body is handed to the front-end server
+(X-Accel-Redirect for nginx, X-Sendfile for Apache/lighttpd) so the worker
+returns immediately; otherwise the file is streamed through FileResponse,
+which gunicorn sends with sendfile(2).
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotAllowed
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags
+
+# Variant names look like "<stem>-card.<12 hex digest>.webp" (see api.imaging).
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class RangeFile:
+    """
+    Expose ``length`` bytes of an open file from its current position.
+
+    ``fileno`` lets gunicorn's wsgi.file_wrapper use sendfile(2) starting at
+    the seek position and bounded by Content-Length; ``read`` is the
+    portable fallback.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Return (start, end) for a single satisfiable byte range, None to ignore, or False if unsatisfiable."""
+    match = RANGE_HEADER.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def cache_control_for(path):
+    if HASHED_NAME.search(path):
+        return IMMUTABLE_CACHE_CONTROL
+    return f"public, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600)}"
+
+
+def serve_media(request, path):
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    last_modified = int(stat.st_mtime)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': cache_control_for(path),
+        'Accept-Ranges': 'bytes',
+    }
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        for header, value in headers.items():
+            not_modified[header] = value
+        return not_modified
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    offload = getattr(settings, 'MEDIA_OFFLOAD', '')
+    if offload == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + quote(path)
+    elif offload == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = full_path
+    else:
+        response = stream_file(request, full_path, stat.st_size, content_type, etag)
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def stream_file(request, full_path, size, content_type, etag):
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and (not if_range or etag in parse_etags(if_range)):
+        byte_range = parse_range(range_header, size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    length = max(0, end - start + 1)
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+    else:
+        response = FileResponse(RangeFile(open(full_path, 'rb'), start, length), content_type=content_type)
+    response['Content-Length'] = length
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
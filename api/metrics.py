@@ -0,0 +1,291 @@
+"""
+Per-request performance metrics.
+
+MetricsMiddleware keeps a RequestMetrics in a context variable for each
+request, so queries run by the async views' ORM threads are counted too. It
+collects:
+
+- SQL query count and time, from a wrapper on every database connection
+  (installed from the ``connection_created`` signal);
+- serializer time, for serializers that mix in TimedDataMixin;
+- response and auth cache hits and misses (``record_cache``);
+- total latency.
+
+With METRICS_SERVER_TIMING on, the figures are sent in a Server-Timing header.
+Latencies also go into per-endpoint log-scale histograms. Each worker
+publishes its histograms to the METRICS_CACHE_ALIAS cache every
+METRICS_PUBLISH_INTERVAL seconds, and MetricsView merges them. Only a cache
+shared by the workers (the 'db' or 'file' CACHE_BACKEND) makes that merge
+cross-worker; with per-process locmem each worker sees just its own figures,
+and MetricsView reports ``"shared": false`` to say so.
+
+Requests slower than METRICS_SLOW_REQUEST_MS are written, with their SQL, to
+the ``api.slow_requests`` logger.
+"""
+import logging
+import math
+import os
+import socket
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger('api.slow_requests')
+
+current = ContextVar('request_metrics', default=None)
+
+WORKERS_KEY = 'metrics:workers'
+MAX_RECORDED_QUERIES = 200
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []  # (sql, ms); only the first MAX_RECORDED_QUERIES keep their SQL
+        self.query_count = 0
+        self.db_ms = 0.0
+        self.serialize_ms = 0.0
+        self.cache = Counter()
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self, total_ms):
+        return ', '.join((
+            f'db;dur={self.db_ms:.1f};desc="{self.query_count} queries"',
+            f'serialize;dur={self.serialize_ms:.1f}',
+            f'cache;desc="{self.cache["hit"]} hit {self.cache["miss"]} miss"',
+            f'total;dur={total_ms:.1f}',
+        ))
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        ms = (time.perf_counter() - started) * 1000
+        metrics.query_count += 1
+        metrics.db_ms += ms
+        if len(metrics.queries) < MAX_RECORDED_QUERIES:
+            metrics.queries.append((sql, ms))
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def record_cache(hit):
+    metrics = current.get()
+    if metrics is not None:
+        metrics.cache['hit' if hit else 'miss'] += 1
+
+
+class TimedDataMixin:
+    """Adds the time spent building ``.data`` to the request's serializer time."""
+
+    @property
+    def data(self):
+        metrics = current.get()
+        if metrics is None:
+            return super().data
+        started = time.perf_counter()
+        try:
+            return super().data
+        finally:
+            metrics.serialize_ms += (time.perf_counter() - started) * 1000
+
+
+class Histogram:
+    """Latency counts in buckets growing by 10%, so percentiles are within ~5%."""
+    BASE = 1.1
+    MIN_MS = 0.1
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.buckets = Counter({int(key): value for key, value in state.get('buckets', {}).items()})
+        self.count = state.get('count', 0)
+        self.total_ms = state.get('total_ms', 0.0)
+        self.max_ms = state.get('max_ms', 0.0)
+        self.queries = state.get('queries', 0)
+        self.db_ms = state.get('db_ms', 0.0)
+
+    def add(self, ms, queries=0, db_ms=0.0):
+        self.buckets[max(0, math.ceil(math.log(max(ms, self.MIN_MS) / self.MIN_MS, self.BASE)))] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.queries += queries
+        self.db_ms += db_ms
+
+    def merge(self, other):
+        self.buckets.update(other.buckets)
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+        self.queries += other.queries
+        self.db_ms += other.db_ms
+
+    def percentile(self, q):
+        if not self.count:
+            return None
+        rank, seen = q / 100 * self.count, 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return round(min(self.MIN_MS * self.BASE ** bucket, self.max_ms), 1)
+        return round(self.max_ms, 1)
+
+    def state(self):
+        return {
+            'buckets': dict(self.buckets), 'count': self.count, 'total_ms': self.total_ms,
+            'max_ms': self.max_ms, 'queries': self.queries, 'db_ms': self.db_ms,
+        }
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': round(self.max_ms, 1),
+            'mean_ms': round(self.total_ms / self.count, 1) if self.count else None,
+            'mean_queries': round(self.queries / self.count, 1) if self.count else None,
+            'mean_db_ms': round(self.db_ms / self.count, 1) if self.count else None,
+        }
+
+
+def metrics_cache():
+    return caches[getattr(settings, 'METRICS_CACHE_ALIAS', 'default')]
+
+
+class MetricsRegistry:
+    """This process's per-endpoint histograms, published to the cache for the other workers."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = defaultdict(Histogram)
+        self.published_at = 0.0
+
+    def add(self, endpoint, ms, queries, db_ms):
+        """Record one request; True when this worker's histograms are due to be published."""
+        with self.lock:
+            self.histograms[endpoint].add(ms, queries, db_ms)
+            due = time.monotonic() - self.published_at >= getattr(settings, 'METRICS_PUBLISH_INTERVAL', 10)
+            if due:
+                self.published_at = time.monotonic()
+        return due
+
+    def publish(self):
+        with self.lock:
+            self.published_at = time.monotonic()
+            state = {endpoint: histogram.state() for endpoint, histogram in self.histograms.items()}
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        timeout = getattr(settings, 'METRICS_RETENTION', 3600)
+        cache = metrics_cache()
+        try:
+            cache.set(f'metrics:{worker}', state, timeout)
+            workers = cache.get(WORKERS_KEY) or set()
+            if worker not in workers:
+                cache.set(WORKERS_KEY, workers | {worker}, None)
+        except Exception as e:
+            logger.error("Publishing request metrics failed: %s", e)
+
+    def collect(self):
+        """{endpoint: merged Histogram} over every worker that published recently."""
+        self.publish()
+        cache = metrics_cache()
+        workers = cache.get(WORKERS_KEY) or set()
+        published = cache.get_many([f'metrics:{worker}' for worker in workers])
+        merged = defaultdict(Histogram)
+        for state in published.values():
+            for endpoint, histogram in state.items():
+                merged[endpoint].merge(Histogram(histogram))
+        return merged, len(published)
+
+    def shared(self):
+        """False when the cache is per process, so ``collect`` only sees this worker."""
+        return not isinstance(metrics_cache(), LocMemCache)
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+        cache = metrics_cache()
+        for worker in cache.get(WORKERS_KEY) or set():
+            cache.delete(f'metrics:{worker}')
+        cache.delete(WORKERS_KEY)
+
+
+registry = MetricsRegistry()
+
+
+def endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return f'{request.method} /{match.route}' if match is not None else f'{request.method} (unmatched)'
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        if self.finish(request, response, metrics):
+            registry.publish()
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        if self.finish(request, response, metrics):
+            # The cache backend may be the database.
+            await sync_to_async(registry.publish)()
+        return response
+
+    def finish(self, request, response, metrics):
+        """Add the figures to the response and histograms; True when a publish is due."""
+        total_ms = metrics.elapsed_ms()
+        if getattr(settings, 'METRICS_SERVER_TIMING', False):
+            response['Server-Timing'] = metrics.server_timing(total_ms)
+        if total_ms >= getattr(settings, 'METRICS_SLOW_REQUEST_MS', 500):
+            self.log_slow(request, response, metrics, total_ms)
+        return registry.add(endpoint_name(request), total_ms, metrics.query_count, metrics.db_ms)
+
+    def log_slow(self, request, response, metrics, total_ms):
+        lines = [
+            f"Slow request {request.method} {request.get_full_path()} -> {response.status_code} "
+            f"in {total_ms:.0f}ms: {metrics.query_count} queries ({metrics.db_ms:.0f}ms), "
+            f"serializer {metrics.serialize_ms:.0f}ms, cache {metrics.cache['hit']} hit {metrics.cache['miss']} miss"
+        ]
+        lines += [f"  {ms:7.1f}ms  {sql}" for sql, ms in metrics.queries]
+        if metrics.query_count > len(metrics.queries):
+            lines.append(f"  ... {metrics.query_count - len(metrics.queries)} more queries")
+        slow_logger.warning('\n'.join(lines))
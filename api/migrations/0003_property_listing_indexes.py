@@ -0,0 +1,33 @@
+# Generated by Django 4.2.16 on 2026-10-17 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_property_is_approved_userprofile_is_verified'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['created_at', 'id'], name='property_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['rental_amount', 'id'], name='property_rent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['status', 'is_approved', 'created_at', 'id'], name='property_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['status', 'is_approved', 'rental_amount', 'id'], name='property_status_rent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['district', 'status', 'rental_amount'], name='property_district_idx'),
+        ),
+    ]
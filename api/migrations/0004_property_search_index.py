@@ -0,0 +1,70 @@
+from django.db import migrations
+
+# The schema as of this migration, copied here so later changes to api.search
+# do not rewrite history. api.search.ensure_search_index recreates the SQLite
+# triggers after later migrations rebuild api_property.
+FTS_TABLE = 'api_property_fts'
+
+SQLITE_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        area, district, description,
+        content='api_property', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON api_property BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, area, district, description)
+        VALUES (new.id, new.area, new.district, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON api_property BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, area, district, description)
+        VALUES ('delete', old.id, old.area, old.district, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF area, district, description ON api_property BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, area, district, description)
+        VALUES ('delete', old.id, old.area, old.district, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, area, district, description)
+        VALUES (new.id, new.area, new.district, new.description);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 10.0, 1.0)')",
+]
+
+PG_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(area, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(district, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            schema_editor.execute(SQLITE_SCHEMA[0])
+        except Exception:
+            return  # No FTS5 in this SQLite build; api.search falls back to LIKE
+        for statement in SQLITE_SCHEMA[1:]:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS api_property_search_idx ON api_property USING GIN (({PG_VECTOR}))")
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS api_property_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_property_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
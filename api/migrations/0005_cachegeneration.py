@@ -0,0 +1,25 @@
+# Generated by Django 4.2.16 on 2026-10-17 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_property_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheGeneration',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('token', models.CharField(max_length=32)),
+                ('changed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Cache Generation',
+                'verbose_name_plural': 'Cache Generations',
+            },
+        ),
+    ]
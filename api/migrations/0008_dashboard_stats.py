@@ -0,0 +1,49 @@
+# Generated by Django 4.2.16 on 2026-10-17 02:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('api', '0007_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_properties', models.IntegerField(default=0)),
+                ('vacant_properties', models.IntegerField(default=0)),
+                ('occupied_properties', models.IntegerField(default=0)),
+                ('inactive_properties', models.IntegerField(default=0)),
+                ('favorites', models.IntegerField(default=0)),
+                ('unread_messages', models.IntegerField(default=0)),
+                ('baseline', models.JSONField(blank=True, default=dict)),
+                ('baseline_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'User Stats',
+                'verbose_name_plural': 'User Stats',
+            },
+        ),
+        migrations.AddField(
+            model_name='contactmessage',
+            name='is_read',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['property', '-created_at'], name='contact_property_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['tenant_email', '-created_at'], name='contact_tenant_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.16 on 2026-10-17 03:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_dashboard_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('total_properties', models.IntegerField(default=0)),
+                ('approved_properties', models.IntegerField(default=0)),
+                ('pending_approval', models.IntegerField(default=0)),
+                ('vacant_properties', models.IntegerField(default=0)),
+                ('occupied_properties', models.IntegerField(default=0)),
+                ('inactive_properties', models.IntegerField(default=0)),
+                ('vacancy_rate', models.FloatField(blank=True, null=True)),
+                ('total_users', models.IntegerField(default=0)),
+                ('total_landlords', models.IntegerField(default=0)),
+                ('registrations', models.JSONField(blank=True, default=list)),
+                ('most_viewed', models.JSONField(blank=True, default=list)),
+                ('duration_ms', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Report Snapshot',
+                'verbose_name_plural': 'Report Snapshots',
+            },
+        ),
+        migrations.CreateModel(
+            name='DistrictReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('district', models.CharField(max_length=100)),
+                ('listings', models.IntegerField(default=0)),
+                ('vacant', models.IntegerField(default=0)),
+                ('pending_approval', models.IntegerField(default=0)),
+                ('vacancy_rate', models.FloatField(blank=True, null=True)),
+                ('rent_p25', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('rent_median', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('rent_p75', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('rent_p90', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='districts', to='api.reportsnapshot')),
+            ],
+            options={
+                'verbose_name': 'District Report',
+                'verbose_name_plural': 'District Reports',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='districtreport',
+            constraint=models.UniqueConstraint(fields=('snapshot', 'district'), name='district_report_unique'),
+        ),
+    ]
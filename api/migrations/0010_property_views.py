@@ -0,0 +1,37 @@
+# Generated by Django 4.2.16 on 2026-10-17 03:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_report_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='property_views',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='PropertyViewDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='api.property')),
+            ],
+            options={
+                'verbose_name': 'Property Daily Views',
+                'verbose_name_plural': 'Property Daily Views',
+                'indexes': [models.Index(fields=['day', 'property'], name='property_view_day_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='propertyviewdaily',
+            constraint=models.UniqueConstraint(fields=('property', 'day'), name='property_view_day_unique'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+# Expression indexes on auth_user backing the case-insensitive lookups in
+# api.auth. On PostgreSQL the pattern ops also serve LIKE 'prefix%' searches.
+USER_LOOKUP_INDEXES = (
+    ('auth_user_username_lower_idx', 'username'),
+    ('auth_user_email_lower_idx', 'email'),
+)
+
+
+def create_lookup_indexes(apps, schema_editor):
+    pattern_ops = ' varchar_pattern_ops' if schema_editor.connection.vendor == 'postgresql' else ''
+    for name, column in USER_LOOKUP_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON auth_user (LOWER({column}){pattern_ops})')
+
+
+def drop_lookup_indexes(apps, schema_editor):
+    for name, _column in USER_LOOKUP_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('api', '0010_property_views'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_lookup_indexes, drop_lookup_indexes),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-17 03:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_auth_user_lower_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favoriteproperty',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='favorite_user_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-17 04:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_property_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='images_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
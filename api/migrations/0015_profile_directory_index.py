@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-17 04:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_property_images_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['is_landlord', 'user', 'is_verified'], name='profile_directory_idx'),
+        ),
+    ]
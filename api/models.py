@@ -1,5 +1,7 @@
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 class UserProfile(models.Model):
@@ -10,6 +12,10 @@ class UserProfile(models.Model):
     class Meta:
         verbose_name = _('User Profile')
         verbose_name_plural = _('Users Profiles')
+        indexes = [
+            # Tenant directory: one role in user id order, with is_verified read from the index.
+            models.Index(fields=['is_landlord', 'user', 'is_verified'], name='profile_directory_idx'),
+        ]
 
     def __str__(self):
         return self.user.username
@@ -29,23 +35,64 @@ class Property(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='vacant')
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='property_images/', null=True, blank=True)  # Primary image
+    image_variants = models.JSONField(default=dict, blank=True)  # Filled in by api.imaging
+    image_placeholder = models.TextField(blank=True)
+    images_version = models.PositiveIntegerField(default=0)  # Bumped on every PropertyImage change
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_approved = models.BooleanField(default=False)
+    latitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    geohash = models.CharField(max_length=12, blank=True, default='')  # Derived from latitude/longitude, see api.geo
 
     class Meta:
         verbose_name = _('Property')
         verbose_name_plural = 'Properties'
+        indexes = [
+            # Keyset pagination orderings: (field, id).
+            models.Index(fields=['created_at', 'id'], name='property_created_idx'),
+            models.Index(fields=['rental_amount', 'id'], name='property_rent_idx'),
+            # Public listing filters (status + approval) with each ordering.
+            models.Index(fields=['status', 'is_approved', 'created_at', 'id'], name='property_status_created_idx'),
+            models.Index(fields=['status', 'is_approved', 'rental_amount', 'id'], name='property_status_rent_idx'),
+            models.Index(fields=['district', 'status', 'rental_amount'], name='property_district_idx'),
+            # Bounding-box / radius range scans and map clustering (api.geo).
+            models.Index(fields=['latitude', 'longitude'], name='property_latlng_idx'),
+            models.Index(fields=['geohash'], name='property_geohash_idx'),
+        ]
 
     def __str__(self):
         return f"{self.area}, {self.district}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.sync_geohash()
+        elif {'latitude', 'longitude'} & set(update_fields):
+            self.sync_geohash()
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
+
+    def sync_geohash(self):
+        from .geo import encode
+        has_point = self.latitude is not None and self.longitude is not None
+        self.geohash = encode(self.latitude, self.longitude) if has_point else ''
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so api.stats can apply counter deltas on save.
+        instance._loaded_state = (instance.__dict__.get('landlord_id'), instance.__dict__.get('status'))
+        return instance
+
     def get_image_url(self):
         return self.image.url if self.image else ''
 
 class PropertyImage(models.Model):
     property = models.ForeignKey(Property, related_name='images', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='property_images/')
+    variants = models.JSONField(default=dict, blank=True)  # Filled in by api.imaging
+    placeholder = models.TextField(blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -64,6 +111,10 @@ class FavoriteProperty(models.Model):
         unique_together = ('user', 'property')
         verbose_name = _('Favorite Property')
         verbose_name_plural = _('Favorite Properties')
+        indexes = [
+            # Keyset pagination of a user's favorites, newest first.
+            models.Index(fields=['user', 'created_at', 'id'], name='favorite_user_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.property.area}"
@@ -73,11 +124,160 @@ class ContactMessage(models.Model):
     tenant_name = models.CharField(max_length=100)
     tenant_email = models.EmailField()
     message = models.TextField()
+    is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name = _('Contact Message')
         verbose_name_plural = _('Contact Messages')
+        indexes = [
+            models.Index(fields=['property', '-created_at'], name='contact_property_recent_idx'),
+            models.Index(fields=['tenant_email', '-created_at'], name='contact_tenant_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"Message from {self.tenant_name} for {self.property.area}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_is_read = instance.__dict__.get('is_read')
+        return instance
+
+class UserStats(models.Model):
+    """Dashboard counters per user, maintained incrementally by api.stats."""
+    COUNTERS = (
+        'total_properties', 'vacant_properties', 'occupied_properties',
+        'inactive_properties', 'favorites', 'unread_messages', 'property_views',
+    )
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    total_properties = models.IntegerField(default=0)
+    vacant_properties = models.IntegerField(default=0)
+    occupied_properties = models.IntegerField(default=0)
+    inactive_properties = models.IntegerField(default=0)
+    favorites = models.IntegerField(default=0)
+    unread_messages = models.IntegerField(default=0)
+    property_views = models.IntegerField(default=0)  # Views of the user's listings, see api.viewcounter
+    baseline = models.JSONField(default=dict, blank=True)  # Counter values at baseline_at, for trends
+    baseline_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('User Stats')
+        verbose_name_plural = _('User Stats')
+
+    def __str__(self):
+        return f"Stats for user {self.user_id}"
+
+class PropertyViewDaily(models.Model):
+    """Detail-page views per property per day, upserted in batches by api.viewcounter."""
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='daily_views')
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _('Property Daily Views')
+        verbose_name_plural = _('Property Daily Views')
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'day'], name='property_view_day_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'property'], name='property_view_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.property_id} on {self.day}: {self.views}"
+
+class OutboundEmail(models.Model):
+    """A notification waiting to be delivered by the outbox sender (api.outbox)."""
+    STATUS_CHOICES = (
+        ('pending', _('Pending')),
+        ('sent', _('Sent')),
+        ('failed', _('Failed')),
+    )
+    contact_message = models.ForeignKey(ContactMessage, on_delete=models.SET_NULL, null=True, blank=True, related_name='emails')
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.TextField()  # Comma-separated recipients
+    reply_to = models.CharField(max_length=254, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('Outbound Email')
+        verbose_name_plural = _('Outbound Emails')
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {self.to} ({self.status})"
+
+class CacheGeneration(models.Model):
+    """
+    Shared invalidation token for cached responses.
+
+    Cache keys embed the current token, so replacing it invalidates every
+    entry in every worker regardless of which cache backend is configured.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    token = models.CharField(max_length=32)
+    changed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Cache Generation')
+        verbose_name_plural = _('Cache Generations')
+
+    def __str__(self):
+        return f"{self.name}: {self.token}"
+
+class ReportSnapshot(models.Model):
+    """Point-in-time admin report totals, built by api.reports.build_snapshot."""
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    total_properties = models.IntegerField(default=0)
+    approved_properties = models.IntegerField(default=0)
+    pending_approval = models.IntegerField(default=0)
+    vacant_properties = models.IntegerField(default=0)
+    occupied_properties = models.IntegerField(default=0)
+    inactive_properties = models.IntegerField(default=0)
+    vacancy_rate = models.FloatField(null=True, blank=True)
+    total_users = models.IntegerField(default=0)
+    total_landlords = models.IntegerField(default=0)
+    registrations = models.JSONField(default=list, blank=True)  # [[ISO date, new users], ...]
+    most_viewed = models.JSONField(default=list, blank=True)  # [[property id, views], ...], most viewed first
+    duration_ms = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = _('Report Snapshot')
+        verbose_name_plural = _('Report Snapshots')
+
+    def __str__(self):
+        return f"Report at {self.created_at:%Y-%m-%d %H:%M}"
+
+class DistrictReport(models.Model):
+    """Per-district listing and rent figures belonging to a ReportSnapshot."""
+    snapshot = models.ForeignKey(ReportSnapshot, on_delete=models.CASCADE, related_name='districts')
+    district = models.CharField(max_length=100)
+    listings = models.IntegerField(default=0)
+    vacant = models.IntegerField(default=0)
+    pending_approval = models.IntegerField(default=0)
+    vacancy_rate = models.FloatField(null=True, blank=True)
+    rent_p25 = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    rent_median = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    rent_p75 = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    rent_p90 = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('District Report')
+        verbose_name_plural = _('District Reports')
+        constraints = [
+            models.UniqueConstraint(fields=['snapshot', 'district'], name='district_report_unique'),
+        ]
 
     def __str__(self):
-        return f"Message from {self.tenant_name} for {self.property.area}"
\ No newline at end of file
+        return f"{self.district} ({self.snapshot_id})"
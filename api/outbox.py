@@ -0,0 +1,119 @@
+"""
+Transactional email outbox.
+
+Requests only insert OutboundEmail rows, in the same transaction as the data
+they describe. ``drain_outbox`` (run by ``manage.py send_outbox``) delivers
+due rows in batches over one reused connection from the configured
+EMAIL_BACKEND, retrying failures with exponential backoff.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def contact_recipients(contact_message):
+    """Route an inquiry to the property's landlord, falling back to the shared inbox."""
+    landlord_email = contact_message.property.landlord.email
+    return [landlord_email] if landlord_email else [settings.CONTACT_FALLBACK_EMAIL]
+
+
+def enqueue_contact_notification(contact_message):
+    body = (
+        f"From: {contact_message.tenant_name} ({contact_message.tenant_email})\n"
+        f"Property ID: {contact_message.property_id}\n"
+        f"Property: {contact_message.property}\n"
+        f"Message: {contact_message.message}\n"
+    )
+    return OutboundEmail.objects.create(
+        contact_message=contact_message,
+        subject=_('New Contact Message'),
+        body=body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=','.join(contact_recipients(contact_message)),
+        reply_to=contact_message.tenant_email,
+    )
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'OUTBOX_RETRY_BASE_SECONDS', 30)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), 6 * 60 * 60))
+
+
+def claim_batch(batch_size):
+    """
+    Lease up to ``batch_size`` due emails.
+
+    Pushing next_attempt_at forward hides the rows from concurrent senders
+    while this one works; if it dies, they become due again after the lease.
+    """
+    now = timezone.now()
+    lease = getattr(settings, 'OUTBOX_LEASE_SECONDS', 300)
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        OutboundEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+            next_attempt_at=now + timedelta(seconds=lease)
+        )
+    return batch
+
+
+def build_message(email, connection):
+    return EmailMessage(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=[address for address in email.to.split(',') if address],
+        reply_to=[email.reply_to] if email.reply_to else None,
+        connection=connection,
+    )
+
+
+def drain_outbox(batch_size=None, connection=None):
+    """Send one batch of due emails. Returns (sent, failed) counts."""
+    batch = claim_batch(batch_size or getattr(settings, 'OUTBOX_BATCH_SIZE', 50))
+    if not batch:
+        return 0, 0
+    max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 8)
+    connection = connection or get_connection(fail_silently=False)
+    sent_ids, failed = [], 0
+    try:
+        connection.open()
+        for email in batch:
+            try:
+                connection.send_messages([build_message(email, connection)])
+            except Exception as e:
+                failed += 1
+                attempts = email.attempts + 1
+                logger.error("Outbox email %s failed (attempt %s): %s", email.pk, attempts, e)
+                OutboundEmail.objects.filter(pk=email.pk).update(
+                    attempts=attempts,
+                    last_error=str(e)[:1000],
+                    status='failed' if attempts >= max_attempts else 'pending',
+                    next_attempt_at=timezone.now() + retry_delay(attempts),
+                )
+                # The connection may be unusable after an SMTP error; start a fresh one.
+                connection.close()
+                connection.open()
+            else:
+                sent_ids.append(email.pk)
+    finally:
+        if sent_ids:
+            OutboundEmail.objects.filter(pk__in=sent_ids).update(
+                status='sent', sent_at=timezone.now(), attempts=F('attempts') + 1, last_error='',
+            )
+        connection.close()
+    logger.info("Outbox batch delivered %s emails, %s failed", len(sent_ids), failed)
+    return len(sent_ids), failed
@@ -0,0 +1,144 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on (ordering field, pk).
+
+    Each cursor encodes the position of the last row seen, so fetching a page
+    is an index range scan no matter how deep it is. Pagination is opt-in:
+    it is only applied when the client sends ``page_size`` or ``cursor``.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    orderings = ('created_at', '-created_at')
+    default_ordering = 'created_at'
+    invalid_cursor_message = _('Invalid cursor')
+
+    def is_enabled(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(self.ordering_query_param, self.default_ordering)
+        return ordering if ordering in self.orderings else self.default_ordering
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_enabled(request):
+            return None
+        return self.paginate_rows(list(self.page_queryset(queryset, request)))
+
+    def page_queryset(self, queryset, request):
+        """The unevaluated query for the requested page, one row longer to detect more."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request)
+        self.field = self.ordering.lstrip('-')
+        descending = self.ordering.startswith('-')
+        self.limit = self.get_page_size(request)
+
+        self.cursor = cursor = self.decode_cursor(request, queryset.model)
+        self.reverse = cursor is not None and cursor['reverse']
+        if self.reverse:
+            descending = not descending
+
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(prefix + self.field, prefix + 'pk')
+        if cursor is not None:
+            lookup = 'lt' if descending else 'gt'
+            # The inclusive bound on the leading column gives the planner an
+            # index range; the OR only breaks ties within that range.
+            queryset = queryset.filter(**{f'{self.field}__{lookup}e': cursor['value']}).filter(
+                Q(**{f'{self.field}__{lookup}': cursor['value']}) | Q(**{f'pk__{lookup}': cursor['pk']})
+            )
+        return queryset[:self.limit + 1]
+
+    def paginate_rows(self, results):
+        """Trim the rows fetched from ``page_queryset`` to the page and work out the links."""
+        has_more = len(results) > self.limit
+        results = results[:self.limit]
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        self.page = results
+        return results
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if payload['o'] != self.ordering:
+                raise ValueError('cursor belongs to another ordering')
+            value = model._meta.get_field(self.field).to_python(payload['v'])
+            return {'value': value, 'pk': int(payload['pk']), 'reverse': bool(payload.get('r'))}
+        except (KeyError, TypeError, ValueError, ValidationError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverse=False):
+        value = getattr(obj, self.field)
+        payload = {'o': self.ordering, 'v': value.isoformat() if hasattr(value, 'isoformat') else str(value), 'pk': obj.pk}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+        return encoded.decode('ascii').rstrip('=')
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.page[0], reverse=True))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class PropertyCursorPagination(KeysetPagination):
+    orderings = ('created_at', '-created_at', 'rental_amount', '-rental_amount')
+
+
+class FavoriteCursorPagination(KeysetPagination):
+    orderings = ('-created_at', 'created_at')
+    default_ordering = '-created_at'
+
+
+class UserCursorPagination(KeysetPagination):
+    """Always on: a user directory is too large to return whole."""
+    orderings = ('id', '-id', 'username', '-username')
+    default_ordering = 'id'
+
+    def is_enabled(self, request):
+        return True
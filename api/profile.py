@@ -16,7 +16,7 @@ class ProfileView(APIView):
             serializer = UserSerializer(request.user)
             return Response(serializer.data)
         except Exception as e:
-            logger.error(f"Profile GET error: {str(e)}")
+            logger.error("Profile GET error: %s", e)
             return Response({"error": "Failed to fetch profile."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
     def put(self, request):
@@ -27,5 +27,5 @@ class ProfileView(APIView):
                 return Response(serializer.data)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-            logger.error(f"Profile PUT error: {str(e)}")
+            logger.error("Profile PUT error: %s", e)
             return Response({"error": "Failed to update profile."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""
+Read replicas with read-your-writes consistency.
+
+DATABASE_REPLICA_URLS adds replica aliases (settings.DATABASE_REPLICAS).
+For GET/HEAD requests ReplicaRoutingMiddleware picks one replica for the
+whole request, and ReplicaRouter sends reads of the listing, favorite and
+report models there. Writes, reads of every other model, and everything in
+unsafe requests use the primary.
+
+After a client writes, its reads stay on the primary for REPLICA_PIN_SECONDS,
+so a landlord sees their own edit straight away. The pin is kept in a cookie
+and, for token clients whose cross-site requests carry no cookies, under the
+user id from the JWT in the REPLICA_PIN_CACHE_ALIAS cache. That cache must be
+shared by every worker, since the next request may land on another one, so a
+per-process locmem cache is rejected when replicas are configured.
+
+CacheGeneration is read from the same replica as the data. The response
+cache key and the cached body then always describe the same replica state,
+and a lagging replica cannot store an old body under a new token.
+"""
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .auth import CachedJWTAuthentication
+
+REPLICATED_MODELS = {
+    'api.property', 'api.propertyimage', 'api.favoriteproperty', 'api.propertyviewdaily',
+    'api.reportsnapshot', 'api.districtreport', 'api.cachegeneration',
+}
+PIN_COOKIE = 'db_pin'
+
+# The replica alias reads go to in the current request, or None for the primary.
+read_alias = ContextVar('read_alias', default=None)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+
+def pin_cache():
+    return caches[getattr(settings, 'REPLICA_PIN_CACHE_ALIAS', 'default')]
+
+
+def pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def token_user_id(request):
+    """The user id claim of a valid bearer token, without touching the database."""
+    authenticator = CachedJWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None
+    try:
+        return authenticator.get_user_id(authenticator.get_validated_token(raw_token))
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return None
+
+
+def cookie_pinned(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = read_alias.get()
+        if alias is not None and model._meta.label_lower in REPLICATED_MODELS:
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Explicit, so instances loaded from a replica are saved to the primary.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema from the primary.
+        return False if db in replica_aliases() else None
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        if replica_aliases() and isinstance(pin_cache(), LocMemCache):
+            raise ImproperlyConfigured(
+                "Read replicas need a cache shared by every worker for REPLICA_PIN_CACHE_ALIAS; "
+                "locmem is per process. Set CACHE_BACKEND=db (or file on a single host)."
+            )
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not replica_aliases():
+            return self.get_response(request)
+        user_id = token_user_id(request)
+        pinned = user_id is not None and pin_cache().get(pin_key(user_id)) is not None
+        token = read_alias.set(self.choose_alias(request, pinned))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        if self.wrote(request, response):
+            self.pin(response)
+            if user_id is not None:
+                pin_cache().set(pin_key(user_id), 1, pin_seconds())
+        return response
+
+    async def __acall__(self, request):
+        if not replica_aliases():
+            return await self.get_response(request)
+        user_id = token_user_id(request)
+        pinned = user_id is not None and await pin_cache().aget(pin_key(user_id)) is not None
+        token = read_alias.set(self.choose_alias(request, pinned))
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        if self.wrote(request, response):
+            self.pin(response)
+            if user_id is not None:
+                await pin_cache().aset(pin_key(user_id), 1, pin_seconds())
+        return response
+
+    def choose_alias(self, request, pinned):
+        if request.method not in SAFE_METHODS or pinned or cookie_pinned(request):
+            return None
+        return random.choice(replica_aliases())
+
+    def wrote(self, request, response):
+        return request.method not in SAFE_METHODS and response.status_code < 400
+
+    def pin(self, response):
+        seconds = pin_seconds()
+        response.set_cookie(
+            PIN_COOKIE, f'{time.time() + seconds:.0f}', max_age=seconds, httponly=True,
+            secure=settings.SESSION_COOKIE_SECURE, samesite='Lax',
+        )
@@ -0,0 +1,155 @@
+"""
+Admin report snapshots.
+
+``build_snapshot`` computes every report figure in a handful of grouped
+queries and stores the result as one ReportSnapshot plus a DistrictReport
+row per district. ReportView serves the latest snapshot, so /api/reports/
+costs the same at any dataset size; older snapshots form the history.
+Snapshots are built by ``manage.py build_report_snapshot`` (or ``--loop``).
+"""
+import logging
+import time
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from itertools import groupby
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, Prefetch, Q, Sum, prefetch_related_objects
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DistrictReport, Property, PropertyViewDaily, ReportSnapshot, UserProfile
+
+logger = logging.getLogger(__name__)
+
+CENTS = Decimal('0.01')
+
+
+def percentile(values, q):
+    """Linear-interpolated percentile of an ascending list (q in 0..100)."""
+    if not values:
+        return None
+    position = (len(values) - 1) * Decimal(q) / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    value = values[lower] + (values[upper] - values[lower]) * (position - lower)
+    return value.quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def vacancy_rate(vacant, occupied):
+    """Share of let-able (vacant or occupied) listings that are vacant."""
+    return round(vacant / (vacant + occupied), 4) if vacant + occupied else None
+
+
+def property_totals():
+    return Property.objects.aggregate(
+        total=Count('id'),
+        approved=Count('id', filter=Q(is_approved=True)),
+        pending=Count('id', filter=Q(is_approved=False)),
+        vacant=Count('id', filter=Q(status='vacant')),
+        occupied=Count('id', filter=Q(status='occupied')),
+        inactive=Count('id', filter=Q(status='inactive')),
+    )
+
+
+def district_rows(snapshot):
+    """
+    Build DistrictReport rows from one ordered pass over (district, rent).
+
+    Percentiles are computed in Python so the same code runs on SQLite and
+    PostgreSQL; only the rents of one district are held in memory at a time.
+    """
+    rows = (
+        Property.objects.order_by('district', 'rental_amount')
+        .values_list('district', 'rental_amount', 'status', 'is_approved')
+    )
+    for district, listings in groupby(rows.iterator(chunk_size=2000), key=lambda row: row[0]):
+        rents, vacant, occupied, pending = [], 0, 0, 0
+        for _district, rent, status, is_approved in listings:
+            rents.append(rent)
+            vacant += status == 'vacant'
+            occupied += status == 'occupied'
+            pending += not is_approved
+        yield DistrictReport(
+            snapshot=snapshot,
+            district=district,
+            listings=len(rents),
+            vacant=vacant,
+            pending_approval=pending,
+            vacancy_rate=vacancy_rate(vacant, occupied),
+            rent_p25=percentile(rents, 25),
+            rent_median=percentile(rents, 50),
+            rent_p75=percentile(rents, 75),
+            rent_p90=percentile(rents, 90),
+        )
+
+
+def registrations_per_day(days):
+    since = (timezone.now() - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    rows = (
+        User.objects.filter(date_joined__gte=since)
+        .annotate(day=TruncDate('date_joined'))
+        .order_by('day').values('day').annotate(count=Count('id'))
+    )
+    return [[row['day'].isoformat(), row['count']] for row in rows]
+
+
+def most_viewed(days, limit=10):
+    """[[property id, views], ...] for the most viewed listings over the last ``days`` days."""
+    rows = (
+        PropertyViewDaily.objects.filter(day__gte=timezone.localdate() - timedelta(days=days - 1))
+        .values('property_id').annotate(total=Sum('views')).order_by('-total', 'property_id')[:limit]
+    )
+    return [[row['property_id'], row['total']] for row in rows]
+
+
+def build_snapshot():
+    started = time.monotonic()
+    totals = property_totals()
+    snapshot = ReportSnapshot(
+        total_properties=totals['total'],
+        approved_properties=totals['approved'],
+        pending_approval=totals['pending'],
+        vacant_properties=totals['vacant'],
+        occupied_properties=totals['occupied'],
+        inactive_properties=totals['inactive'],
+        vacancy_rate=vacancy_rate(totals['vacant'], totals['occupied']),
+        total_users=User.objects.count(),
+        total_landlords=UserProfile.objects.filter(is_landlord=True).count(),
+        registrations=registrations_per_day(getattr(settings, 'REPORT_REGISTRATION_DAYS', 30)),
+        most_viewed=most_viewed(getattr(settings, 'REPORT_MOST_VIEWED_DAYS', 30)),
+    )
+    with transaction.atomic():
+        snapshot.save()
+        DistrictReport.objects.bulk_create(district_rows(snapshot), batch_size=500)
+        snapshot.duration_ms = int((time.monotonic() - started) * 1000)
+        snapshot.save(update_fields=['duration_ms'])
+    logger.info("Built report snapshot %s in %sms", snapshot.pk, snapshot.duration_ms)
+    return snapshot
+
+
+def prune_snapshots(keep_days=None):
+    keep_days = keep_days or getattr(settings, 'REPORT_SNAPSHOT_RETENTION_DAYS', 90)
+    latest = ReportSnapshot.objects.order_by('-created_at').values_list('pk', flat=True).first()
+    deleted, _ = (
+        ReportSnapshot.objects.filter(created_at__lt=timezone.now() - timedelta(days=keep_days))
+        .exclude(pk=latest).delete()
+    )
+    return deleted
+
+
+def latest_snapshot():
+    """The newest snapshot with its district rows, building one if none exists yet."""
+    snapshot = ReportSnapshot.objects.order_by('-created_at').prefetch_related('districts').first()
+    if snapshot is None:
+        # Not read back: on a GET that read may go to a replica without the new rows.
+        snapshot = build_snapshot()
+        prefetch_related_objects([snapshot], Prefetch('districts', DistrictReport.objects.using(DEFAULT_DB_ALIAS)))
+    return snapshot
+
+
+def snapshot_is_stale(snapshot):
+    max_age = getattr(settings, 'REPORT_SNAPSHOT_MAX_AGE', 3600)
+    return timezone.now() - snapshot.created_at > timedelta(seconds=max_age)
@@ -0,0 +1,188 @@
+"""
+Full-text search over property area, district and description.
+
+SQLite uses an external-content FTS5 table kept in sync by triggers; Postgres
+uses a GIN index over a weighted tsvector expression. Query terms are matched
+as prefixes and expanded with close spellings of known place names, so
+"masru" or "mohales" still find Maseru and Mohale's Hoek.
+"""
+import difflib
+import logging
+import re
+import unicodedata
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Property
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'api_property_fts'
+VOCABULARY_CACHE_KEY = 'search:place-vocabulary'
+VOCABULARY_TIMEOUT = 600
+MIN_TERM_LENGTH = 2
+MAX_TERMS = 8
+
+# Lesotho's districts, so typo expansion works before any listing exists.
+DISTRICTS = (
+    'Berea', 'Butha-Buthe', 'Leribe', 'Mafeteng', 'Maseru',
+    "Mohale's Hoek", 'Mokhotlong', "Qacha's Nek", 'Quthing', 'Thaba-Tseka',
+)
+
+PG_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(area, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(district, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+SQLITE_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        area, district, description,
+        content='api_property', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON api_property BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, area, district, description)
+        VALUES (new.id, new.area, new.district, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON api_property BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, area, district, description)
+        VALUES ('delete', old.id, old.area, old.district, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF area, district, description ON api_property BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, area, district, description)
+        VALUES ('delete', old.id, old.area, old.district, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, area, district, description)
+        VALUES (new.id, new.area, new.district, new.description);
+    END""",
+]
+
+_available = {}
+
+
+def ensure_search_index(using=None, **kwargs):
+    """
+    Create the text index if it is missing. Safe to call repeatedly.
+
+    SQLite drops triggers whenever a migration rebuilds ``api_property``, so
+    this also runs after every ``migrate`` and reindexes when it had to
+    recreate them.
+    """
+    conn = connections[using or 'default']
+    _available.pop(conn.alias, None)
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.execute("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s", [f'{FTS_TABLE}_%'])
+            if cursor.fetchone()[0] == 3:
+                return
+            try:
+                for statement in SQLITE_SCHEMA:
+                    cursor.execute(statement)
+            except Exception as e:
+                logger.error("SQLite FTS5 unavailable, falling back to LIKE search: %s", e)
+                return
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 10.0, 1.0)')")
+        elif conn.vendor == 'postgresql':
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS api_property_search_idx ON api_property USING GIN (({PG_VECTOR}))")
+
+
+def fts_available(conn):
+    if conn.vendor == 'postgresql':
+        return True
+    if conn.vendor != 'sqlite':
+        return False
+    if conn.alias not in _available:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+            _available[conn.alias] = cursor.fetchone()[0] > 0
+    return _available[conn.alias]
+
+
+def normalize(text):
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+    terms = [t for t in re.findall(r'\w+', normalize(text)) if len(t) >= MIN_TERM_LENGTH]
+    return list(dict.fromkeys(terms))[:MAX_TERMS]
+
+
+def place_vocabulary():
+    vocabulary = cache.get(VOCABULARY_CACHE_KEY)
+    if vocabulary is None:
+        words = set()
+        for name in DISTRICTS:
+            words.update(tokenize(name))
+        for district, area in Property.objects.values_list('district', 'area').distinct().iterator():
+            words.update(tokenize(f'{district} {area}'))
+        vocabulary = sorted(words)
+        cache.set(VOCABULARY_CACHE_KEY, vocabulary, VOCABULARY_TIMEOUT)
+    return vocabulary
+
+
+def expand_terms(terms):
+    """Map each query term to itself plus close spellings of known place names."""
+    vocabulary = place_vocabulary()
+    expanded = []
+    for term in terms:
+        variants = [term] + difflib.get_close_matches(term, vocabulary, n=3, cutoff=0.75)
+        expanded.append(list(dict.fromkeys(variants)))
+    return expanded
+
+
+def search_properties(queryset, query, rank=True):
+    """
+    Filter ``queryset`` to properties matching ``query`` and, with ``rank``,
+    annotate each row with ``search_rank`` (higher is more relevant).
+
+    The text index is read from the database the queryset reads from, which
+    may be a replica.
+    """
+    conn = connections[queryset.db]
+    terms = tokenize(query)
+    if not terms:
+        queryset = queryset.none()
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())) if rank else queryset
+    groups = expand_terms(terms)
+    if not fts_available(conn):
+        condition = Q()
+        for group in groups:
+            group_q = Q()
+            for term in group:
+                group_q |= Q(area__icontains=term) | Q(district__icontains=term) | Q(description__icontains=term)
+            condition &= group_q
+        queryset = queryset.filter(condition)
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())) if rank else queryset
+
+    if conn.vendor == 'postgresql':
+        tsquery = ' & '.join('(' + ' | '.join(f'{term}:*' for term in group) + ')' for group in groups)
+        queryset = queryset.filter(
+            RawSQL(f"({PG_VECTOR}) @@ to_tsquery('simple', %s)", [tsquery], output_field=BooleanField())
+        )
+        if rank:
+            queryset = queryset.annotate(
+                search_rank=RawSQL(f"ts_rank(({PG_VECTOR}), to_tsquery('simple', %s))", [tsquery], output_field=FloatField())
+            )
+        return queryset
+
+    match = ' AND '.join('(' + ' OR '.join(f'"{term}"*' for term in group) + ')' for group in groups)
+    queryset = queryset.filter(id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]))
+    if not rank:
+        return queryset
+    # FTS5 rank is bm25, where lower is better. The matches are ranked once
+    # into a materialized CTE that each row looks up, rather than re-running
+    # MATCH per row; SQLite before 3.35 lacks the keyword and may inline it.
+    materialized = 'MATERIALIZED' if conn.Database.sqlite_version_info >= (3, 35) else ''
+    table = Property._meta.db_table
+    return queryset.annotate(
+        search_rank=RawSQL(
+            f'WITH ranked AS {materialized} (SELECT rowid, -rank AS score FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s) '
+            f'SELECT score FROM ranked WHERE ranked.rowid = "{table}"."id"',
+            [match], output_field=FloatField(),
+        )
+    )
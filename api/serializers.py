@@ -1,7 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from .models import Property, FavoriteProperty, ContactMessage, UserProfile, PropertyImage
+from django.core.files.storage import default_storage
+from .fragments import PER_REQUEST_FIELDS, Fragment, dumps, fragment_cache
+from .metrics import TimedDataMixin
+from .models import Property, FavoriteProperty, ContactMessage, UserProfile, PropertyImage, ReportSnapshot, DistrictReport
 
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -48,13 +51,28 @@ class UserSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
+def build_srcset(variants, request):
+    """Map {size: {format: absolute url, width, height}} from stored variant names."""
+    if not request:
+        return {}
+    srcset = {}
+    for size, variant in variants.items():
+        if size == 'source':
+            continue
+        srcset[size] = {
+            key: request.build_absolute_uri(default_storage.url(value)) if key not in ('width', 'height') else value
+            for key, value in variant.items()
+        }
+    return srcset
+
 class PropertyImageSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = PropertyImage
-        fields = ['id', 'image', 'image_url', 'uploaded_at']
-        read_only_fields = ['id', 'uploaded_at', 'image_url']
+        fields = ['id', 'image', 'image_url', 'srcset', 'placeholder', 'uploaded_at']
+        read_only_fields = ['id', 'uploaded_at', 'image_url', 'srcset', 'placeholder']
 
     def get_image_url(self, obj):
         request = self.context.get('request')
@@ -62,6 +80,9 @@ class PropertyImageSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.image.url)
         return None
 
+    def get_srcset(self, obj):
+        return build_srcset(obj.variants, self.context.get('request'))
+
     def validate_image(self, value):
         valid_formats = ['image/jpeg', 'image/png']
         if value.content_type not in valid_formats:
@@ -70,16 +91,99 @@ class PropertyImageSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Image size must be less than 5MB.")
         return value
 
-class PropertySerializer(serializers.ModelSerializer):
+def wants_field(context, name):
+    fieldset = context.get('fieldset')
+    return fieldset is None or fieldset.wants(name)
+
+def prime_favorite_ids(context, property_ids):
+    """Load the requesting user's favorites for a batch of properties in one query."""
+    request = context.get('request')
+    if request and request.user.is_authenticated and wants_field(context, 'is_favorited'):
+        context['favorite_ids'] = set(
+            FavoriteProperty.objects.filter(user=request.user, property_id__in=property_ids)
+            .values_list('property_id', flat=True)
+        )
+    else:
+        context['favorite_ids'] = set()
+
+def validate_property_amounts(data):
+    if 'rental_amount' in data and data['rental_amount'] <= 0:
+        raise serializers.ValidationError({"rental_amount": "Rental amount must be greater than 0."})
+    if 'deposit' in data and data['deposit'] is not None and data['deposit'] < 0:
+        raise serializers.ValidationError({"deposit": "Deposit cannot be negative."})
+    if 'viewing_fee' in data and data['viewing_fee'] is not None and data['viewing_fee'] < 0:
+        raise serializers.ValidationError({"viewing_fee": "Viewing fee cannot be negative."})
+    return data
+
+class PropertyListSerializer(TimedDataMixin, serializers.ListSerializer):
+    def to_representation(self, data):
+        properties = list(data.all() if hasattr(data, 'all') else data)
+        if 'favorite_ids' not in self.context:  # Async views load them up front
+            prime_favorite_ids(self.context, [obj.pk for obj in properties])
+        return super().to_representation(properties)
+
+class PropertyLandlordSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username']
+
+class PropertySerializer(TimedDataMixin, serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     landlord_username = serializers.CharField(source='landlord.username', read_only=True)
     images = PropertyImageSerializer(many=True, read_only=True)
+    distance_km = serializers.SerializerMethodField()
 
     class Meta:
         model = Property
-        fields = ['id', 'landlord', 'landlord_username', 'area', 'district', 'rental_amount', 'deposit', 'viewing_fee', 'status', 'description', 'is_favorited', 'image_url', 'images', 'is_approved']
-        read_only_fields = ['landlord', 'image_url', 'images', 'is_approved']
+        fields = ['id', 'landlord', 'landlord_username', 'area', 'district', 'rental_amount', 'deposit', 'viewing_fee', 'status', 'description', 'latitude', 'longitude', 'distance_km', 'is_favorited', 'image_url', 'image_srcset', 'image_placeholder', 'images', 'is_approved']
+        read_only_fields = ['landlord', 'image_url', 'image_srcset', 'image_placeholder', 'images', 'is_approved']
+        list_serializer_class = PropertyListSerializer
+
+    def get_fields(self):
+        # Sparse fieldsets and expansion; see api.fieldsets.
+        fields = super().get_fields()
+        fieldset = self.context.get('fieldset')
+        if not fieldset:
+            return fields
+        if 'landlord' in fieldset.expand:
+            fields['landlord'] = PropertyLandlordSerializer(read_only=True)
+        if fieldset.fields is not None:
+            fields = {name: field for name, field in fields.items() if name in fieldset.fields}
+        return fields
+
+    def to_representation(self, instance):
+        # Served from the fragment cache when enabled; see api.fragments.
+        if not fragment_cache.max_bytes:
+            return super().to_representation(instance)
+        key = self.fragment_key(instance)
+        raw = fragment_cache.get(key)
+        if raw is None:
+            data = super().to_representation(instance)
+            overlay = {name: data.pop(name) for name in PER_REQUEST_FIELDS if name in data}
+            raw = dumps(data)
+            fragment_cache.set(key, raw)
+            return Fragment(raw, overlay)
+        overlay = {}
+        for name in PER_REQUEST_FIELDS:
+            field = self.fields.get(name)
+            if field is not None:
+                overlay[name] = field.to_representation(field.get_attribute(instance))
+        return Fragment(raw, overlay)
+
+    def fragment_key(self, instance):
+        # Everything the cached part of the representation depends on.
+        if not hasattr(self, '_fragment_shape'):
+            request = self.context.get('request')
+            expanded = isinstance(self.fields.get('landlord'), PropertyLandlordSerializer)
+            self._fragment_shape = (
+                tuple(self.fields), expanded,
+                expanded or 'landlord_username' in self.fields,
+                request.build_absolute_uri('/') if request else None,
+            )
+        landlord = instance.landlord.username if self._fragment_shape[2] else None
+        return (instance.pk, instance.updated_at, instance.images_version, landlord, *self._fragment_shape)
 
     def get_image_url(self, obj):
         request = self.context.get('request')
@@ -87,22 +191,48 @@ class PropertySerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.image.url)
         return None
 
+    def get_distance_km(self, obj):
+        # Only set on ?near= queries (api.geo.near).
+        distance = getattr(obj, 'distance_km', None)
+        return round(distance, 3) if distance is not None else None
+
+    def get_image_srcset(self, obj):
+        return build_srcset(obj.image_variants, self.context.get('request'))
+
     def get_is_favorited(self, obj):
+        favorite_ids = self.context.get('favorite_ids')
+        if favorite_ids is not None:
+            return obj.pk in favorite_ids
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return FavoriteProperty.objects.filter(user=request.user, property=obj).exists()
         return False
 
     def validate(self, data):
-        if 'rental_amount' in data and data['rental_amount'] <= 0:
-            raise serializers.ValidationError({"rental_amount": "Rental amount must be greater than 0."})
-        if 'deposit' in data and data['deposit'] is not None and data['deposit'] < 0:
-            raise serializers.ValidationError({"deposit": "Deposit cannot be negative."})
-        if 'viewing_fee' in data and data['viewing_fee'] is not None and data['viewing_fee'] < 0:
-            raise serializers.ValidationError({"viewing_fee": "Viewing fee cannot be negative."})
-        return data
-
-class FavoritePropertySerializer(serializers.ModelSerializer):
+        return validate_property_amounts(data)
+
+class PropertyImportSerializer(serializers.ModelSerializer):
+    """Validates one bulk-import row (see api.bulk) with PropertySerializer's rules."""
+
+    class Meta:
+        model = Property
+        fields = ['area', 'district', 'rental_amount', 'deposit', 'viewing_fee', 'status', 'description', 'latitude', 'longitude', 'is_approved']
+
+    def validate(self, data):
+        return validate_property_amounts(data)
+
+class FavoritePropertyListSerializer(TimedDataMixin, serializers.ListSerializer):
+    def to_representation(self, data):
+        favorites = list(data.all() if hasattr(data, 'all') else data)
+        request = self.context.get('request')
+        if request and request.user.is_authenticated and all(f.user_id == request.user.pk for f in favorites):
+            # The rows themselves are the user's favorite set; no lookup needed.
+            self.context['favorite_ids'] = {favorite.property_id for favorite in favorites}
+        else:
+            prime_favorite_ids(self.context, [favorite.property_id for favorite in favorites])
+        return super().to_representation(favorites)
+
+class FavoritePropertySerializer(TimedDataMixin, serializers.ModelSerializer):
     property = serializers.PrimaryKeyRelatedField(queryset=Property.objects.all(), write_only=True)
     property_detail = PropertySerializer(source='property', read_only=True)
 
@@ -110,8 +240,22 @@ class FavoritePropertySerializer(serializers.ModelSerializer):
         model = FavoriteProperty
         fields = ['id', 'user', 'property', 'property_detail']
         read_only_fields = ['user', 'property_detail']
+        list_serializer_class = FavoritePropertyListSerializer
+
+class DistrictReportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DistrictReport
+        fields = ['district', 'listings', 'vacant', 'pending_approval', 'vacancy_rate', 'rent_p25', 'rent_median', 'rent_p75', 'rent_p90']
+
+class ReportSnapshotSerializer(serializers.ModelSerializer):
+    generated_at = serializers.DateTimeField(source='created_at', read_only=True)
+
+    class Meta:
+        model = ReportSnapshot
+        fields = ['id', 'generated_at', 'total_properties', 'approved_properties', 'pending_approval', 'vacant_properties', 'occupied_properties', 'inactive_properties', 'vacancy_rate', 'total_users', 'total_landlords']
 
 class ContactMessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ContactMessage
-        fields = ['id', 'property', 'tenant_name', 'tenant_email', 'message']
\ No newline at end of file
+        fields = ['id', 'property', 'tenant_name', 'tenant_email', 'message', 'is_read']
+        read_only_fields = ['is_read']
\ No newline at end of file
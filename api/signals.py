@@ -0,0 +1,107 @@
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import imaging, stats
+from .auth import user_state_cache
+from .cache import LIST_GENERATION, bump_generations, property_generation
+from .models import ContactMessage, FavoriteProperty, Property, PropertyImage, UserProfile, UserStats
+
+
+@receiver([post_save, post_delete], sender=Property)
+def invalidate_property_cache(sender, instance, **kwargs):
+    bump_generations(LIST_GENERATION, property_generation(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=PropertyImage)
+def invalidate_property_image_cache(sender, instance, **kwargs):
+    # Image changes count as changes to the property for ETag/Last-Modified and the fragment cache.
+    Property.objects.filter(pk=instance.property_id).update(updated_at=timezone.now(), images_version=F('images_version') + 1)
+    bump_generations(LIST_GENERATION, property_generation(instance.property_id))
+
+
+@receiver(post_save, sender=Property)
+def generate_property_image_variants(sender, instance, **kwargs):
+    if imaging.variants_stale(instance.image, instance.image_variants):
+        imaging.schedule(imaging.process_property, instance.pk)
+
+
+@receiver(post_save, sender=PropertyImage)
+def generate_image_variants(sender, instance, **kwargs):
+    if instance.image and imaging.variants_stale(instance.image, instance.variants):
+        imaging.schedule(imaging.process_property_image, instance.pk)
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Property)
+def update_property_stats(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    current = (instance.landlord_id, instance.status)
+    previous = getattr(instance, '_loaded_state', None)
+    if created:
+        stats.adjust(instance.landlord_id, **stats.property_deltas(instance.status, 1))
+    elif previous is None or None in previous:
+        # Unknown starting point (deferred fields or an unsaved copy); recount.
+        stats.rebuild_user_stats({instance.landlord_id, *(previous or ())} - {None})
+    elif previous != current:
+        stats.adjust(previous[0], **stats.property_deltas(previous[1], -1))
+        stats.adjust(instance.landlord_id, **stats.property_deltas(instance.status, 1))
+    instance._loaded_state = current
+
+
+@receiver(post_delete, sender=Property)
+def remove_property_stats(sender, instance, **kwargs):
+    stats.adjust(instance.landlord_id, **stats.property_deltas(instance.status, -1))
+
+
+@receiver(post_save, sender=FavoriteProperty)
+def add_favorite_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.adjust(instance.user_id, favorites=1)
+
+
+@receiver(post_delete, sender=FavoriteProperty)
+def remove_favorite_stats(sender, instance, **kwargs):
+    stats.adjust(instance.user_id, favorites=-1)
+
+
+def message_landlord_id(message):
+    if ContactMessage.property.is_cached(message):
+        return message.property.landlord_id
+    return Property.objects.filter(pk=message.property_id).values_list('landlord_id', flat=True).first()
+
+
+@receiver(post_save, sender=ContactMessage)
+def update_message_stats(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = True if created else getattr(instance, '_loaded_is_read', None)
+    if previous is not None and previous != instance.is_read:
+        stats.adjust(message_landlord_id(instance), unread_messages=1 if previous else -1)
+    elif previous is None:
+        stats.rebuild_user_stats([message_landlord_id(instance)])
+    instance._loaded_is_read = instance.is_read
+
+
+@receiver(post_delete, sender=ContactMessage)
+def remove_message_stats(sender, instance, **kwargs):
+    if not instance.is_read:
+        stats.adjust(message_landlord_id(instance), unread_messages=-1)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_state(sender, instance, **kwargs):
+    user_state_cache.invalidate(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_profile_state(sender, instance, **kwargs):
+    user_state_cache.invalidate(instance.user_id)
@@ -0,0 +1,135 @@
+"""
+Incrementally maintained dashboard counters (UserStats).
+
+Signal handlers in api.signals apply +1/-1 deltas as properties, favorites
+and contact messages change, and api.viewcounter adds flushed view counts,
+so a dashboard load is a single primary-key read. ``rebuild_user_stats``
+recomputes from the source tables and backs the ``rebuild_dashboard_stats``
+repair command.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import ContactMessage, FavoriteProperty, Property, PropertyViewDaily, UserStats
+
+STATUS_COUNTERS = {
+    'vacant': 'vacant_properties',
+    'occupied': 'occupied_properties',
+    'inactive': 'inactive_properties',
+}
+
+
+def property_deltas(status, sign):
+    deltas = {'total_properties': sign}
+    if status in STATUS_COUNTERS:
+        deltas[STATUS_COUNTERS[status]] = sign
+    return deltas
+
+
+def adjust(user_id, **deltas):
+    """
+    Apply counter deltas for one user.
+
+    A missing row is left alone: get_user_stats builds it from the source
+    tables on first read, which already include this change.
+    """
+    if user_id is None or not deltas:
+        return
+    UserStats.objects.filter(user_id=user_id).update(
+        **{name: F(name) + delta for name, delta in deltas.items()}
+    )
+
+
+def compute_counters(user_ids=None):
+    """Return {user_id: {counter: value}} computed from the source tables."""
+    counters = defaultdict(lambda: dict.fromkeys(UserStats.COUNTERS, 0))
+    properties = Property.objects.all()
+    favorites = FavoriteProperty.objects.all()
+    messages = ContactMessage.objects.filter(is_read=False)
+    views = PropertyViewDaily.objects.all()
+    if user_ids is not None:
+        properties = properties.filter(landlord_id__in=user_ids)
+        favorites = favorites.filter(user_id__in=user_ids)
+        messages = messages.filter(property__landlord_id__in=user_ids)
+        views = views.filter(property__landlord_id__in=user_ids)
+    for row in properties.order_by().values('landlord_id', 'status').annotate(n=Count('id')):
+        stats = counters[row['landlord_id']]
+        stats['total_properties'] += row['n']
+        if row['status'] in STATUS_COUNTERS:
+            stats[STATUS_COUNTERS[row['status']]] += row['n']
+    for row in favorites.order_by().values('user_id').annotate(n=Count('id')):
+        counters[row['user_id']]['favorites'] = row['n']
+    for row in messages.order_by().values('property__landlord_id').annotate(n=Count('id')):
+        counters[row['property__landlord_id']]['unread_messages'] = row['n']
+    for row in views.order_by().values('property__landlord_id').annotate(n=Sum('views')):
+        counters[row['property__landlord_id']]['property_views'] = row['n']
+    return counters
+
+
+def rebuild_user_stats(user_ids=None, reset_trends=False, batch_size=1000):
+    """
+    Recompute counters for ``user_ids`` (all users when None). Returns rows written.
+
+    New rows start with a baseline equal to their counters; existing rows keep
+    their baseline unless ``reset_trends`` is set.
+    """
+    counters = compute_counters(user_ids)
+    ids = User.objects.order_by('pk').values_list('pk', flat=True)
+    if user_ids is not None:
+        ids = ids.filter(pk__in=user_ids)
+    update_fields = list(UserStats.COUNTERS)
+    now = timezone.now()
+    if reset_trends:
+        update_fields += ['baseline', 'baseline_at']
+    written = 0
+    batch = []
+    for user_id in ids.iterator():
+        values = counters.get(user_id) or dict.fromkeys(UserStats.COUNTERS, 0)
+        batch.append(UserStats(user_id=user_id, baseline=dict(values), baseline_at=now, **values))
+        if len(batch) >= batch_size:
+            written += _upsert(batch, update_fields)
+            batch = []
+    if batch:
+        written += _upsert(batch, update_fields)
+    return written
+
+
+def _upsert(rows, update_fields):
+    UserStats.objects.bulk_create(rows, update_conflicts=True, unique_fields=['user'], update_fields=update_fields)
+    return len(rows)
+
+
+def trend_window():
+    return timedelta(days=getattr(settings, 'DASHBOARD_TREND_DAYS', 7))
+
+
+def get_user_stats(user):
+    """Load the user's counters, rolling the trend baseline once per window."""
+    stats = UserStats.objects.filter(user_id=user.pk).first()
+    if stats is None:
+        rebuild_user_stats([user.pk])
+        stats = UserStats.objects.get(user_id=user.pk)
+    if timezone.now() - stats.baseline_at >= trend_window():
+        stats.baseline = {name: getattr(stats, name) for name in UserStats.COUNTERS}
+        stats.baseline_at = timezone.now()
+        UserStats.objects.filter(pk=stats.pk).update(baseline=stats.baseline, baseline_at=stats.baseline_at)
+    return stats
+
+
+async def aget_user_stats(user):
+    stats = await UserStats.objects.filter(user_id=user.pk).afirst()
+    if stats is None or timezone.now() - stats.baseline_at >= trend_window():
+        # Building the row or rolling the baseline writes; leave that to the sync path.
+        return await sync_to_async(get_user_stats)(user)
+    return stats
+
+
+def trend(stats, name):
+    delta = getattr(stats, name) - stats.baseline.get(name, 0)
+    return f'+{delta}' if delta > 0 else str(delta)
@@ -1,3 +1,1263 @@
-from django.test import TestCase
+import glob
+import io
+import json
+import logging
+import os
+import shutil
+import smtplib
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.exceptions import ImproperlyConfigured
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection
+from django.db.models.signals import post_delete
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import parse_http_date
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .async_views import ASYNC_VIEWS
+from .auth import user_state_cache
+from .fragments import Fragment, FragmentJSONRenderer, fragment_cache
+from .geo import encode
+from .log import BackgroundHandler, JSONFormatter, SampleFilter, SizeTimeRotatingFileHandler
+from .metrics import Histogram, MetricsRegistry
+from .models import CacheGeneration, Property, PropertyImage, FavoriteProperty, UserProfile, OutboundEmail, ContactMessage, UserStats, PropertyViewDaily
+from .outbox import drain_outbox
+from .replicas import PIN_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware
+from .reports import build_snapshot, latest_snapshot, percentile
+from .stats import rebuild_user_stats
+from .viewcounter import view_counter
+from .views import DashboardView, FavoritePropertyView, ProfileView, PropertyDetailView, PropertyListView
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, VIEW_COUNTER_FLUSH_INTERVAL=0)
+class APITestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        fragment_cache.clear()
+        user_state_cache.clear()
+        view_counter.take()
+        self.client = APIClient()
+        self.landlord = self.create_user('landlord', is_landlord=True)
+        self.tenant = self.create_user('tenant')
+
+    def create_user(self, username, is_landlord=False, **kwargs):
+        user = User.objects.create_user(username=username, email=f'{username}@example.com', password='s3cret-pass', **kwargs)
+        UserProfile.objects.create(user=user, is_landlord=is_landlord)
+        return user
+
+    def create_properties(self, count, landlord=None, images=2, **kwargs):
+        properties = []
+        for i in range(count):
+            fields = {'area': f'Area {i}', 'district': 'Maseru', 'rental_amount': 1000 + i, 'is_approved': True}
+            fields.update(kwargs)
+            prop = Property.objects.create(landlord=landlord or self.landlord, **fields)
+            for j in range(images):
+                PropertyImage.objects.create(property=prop, image=f'property_images/{prop.pk}-{j}.jpg')
+            properties.append(prop)
+        return properties
+
+
+class PropertyQueryCountTests(APITestCase):
+    """Query counts must not depend on how many rows are serialized."""
+
+    def assert_constant_queries(self, num, url, sizes=(3, 12), setup=None):
+        for size in sizes:
+            Property.objects.all().delete()
+            properties = self.create_properties(size)
+            if setup:
+                setup(properties)
+            with self.assertNumQueries(num):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list_anonymous(self):
+        # Plus the ETag aggregate and the response cache generation.
+        response = self.assert_constant_queries(4, '/api/properties/')
+        self.assertEqual(len(response.data), 12)
+        self.assertEqual(len(response.data[0]['images']), 2)
+        self.assertEqual(response.data[0]['landlord_username'], 'landlord')
+
+    def test_list_authenticated(self):
+        self.client.force_authenticate(self.tenant)
+
+        def favorite_first(properties):
+            FavoriteProperty.objects.create(user=self.tenant, property=properties[0])
+
+        # Validators add the list aggregate, its generation and a favorites fingerprint.
+        response = self.assert_constant_queries(6, '/api/properties/', setup=favorite_first)
+        favorited = [row['is_favorited'] for row in response.data]
+        self.assertEqual(favorited.count(True), 1)
+
+    def test_detail(self):
+        prop = self.create_properties(1)[0]
+        self.client.force_authenticate(self.tenant)
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/api/properties/{prop.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['is_favorited'])
+
+    def test_favorites(self):
+        self.client.force_authenticate(self.tenant)
+
+        def favorite_all(properties):
+            FavoriteProperty.objects.bulk_create(FavoriteProperty(user=self.tenant, property=p) for p in properties)
+
+        response = self.assert_constant_queries(2, '/api/favorites/', setup=favorite_all)
+        self.assertTrue(all(row['property_detail']['is_favorited'] for row in response.data))
+
+    def test_report_most_viewed(self):
+        admin = self.create_user('admin', is_staff=True)
+        self.client.force_authenticate(admin)
+        def view_and_snapshot(properties):
+            for prop in properties:
+                view_counter.record(prop.pk)
+            view_counter.flush()
+            build_snapshot()
+
+        # Served from the latest snapshot: snapshot + districts, then the listed properties.
+        response = self.assert_constant_queries(5, '/api/reports/', setup=view_and_snapshot)
+        self.assertEqual(response.data['total_properties'], 12)
+        self.assertEqual(len(response.data['most_viewed']), 10)
+
+
+class PropertyCursorPaginationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        # Duplicate rents exercise the id tie-breaker.
+        self.properties = self.create_properties(7, images=0)
+        for prop in self.properties[3:]:
+            Property.objects.filter(pk=prop.pk).update(rental_amount=2500)
+
+    def walk(self, url):
+        seen, pages = [], 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['results'])
+            url, pages = response.data['next'], pages + 1
+        return seen, pages
+
+    def test_walks_every_row_once(self):
+        for ordering in ('created_at', '-created_at', 'rental_amount', '-rental_amount'):
+            seen, pages = self.walk(f'/api/properties/?page_size=3&ordering={ordering}')
+            expected = list(Property.objects.order_by(ordering, '-id' if ordering.startswith('-') else 'id').values_list('id', flat=True))
+            self.assertEqual(seen, expected, ordering)
+            self.assertEqual(pages, 3)
+
+    def test_previous_link_returns_same_page(self):
+        first = self.client.get('/api/properties/?page_size=3&ordering=rental_amount').data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual([r['id'] for r in back['results']], [r['id'] for r in first['results']])
+        self.assertIsNone(first['previous'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/properties/?cursor=bm9wZQ')
+        self.assertEqual(response.status_code, 404)
+
+    def test_unpaginated_by_default(self):
+        response = self.client.get('/api/properties/?ordering=bogus')
+        self.assertEqual(len(response.data), 7)
+
+
+class PropertySearchTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.maseru = Property.objects.create(landlord=self.landlord, area='Ha Thetsane', district='Maseru', rental_amount=3000, description='Two bedroom flat')
+        self.hoek = Property.objects.create(landlord=self.landlord, area='Ha Mafa', district="Mohale's Hoek", rental_amount=1500, description='Close to Maseru road')
+        self.leribe = Property.objects.create(landlord=self.landlord, area='Hlotse', district='Leribe', rental_amount=2000, description='Quiet yard with garden')
+
+    def search(self, q):
+        response = self.client.get('/api/properties/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data]
+
+    def test_ranks_place_name_above_description(self):
+        self.assertEqual(self.search('maseru'), [self.maseru.pk, self.hoek.pk])
+
+    def test_prefix_and_typo_matching(self):
+        self.assertEqual(self.search('thets'), [self.maseru.pk])
+        self.assertEqual(self.search('masru'), [self.maseru.pk, self.hoek.pk])
+        self.assertEqual(self.search('mohales hok'), [self.hoek.pk])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.assertEqual(self.search('garden'), [self.leribe.pk])
+        self.leribe.description = 'Secure parking'
+        self.leribe.save()
+        self.assertEqual(self.search('garden'), [])
+        self.assertEqual(self.search('parking'), [self.leribe.pk])
+        self.leribe.delete()
+        self.assertEqual(self.search('parking'), [])
+
+    def test_ranking_matches_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.search('maseru'), [self.maseru.pk, self.hoek.pk])
+        searches = [q['sql'] for q in ctx.captured_queries if 'MATCH' in q['sql']]
+        self.assertTrue(searches)
+        for sql in searches:
+            # The rank comes from matches materialized once, not a MATCH per row.
+            self.assertNotRegex(sql, r'MATCH [^)]* AND rowid =')
+            if 'search_rank' in sql:
+                self.assertIn('MATERIALIZED', sql)
+
+
+class PropertyResponseCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.prop = self.create_properties(2)[0]
+
+    def test_anonymous_hits_skip_the_orm(self):
+        # Hits cost only the validator and generation reads.
+        first = self.client.get('/api/properties/', {'status': 'vacant'})
+        with self.assertNumQueries(2):
+            second = self.client.get('/api/properties/', {'status': 'vacant'})
+        self.assertEqual(first.data, second.data)
+        self.client.get(f'/api/properties/{self.prop.pk}/')
+        with self.assertNumQueries(2):
+            self.client.get(f'/api/properties/{self.prop.pk}/')
+
+    def test_property_and_image_writes_invalidate(self):
+        self.client.get('/api/properties/')
+        self.client.get(f'/api/properties/{self.prop.pk}/')
+        self.prop.area = 'Ha Hoohlo'
+        self.prop.save()
+        self.assertEqual(self.client.get(f'/api/properties/{self.prop.pk}/').data['area'], 'Ha Hoohlo')
+        PropertyImage.objects.create(property=self.prop, image='property_images/new.jpg')
+        rows = {row['id']: row for row in self.client.get('/api/properties/').data}
+        self.assertEqual(len(rows[self.prop.pk]['images']), 3)
+
+    def test_authenticated_requests_bypass_cache(self):
+        self.client.get('/api/properties/')
+        FavoriteProperty.objects.create(user=self.tenant, property=self.prop)
+        self.client.force_authenticate(self.tenant)
+        rows = {row['id']: row for row in self.client.get('/api/properties/').data}
+        self.assertTrue(rows[self.prop.pk]['is_favorited'])
+        self.client.force_authenticate(None)
+        rows = {row['id']: row for row in self.client.get('/api/properties/').data}
+        self.assertFalse(rows[self.prop.pk]['is_favorited'])
+
+
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.properties = self.create_properties(3)
+        FavoriteProperty.objects.create(user=self.tenant, property=self.properties[0])
+        self.client.force_authenticate(self.tenant)
+
+    def test_fields_trim_response_and_sql(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/properties/?fields=area,rental_amount')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data[0]), {'id', 'area', 'rental_amount'})
+        listing = [query['sql'] for query in queries if 'api_property"."area' in query['sql']]
+        self.assertEqual(len(listing), 1)
+        self.assertNotIn('description', listing[0])
+        self.assertNotIn('auth_user', listing[0])
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('api_propertyimage', sql)
+        self.assertNotIn('"api_favoriteproperty"."property_id" IN', sql)
+
+    def test_paginated_fieldset_loads_the_cursor_key(self):
+        counts = {}
+        for ordering in ('created_at', 'area'):  # area is not a cursor ordering; it falls back to created_at
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f'/api/properties/?fields=id&ordering={ordering}&page_size=2')
+            self.assertIsNotNone(response.data['next'])
+            counts[ordering] = len(queries)
+        self.assertEqual(counts['area'], counts['created_at'])
+
+    def test_expand_landlord(self):
+        response = self.client.get(f'/api/properties/{self.properties[0].pk}/?fields=is_favorited&expand=landlord')
+        self.assertEqual(response.data, {
+            'id': self.properties[0].pk, 'is_favorited': True,
+            'landlord': {'id': self.landlord.pk, 'username': 'landlord'},
+        })
+        self.assertEqual(self.client.get(f'/api/properties/{self.properties[0].pk}/').data['landlord'], self.landlord.pk)
+
+    def test_favorites_and_reports(self):
+        response = self.client.get('/api/favorites/?fields=district&page_size=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['property_detail'], {'id': self.properties[0].pk, 'district': 'Maseru'})
+
+        view_counter.record(self.properties[1].pk)
+        view_counter.flush()
+        build_snapshot()
+        self.client.force_authenticate(self.create_user('admin', is_staff=True))
+        response = self.client.get('/api/reports/?fields=area')
+        self.assertEqual(response.data['most_viewed'], [{'id': self.properties[1].pk, 'area': 'Area 1', 'views': 1}])
+
+    def test_unknown_names_and_writes(self):
+        response = self.client.get('/api/properties/?fields=area,secret&expand=images')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'fields', 'expand'})
+        # Writes ignore the fieldset and return the full representation.
+        self.client.force_authenticate(self.landlord)
+        response = self.client.patch(f'/api/properties/{self.properties[0].pk}/?fields=area', {'status': 'occupied'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('description', response.data)
+
+
+class FragmentCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.properties = self.create_properties(3)
+        FavoriteProperty.objects.create(user=self.tenant, property=self.properties[0])
+        self.client.force_authenticate(self.tenant)
+
+    def test_list_is_stitched_from_fragments(self):
+        with override_settings(PROPERTY_FRAGMENT_CACHE_BYTES=0):
+            uncached = self.client.get('/api/properties/').json()
+        first = self.client.get('/api/properties/')
+        self.assertEqual(fragment_cache.stats()['misses'], 3)
+        second = self.client.get('/api/properties/')
+        self.assertEqual(fragment_cache.stats()['hits'], 3)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second.json(), uncached)
+        self.assertIsInstance(second.data[0], Fragment)
+        self.assertEqual([row['is_favorited'] for row in second.data], [True, False, False])
+
+        # Per-user fields are overlaid, never cached.
+        self.client.force_authenticate(self.landlord)
+        self.assertFalse(any(row['is_favorited'] for row in self.client.get('/api/properties/').json()))
+        self.assertEqual(fragment_cache.stats()['hits'], 6)
+
+    def test_image_changes_replace_fragments(self):
+        url = f'/api/properties/{self.properties[0].pk}/'
+        self.assertEqual(len(self.client.get(url).data['images']), 2)
+        PropertyImage.objects.create(property=self.properties[0], image='property_images/new.jpg')
+        self.assertEqual(len(self.client.get(url).data['images']), 3)
+        self.assertEqual(fragment_cache.stats()['hits'], 0)
+
+    def test_lru_eviction_by_size(self):
+        # Room for two of the three listings.
+        size = len(self.client.get(f'/api/properties/{self.properties[0].pk}/').content) + 250
+        fragment_cache.clear()
+        with override_settings(PROPERTY_FRAGMENT_CACHE_BYTES=2 * size):
+            self.client.get('/api/properties/')
+            self.client.get(f'/api/properties/{self.properties[0].pk}/')
+            stats = fragment_cache.stats()
+        self.assertLessEqual(stats['bytes'], 2 * size)
+        self.assertGreater(stats['evictions'], 0)
+        self.assertEqual(stats['hits'], 0)  # The oldest entry went first
+
+    def test_renderer_splices_fragments(self):
+        data = {'next': None, 'results': [Fragment(b'{"id":1,"area":"A \u2028"}', {'is_favorited': True}), Fragment(b'{}')]}
+        rendered = FragmentJSONRenderer().render(data)
+        self.assertEqual(rendered, b'{"next":null,"results":[{"id":1,"area":"A \u2028","is_favorited":true},{}]}')
+        self.assertEqual(dict(data['results'][0]), {'id': 1, 'area': 'A \u2028', 'is_favorited': True})
+
+
+class PropertyConditionalGetTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.prop = self.create_properties(2)[0]
+
+    def test_if_none_match_returns_304_without_serializing(self):
+        for url in ('/api/properties/', f'/api/properties/{self.prop.pk}/'):
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(2 if url.endswith('/properties/') else 1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_etag_changes_with_images_deletes_and_favorites(self):
+        etag = self.client.get('/api/properties/')['ETag']
+        image = PropertyImage.objects.filter(property=self.prop).first()
+        image.delete()
+        response = self.client.get('/api/properties/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        Property.objects.exclude(pk=self.prop.pk).delete()
+        self.assertEqual(self.client.get('/api/properties/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.client.force_authenticate(self.tenant)
+        url = f'/api/properties/{self.prop.pk}/'
+        etag = self.client.get(url)['ETag']
+        FavoriteProperty.objects.create(user=self.tenant, property=self.prop)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_favorited'])
+
+    def test_if_modified_since(self):
+        response = self.client.get(f'/api/properties/{self.prop.pk}/')
+        again = self.client.get(f'/api/properties/{self.prop.pk}/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_if_modified_since_after_delete(self):
+        # Backdate everything so the delete lands in a later second.
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        Property.objects.update(updated_at=an_hour_ago)
+        self.client.get('/api/properties/')
+        CacheGeneration.objects.update(changed_at=an_hour_ago)
+        last_modified = self.client.get('/api/properties/')['Last-Modified']
+
+        self.prop.delete()  # Not the newest listing, so max(updated_at) stays put
+        response = self.client.get('/api/properties/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        self.assertGreater(parse_http_date(response['Last-Modified']), parse_http_date(last_modified))
+
+
+@override_settings(IMAGE_VARIANTS_ASYNC=False)
+class ImageVariantTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.prop = self.create_properties(1, images=0)[0]
+
+    def make_upload(self):
+        buffer = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = 'Phone Maker'
+        Image.new('RGB', (2000, 1500), (120, 160, 200)).save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile('house.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_upload_generates_variants_and_placeholder(self):
+        self.client.force_authenticate(self.landlord)
+        response = self.client.post('/api/property-images/', {'property_id': self.prop.pk, 'image': self.make_upload()}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+
+        image = PropertyImage.objects.get(property=self.prop)
+        self.assertTrue(image.placeholder.startswith('data:image/jpeg;base64,'))
+        self.assertEqual(image.variants['thumb']['width'], 320)
+        with Image.open(os.path.join(self.media_root, image.variants['card']['jpeg'])) as card:
+            self.assertEqual(card.size, (640, 480))
+            self.assertEqual(len(card.getexif()), 0)
+
+        srcset = self.client.get(f'/api/properties/{self.prop.pk}/').data['images'][0]['srcset']
+        self.assertEqual(set(srcset), {'thumb', 'card', 'full'})
+        self.assertTrue(srcset['full']['webp'].endswith('.webp'))
+
+
+class MediaServingTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        os.makedirs(os.path.join(self.media_root, 'property_images'))
+        self.body = bytes(range(256)) * 4
+        for name in ('house.jpg', 'house-card.0123456789ab.webp'):
+            with open(os.path.join(self.media_root, 'property_images', name), 'wb') as f:
+                f.write(self.body)
+
+    def test_full_and_conditional(self):
+        response = self.client.get('/media/property_images/house.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.body)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=3600')
+        again = self.client.get('/media/property_images/house.jpg', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_hashed_names_are_immutable(self):
+        response = self.client.get('/media/property_images/house-card.0123456789ab.webp')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_range_requests(self):
+        response = self.client.get('/media/property_images/house.jpg', HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/1024')
+        self.assertEqual(b''.join(response.streaming_content), self.body[10:20])
+        suffix = self.client.get('/media/property_images/house.jpg', HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(suffix.streaming_content), self.body[-4:])
+        unsatisfiable = self.client.get('/media/property_images/house.jpg', HTTP_RANGE='bytes=5000-')
+        self.assertEqual(unsatisfiable.status_code, 416)
+
+    @override_settings(MEDIA_OFFLOAD='x-accel-redirect', MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_offload(self):
+        response = self.client.get('/media/property_images/house.jpg')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/property_images/house.jpg')
+        self.assertEqual(response.content, b'')
+
+    def test_path_traversal(self):
+        self.assertEqual(self.client.get('/media/../backend/settings.py').status_code, 404)
+        self.assertEqual(self.client.get('/media/missing.jpg').status_code, 404)
+
+
+class BrokenEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise smtplib.SMTPServerDisconnected('connection lost')
+
+
+class EmailOutboxTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.prop = self.create_properties(1, images=0)[0]
+
+    def post_contact(self):
+        return self.client.post('/api/contact/', {
+            'property': self.prop.pk, 'tenant_name': 'Palesa', 'tenant_email': 'palesa@example.com', 'message': 'Is it available?',
+        })
+
+    def test_contact_queues_instead_of_sending(self):
+        self.assertEqual(self.post_contact().status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.to, 'landlord@example.com')
+        self.assertEqual(email.reply_to, 'palesa@example.com')
+
+        self.assertEqual(drain_outbox(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['landlord@example.com'])
+        self.assertEqual(OutboundEmail.objects.get().status, 'sent')
+        self.assertEqual(drain_outbox(), (0, 0))
+
+    def test_landlord_without_email_falls_back(self):
+        User.objects.filter(pk=self.landlord.pk).update(email='')
+        self.post_contact()
+        self.assertEqual(OutboundEmail.objects.get().to, 'info@lehae.com')
+
+    @override_settings(EMAIL_BACKEND='api.tests.BrokenEmailBackend', OUTBOX_MAX_ATTEMPTS=2)
+    def test_failures_back_off_then_give_up(self):
+        self.post_contact()
+        self.assertEqual(drain_outbox(), (0, 1))
+        email = OutboundEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertEqual(drain_outbox(), (0, 0))
+
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        drain_outbox()
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('failed', 2))
+        self.assertIn('connection lost', email.last_error)
+
+
+class DashboardStatsTests(APITestCase):
+    def dashboard(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        return {stat['id']: (stat['value'], stat['trend']) for stat in response.data['stats']}
+
+    def test_counters_follow_changes(self):
+        properties = self.create_properties(3, images=0)
+        properties[0].status = 'occupied'
+        properties[0].save()
+        properties[1].delete()
+        ContactMessage.objects.create(property=properties[2], tenant_name='T', tenant_email='tenant@example.com', message='Hi')
+        FavoriteProperty.objects.create(user=self.tenant, property=properties[2])
+
+        stats = self.dashboard(self.landlord)
+        self.assertEqual(stats['properties'], (2, '+2'))
+        self.assertEqual(stats['vacant'], (1, '+1'))
+        self.assertEqual(stats['occupied'], (1, '+1'))
+        self.assertEqual(stats['messages'], (1, '+1'))
+        self.assertEqual(self.dashboard(self.tenant), {'favorites': (1, '+1')})
+
+        UserStats.objects.all().delete()
+        rebuild_user_stats()
+        self.assertEqual(UserStats.objects.get(user=self.landlord).total_properties, 2)
+
+    def test_mark_message_read(self):
+        prop = self.create_properties(1, images=0)[0]
+        messages = [
+            ContactMessage.objects.create(property=prop, tenant_name='T', tenant_email='tenant@example.com', message=text)
+            for text in ('Hi', 'Still available?')
+        ]
+        self.assertEqual(self.dashboard(self.landlord)['messages'][0], 2)
+        url = f'/api/contact/{messages[0].pk}/read/'
+
+        self.client.force_authenticate(self.tenant)
+        self.assertEqual(self.client.post(url).status_code, 404)
+        self.client.force_authenticate(self.landlord)
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['is_read'])
+        self.client.post(url)  # Marking twice counts once
+        self.assertEqual(self.dashboard(self.landlord)['messages'][0], 1)
+
+        self.assertFalse(self.client.delete(url).data['is_read'])
+        self.assertEqual(self.dashboard(self.landlord)['messages'][0], 2)
+
+    def test_baseline_rolls_after_window(self):
+        self.create_properties(2, images=0)
+        UserStats.objects.filter(user=self.landlord).update(baseline_at=timezone.now() - timedelta(days=8))
+        self.assertEqual(self.dashboard(self.landlord)['properties'], (2, '0'))
+        self.create_properties(1, images=0)
+        self.assertEqual(self.dashboard(self.landlord)['properties'], (3, '+1'))
+
+    def test_dashboard_queries(self):
+        self.create_properties(5, images=0)
+        self.client.force_authenticate(User.objects.get(pk=self.landlord.pk))
+        # Profile, the UserStats row and recent activity.
+        with self.assertNumQueries(3):
+            self.client.get('/api/dashboard/')
+
+
+class ReportSnapshotTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.create_user('admin', is_staff=True))
+
+    def test_percentile(self):
+        rents = [Decimal(v) for v in ('1000', '2000', '3000', '4000')]
+        self.assertEqual(percentile(rents, 50), Decimal('2500.00'))
+        self.assertEqual(percentile(rents, 90), Decimal('3700.00'))
+        self.assertIsNone(percentile([], 50))
+
+    def test_snapshot_figures(self):
+        for rent, status in ((1000, 'vacant'), (3000, 'occupied'), (2000, 'vacant')):
+            self.create_properties(1, images=0, district='Leribe', rental_amount=rent, status=status)
+        self.create_properties(1, images=0, is_approved=False)
+
+        response = self.client.get('/api/reports/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_properties'], 4)
+        self.assertEqual(response.data['pending_approval'], 1)
+        self.assertEqual(response.data['total_users'], 3)
+        self.assertEqual(response.data['registrations'][-1]['count'], 3)
+        leribe = next(row for row in response.data['districts'] if row['district'] == 'Leribe')
+        self.assertEqual((leribe['listings'], leribe['vacant']), (3, 2))
+        self.assertEqual(leribe['rent_median'], '2000.00')
+        self.assertAlmostEqual(leribe['vacancy_rate'], 0.6667)
+
+    def test_first_snapshot_is_not_read_back(self):
+        self.create_properties(1, images=0, district='Leribe')
+        with CaptureQueriesContext(connection) as ctx:
+            snapshot = latest_snapshot()
+        # Only the initial lookup: a re-read could hit a replica that lags the new row.
+        reads = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT') and 'FROM "api_reportsnapshot"' in q['sql']]
+        self.assertEqual(len(reads), 1)
+        self.assertEqual([row.district for row in snapshot.districts.all()], ['Leribe'])
+
+    def test_history(self):
+        build_snapshot()
+        self.create_properties(2, images=0)
+        build_snapshot()
+        response = self.client.get('/api/reports/?history=5')
+        self.assertEqual(response.data['total_properties'], 2)
+        self.assertEqual([row['total_properties'] for row in response.data['history']], [2, 0])
+
+
+class PropertyViewCounterTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.prop, self.other = self.create_properties(2, images=0)
+
+    def test_views_are_buffered_then_upserted(self):
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                view_counter.record(self.prop.pk)
+        view_counter.record(self.other.pk)
+        # One landlord lookup, then the upsert and the landlord's stats in a savepoint.
+        with self.assertNumQueries(5):
+            self.assertEqual(view_counter.flush(), 4)
+        view_counter.record(self.prop.pk)
+        view_counter.flush()
+
+        row = PropertyViewDaily.objects.get(property=self.prop)
+        self.assertEqual((row.day, row.views), (timezone.localdate(), 4))
+        self.assertEqual(UserStats.objects.get(user=self.landlord).property_views, 5)
+        self.assertEqual(build_snapshot().most_viewed, [[self.prop.pk, 4], [self.other.pk, 1]])
+
+    def test_detail_hits_are_counted(self):
+        self.client.get(f'/api/properties/{self.prop.pk}/')
+        self.client.get(f'/api/properties/{self.prop.pk}/')
+        self.client.get('/api/properties/999999/')
+        self.assertEqual(view_counter.flush(), 2)
+
+    def test_failed_flush_keeps_counts(self):
+        view_counter.record(self.prop.pk)
+        with mock.patch('api.viewcounter.write_views', side_effect=RuntimeError('database is locked')):
+            self.assertEqual(view_counter.flush(), 0)
+        self.assertEqual(view_counter.flush(), 1)
+
+    def test_deleted_property_views_are_dropped(self):
+        view_counter.record(self.other.pk)
+        self.other.delete()
+        self.assertEqual(view_counter.flush(), 0)
+        self.assertFalse(view_counter.pending)
+
+
+class LoginTests(APITestCase):
+    def login(self, username, password='s3cret-pass'):
+        return self.client.post('/api/token/', {'username': username, 'password': password})
+
+    def test_username_or_email_any_case(self):
+        for identifier in ('landlord', 'LANDLORD', 'Landlord@Example.com'):
+            response = self.login(identifier)
+            self.assertEqual(response.status_code, 200, identifier)
+            self.assertEqual(response.data['user']['id'], self.landlord.pk)
+            self.assertTrue(response.data['user']['is_landlord'])
+
+    def test_exact_username_wins(self):
+        other = self.create_user('Tenant')
+        self.assertEqual(self.login('Tenant').data['user']['id'], other.pk)
+        self.assertEqual(self.login('tenant').data['user']['id'], self.tenant.pk)
+
+    def test_one_query_and_one_hash_per_attempt(self):
+        encode = PBKDF2PasswordHasher.encode
+        for identifier, password, expected in (
+            ('landlord', 's3cret-pass', 200),
+            ('landlord', 'wrong', 401),
+            ('nobody', 's3cret-pass', 401),
+        ):
+            with mock.patch.object(PBKDF2PasswordHasher, 'encode', autospec=True, side_effect=encode) as hashed:
+                with self.assertNumQueries(1):
+                    response = self.login(identifier, password)
+            self.assertEqual(response.status_code, expected)
+            self.assertEqual(hashed.call_count, 1)
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    def test_user_and_profile_are_cached(self):
+        self.authenticate(self.landlord)
+        # One joined query for user and profile, then nothing.
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/profile/')
+        self.assertEqual(response.data['is_landlord'], True)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/profile/').data['username'], 'landlord')
+
+    def test_flag_changes_invalidate(self):
+        admin = self.create_user('admin', is_staff=True)
+        self.authenticate(self.tenant)
+        self.assertFalse(self.client.get('/api/profile/').data['is_landlord'])
+
+        self.authenticate(admin)
+        response = self.client.put(f'/api/users/{self.tenant.pk}/verify/', {'profile': {'is_landlord': True}}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.authenticate(self.tenant)
+        self.assertTrue(self.client.get('/api/profile/').data['is_landlord'])
+        self.tenant.is_active = False
+        self.tenant.save()
+        self.assertEqual(self.client.get('/api/profile/').status_code, 401)
+
+
+class BulkImportExportTests(APITestCase):
+    CSV = (
+        'area,district,rental_amount,deposit,status\n'
+        'Ha Thetsane,Maseru,2500,2500,vacant\n'
+        'Ha Abia,Maseru,-5,,vacant\n'
+        'Lower Thamae,Maseru,1800,,occupied\n'
+    )
+
+    def test_csv_import_reports_row_errors(self):
+        self.client.force_authenticate(self.landlord)
+        response = self.client.generic('POST', '/api/properties/import/', self.CSV, content_type='text/csv')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created'], response.data['failed']), (2, 1))
+        self.assertEqual(response.data['errors'][0]['line'], 3)
+        self.assertIn('rental_amount', response.data['errors'][0]['errors'])
+        self.assertEqual(Property.objects.filter(landlord=self.landlord, is_approved=False).count(), 2)
+        stats = UserStats.objects.get(user=self.landlord)
+        self.assertEqual((stats.total_properties, stats.vacant_properties, stats.occupied_properties), (2, 1, 1))
+
+    @override_settings(BULK_IMPORT_CHUNK_SIZE=2)
+    def test_ndjson_import_in_chunks(self):
+        admin = self.create_user('admin', is_staff=True)
+        self.client.force_authenticate(admin)
+        lines = [f'{{"area": "Area {i}", "district": "Leribe", "rental_amount": "{1000 + i}", "landlord": {self.landlord.pk}, "is_approved": true}}' for i in range(5)]
+        body = '\n'.join(lines + ['not json'])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.generic('POST', '/api/properties/import/', body, content_type='application/x-ndjson')
+        self.assertEqual((response.data['created'], response.data['failed']), (5, 1))
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "api_property"')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(Property.objects.filter(landlord=self.landlord, is_approved=True).count(), 5)
+
+    def test_tenant_cannot_import(self):
+        self.client.force_authenticate(self.tenant)
+        response = self.client.generic('POST', '/api/properties/import/', self.CSV, content_type='text/csv')
+        self.assertEqual(response.status_code, 403)
+
+    def test_streaming_export(self):
+        self.create_properties(3, images=0)
+        self.client.force_authenticate(self.landlord)
+        response = self.client.get('/api/properties/export/?type=ndjson')
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['area'] for row in rows], ['Area 0', 'Area 1', 'Area 2'])
+        self.assertEqual(rows[0]['landlord_username'], 'landlord')
+
+        admin = self.create_user('admin', is_staff=True)
+        self.client.force_authenticate(admin)
+        response = self.client.get('/api/users/export/')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith('id,username,email'))
+        self.assertEqual(len(lines), 4)
+
+
+class FavoriteApiTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.properties = self.create_properties(5, images=1)
+        self.client.force_authenticate(self.tenant)
+
+    def test_ids_and_version(self):
+        FavoriteProperty.objects.create(user=self.tenant, property=self.properties[2])
+        response = self.client.get('/api/favorites/ids/')
+        self.assertEqual(response.data['ids'], [self.properties[2].pk])
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/favorites/ids/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        FavoriteProperty.objects.create(user=self.tenant, property=self.properties[0])
+        response = self.client.get('/api/favorites/ids/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['ids']), 2)
+
+    def test_batch_add_and_remove(self):
+        ids = [prop.pk for prop in self.properties]
+        FavoriteProperty.objects.create(user=self.tenant, property=self.properties[0])
+        deleted = []
+        receiver = lambda sender, instance, **kwargs: deleted.append(instance.property_id)
+        post_delete.connect(receiver, sender=FavoriteProperty)
+        self.addCleanup(post_delete.disconnect, receiver, sender=FavoriteProperty)
+        response = self.client.post('/api/favorites/batch/', {'add': ids[:4] + [999999], 'remove': [ids[0], ids[4]]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(deleted, [ids[0]])
+        self.assertEqual(response.data['added'], ids[1:4])
+        self.assertEqual(response.data['removed'], [ids[0]])
+        self.assertEqual(response.data['invalid'], [999999])
+        self.assertEqual(sorted(FavoriteProperty.objects.filter(user=self.tenant).values_list('property_id', flat=True)), ids[1:4])
+        self.assertEqual(UserStats.objects.get(user=self.tenant).favorites, 3)
+        self.assertEqual(self.client.get('/api/favorites/ids/').data['version'], response.data['version'])
+
+        response = self.client.post('/api/favorites/batch/', {'add': 'everything'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_paginated_list(self):
+        FavoriteProperty.objects.bulk_create(FavoriteProperty(user=self.tenant, property=p) for p in self.properties)
+        seen = []
+        url = '/api/favorites/?page_size=2'
+        while url:
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            seen += [row['property_detail']['id'] for row in response.data['results']]
+            self.assertTrue(all(row['property_detail']['is_favorited'] for row in response.data['results']))
+            url = response.data['next']
+        self.assertEqual(sorted(seen), sorted(prop.pk for prop in self.properties))
+
+
+class UserDirectoryTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.tenants = [self.tenant] + [self.create_user(f'Tenant{i}') for i in range(4)]
+        UserProfile.objects.filter(user__in=self.tenants[1:3]).update(is_verified=True)
+        self.client.force_authenticate(self.landlord)
+
+    def test_tenant_pages_join_the_profile(self):
+        seen = []
+        url = '/api/tenants/?page_size=2'
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            seen += [row['username'] for row in response.data['results']]
+            self.assertTrue(all(row['profile']['is_landlord'] is False for row in response.data['results']))
+            url = response.data['next']
+        self.assertEqual(seen, [user.username for user in self.tenants])
+        self.assertEqual(len(self.client.get('/api/tenants/').data['results']), 5)  # Paginated by default
+
+    def test_search_and_verified_filter(self):
+        response = self.client.get('/api/tenants/?search=tenant')
+        self.assertEqual([row['username'] for row in response.data['results']], [user.username for user in self.tenants])
+        response = self.client.get('/api/tenants/?search=TENANT1@EXAMPLE')
+        self.assertEqual([row['username'] for row in response.data['results']], ['Tenant1'])
+        response = self.client.get('/api/tenants/?is_verified=true&ordering=-username')
+        self.assertEqual([row['username'] for row in response.data['results']], ['Tenant1', 'Tenant0'])
+        self.assertEqual(self.client.get('/api/tenants/?search=landlord').data['results'], [])
+
+    def test_admin_user_list(self):
+        self.client.force_authenticate(self.create_user('admin', is_staff=True))
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/users/?is_landlord=true&page_size=10')
+        self.assertEqual([row['username'] for row in response.data['results']], ['landlord'])
+
+
+class GeoSearchTests(APITestCase):
+    # Maseru city centre, Roma (~34 km) and Leribe town (~80 km).
+    PLACES = {'Maseru': (-29.3151, 27.4869), 'Roma': (-29.4500, 27.7167), 'Leribe': (-28.8716, 28.0450)}
+
+    def setUp(self):
+        super().setUp()
+        self.places = {}
+        for name, (lat, lng) in self.PLACES.items():
+            self.places[name] = self.create_properties(1, images=0, area=name, latitude=lat, longitude=lng)[0]
+        self.create_properties(1, images=0, area='Unmapped')
+
+    def test_geohash(self):
+        self.assertEqual(encode(57.64911, 10.40744), 'u4pruydqq')
+        self.assertEqual(self.places['Maseru'].geohash, encode(*self.PLACES['Maseru']))
+        self.places['Maseru'].latitude = None
+        self.places['Maseru'].save(update_fields=['latitude'])
+        self.assertEqual(Property.objects.get(pk=self.places['Maseru'].pk).geohash, '')
+
+    def test_near_orders_by_distance(self):
+        response = self.client.get('/api/properties/?near=-29.3151,27.4869&radius=50')
+        self.assertEqual([row['area'] for row in response.data], ['Maseru', 'Roma'])
+        self.assertEqual(response.data[0]['distance_km'], 0)
+        self.assertAlmostEqual(response.data[1]['distance_km'], 27.5, delta=2)
+        response = self.client.get('/api/properties/?near=-29.3151,27.4869&radius=200')
+        self.assertEqual([row['area'] for row in response.data], ['Maseru', 'Roma', 'Leribe'])
+
+    def test_bbox_and_bad_params(self):
+        response = self.client.get('/api/properties/?bbox=-29.5,27.3,-29.2,27.8')
+        self.assertEqual(sorted(row['area'] for row in response.data), ['Maseru', 'Roma'])
+        self.assertEqual(self.client.get('/api/properties/?bbox=1,2,3').status_code, 400)
+        self.assertEqual(self.client.get('/api/properties/?near=north').status_code, 400)
+
+    def test_clusters(self):
+        response = self.client.get('/api/properties/clusters/?precision=2')
+        self.assertEqual(sum(cluster['count'] for cluster in response.data['clusters']), 3)
+        response = self.client.get('/api/properties/clusters/?zoom=20')
+        self.assertEqual(len(response.data['clusters']), 3)
+        single = next(c for c in response.data['clusters'] if c['property_id'] == self.places['Roma'].pk)
+        self.assertEqual(single['count'], 1)
+        response = self.client.get('/api/properties/clusters/?precision=1&bbox=-29.5,27.3,-29.2,27.8')
+        self.assertEqual([cluster['count'] for cluster in response.data['clusters']], [2])
+
+
+class PropertyFacetTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_properties(3, images=0, district='Maseru', rental_amount=1500)
+        self.create_properties(1, images=0, district='Leribe', rental_amount=3200, status='occupied')
+        self.create_properties(1, images=0, district='Maseru', rental_amount=5100, status='inactive')
+
+    def test_facet_counts(self):
+        with self.assertNumQueries(4):  # Generation token plus one query per facet
+            response = self.client.get('/api/properties/facets/?status=vacant&bucket_size=1000')
+        self.assertEqual(response.data['total'], 3)
+        # Each facet ignores its own filter.
+        self.assertEqual(
+            response.data['status'],
+            [{'value': 'vacant', 'count': 3}, {'value': 'inactive', 'count': 1}, {'value': 'occupied', 'count': 1}],
+        )
+        self.assertEqual(response.data['district'], [{'value': 'Maseru', 'count': 3}])
+        buckets = response.data['rental_amount']['buckets']
+        self.assertEqual(buckets[0], {'min': 1000, 'max': 2000, 'count': 3})
+        self.assertEqual([bucket['count'] for bucket in buckets], [3])
+
+        response = self.client.get('/api/properties/facets/?district=Maseru&max_amount=2000')
+        self.assertEqual(response.data['total'], 3)
+        self.assertEqual([bucket['count'] for bucket in response.data['rental_amount']['buckets']], [3, 0, 0, 0, 1])
+        self.assertEqual(self.client.get('/api/properties/facets/?bucket_size=big').status_code, 400)
+
+    def test_cached_and_invalidated(self):
+        self.client.force_authenticate(self.tenant)
+        self.client.get('/api/properties/facets/')
+        with self.assertNumQueries(1):  # Generation token only
+            response = self.client.get('/api/properties/facets/')
+        self.assertEqual(response.data['total'], 5)
+        self.create_properties(1, images=0)
+        self.assertEqual(self.client.get('/api/properties/facets/').data['total'], 6)
+
+    def test_if_modified_since_after_update(self):
+        CacheGeneration.objects.update(changed_at=timezone.now() - timedelta(hours=1))
+        last_modified = self.client.get('/api/properties/facets/')['Last-Modified']
+        self.assertEqual(self.client.get('/api/properties/facets/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        prop = Property.objects.filter(status='vacant').first()
+        prop.status = 'occupied'
+        prop.save()
+        response = self.client.get('/api/properties/facets/', HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn({'value': 'occupied', 'count': 2}, response.data['status'])
+
+    def test_search_and_radius_match_the_list(self):
+        self.create_properties(1, images=0, area='Zz', district='Leribe', latitude=-29.31, longitude=27.48)
+        self.create_properties(1, images=0, area='Hlotse', district='Leribe', latitude=-28.87, longitude=28.05)
+        for params in ('q=zz', 'near=-29.31,27.48&radius=5'):
+            listed = self.client.get(f'/api/properties/?{params}').data
+            response = self.client.get(f'/api/properties/facets/?{params}')
+            self.assertEqual(response.data['total'], len(listed), params)
+            self.assertEqual(response.data['district'], [{'value': 'Leribe', 'count': 1}], params)
+        self.assertEqual(self.client.get('/api/properties/facets/?near=nowhere').status_code, 400)
+
+
+class AsyncReadViewTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.properties = self.create_properties(3)
+        FavoriteProperty.objects.create(user=self.tenant, property=self.properties[1])
+        self.factory = AsyncRequestFactory()
+
+    def get_both(self, path, view_class, user=None, **kwargs):
+        """(sync response data, async response) for a GET of ``path``."""
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'} if user else {}
+        sync_response = self.client.get(path, headers=headers)
+        cache.clear()
+        async_view = ASYNC_VIEWS[view_class].as_view()
+        async_response = async_to_sync(async_view)(self.factory.get(path, headers=headers), **kwargs)
+        return sync_response, async_response
+
+    def test_matches_sync_views(self):
+        detail = self.properties[1].pk
+        for path, view_class, user, kwargs in (
+            ('/api/properties/', PropertyListView, None, {}),
+            ('/api/properties/?page_size=2&ordering=-created_at', PropertyListView, self.tenant, {}),
+            ('/api/properties/?q=area', PropertyListView, None, {}),
+            ('/api/properties/?near=-29.31,27.48&radius=50', PropertyListView, self.tenant, {}),
+            (f'/api/properties/{detail}/', PropertyDetailView, self.tenant, {'pk': detail}),
+            ('/api/favorites/', FavoritePropertyView, self.tenant, {}),
+            ('/api/favorites/?fields=area&expand=landlord', FavoritePropertyView, self.tenant, {}),
+            ('/api/properties/?fields=is_favorited,image_url', PropertyListView, self.tenant, {}),
+            ('/api/dashboard/', DashboardView, self.landlord, {}),
+            ('/api/profile/', ProfileView, self.landlord, {}),
+        ):
+            with self.subTest(path=path):
+                sync_response, async_response = self.get_both(path, view_class, user, **kwargs)
+                self.assertEqual(async_response.status_code, 200)
+                self.assertEqual(json.loads(async_response.content), json.loads(sync_response.content))
+                self.assertEqual(async_response.get('ETag'), sync_response.get('ETag'))
+
+    def test_errors_and_conditional_get(self):
+        sync_response, async_response = self.get_both('/api/favorites/', FavoritePropertyView)
+        self.assertEqual(async_response.status_code, 401)
+        self.assertEqual(json.loads(async_response.content), sync_response.json())
+        _, async_response = self.get_both('/api/properties/999999/', PropertyDetailView, pk=999999)
+        self.assertEqual(async_response.status_code, 404)
+
+        etag = self.client.get('/api/properties/').headers['ETag']
+        request = self.factory.get('/api/properties/', headers={'If-None-Match': etag})
+        self.assertEqual(async_to_sync(ASYNC_VIEWS[PropertyListView].as_view())(request).status_code, 304)
+
+    def test_writes_use_sync_view(self):
+        view = ASYNC_VIEWS[FavoritePropertyView].as_view()
+        request = self.factory.post(
+            '/api/favorites/', {'property': self.properties[0].pk}, content_type='application/json',
+            headers={'Authorization': f'Bearer {RefreshToken.for_user(self.tenant).access_token}'},
+        )
+        self.assertEqual(async_to_sync(view)(request).status_code, 201)
+        self.assertEqual(FavoriteProperty.objects.filter(user=self.tenant).count(), 2)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        # Pins must survive across workers, so they need a shared cache.
+        pin_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pin_dir, ignore_errors=True)
+        shared = override_settings(
+            CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'pins': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': pin_dir},
+            },
+            REPLICA_PIN_CACHE_ALIAS='pins',
+        )
+        shared.enable()
+        self.addCleanup(shared.disable)
+
+    def route(self, request):
+        """The read alias a property read and a UserStats read would use during ``request``."""
+        seen = {}
+
+        def view(request):
+            seen['property'] = ReplicaRouter().db_for_read(Property)
+            seen['stats'] = ReplicaRouter().db_for_read(UserStats)
+            return HttpResponse(status=201 if request.method == 'POST' else 200)
+
+        response = ReplicaRoutingMiddleware(view)(request)
+        return seen, response
+
+    def test_reads_go_to_replica_until_a_write(self):
+        factory = RequestFactory()
+        seen, _ = self.route(factory.get('/api/properties/'))
+        self.assertEqual(seen, {'property': 'replica1', 'stats': None})
+        self.assertEqual(ReplicaRouter().db_for_write(Property), 'default')
+        self.assertFalse(ReplicaRouter().allow_migrate('replica1', 'api'))
+
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.landlord).access_token}'}
+        seen, response = self.route(factory.post('/api/properties/', **auth))
+        self.assertIsNone(seen['property'])
+        pin = response.cookies[PIN_COOKIE].value
+
+        # Pinned by cookie, and by user for token clients that send no cookies.
+        factory.cookies[PIN_COOKIE] = pin
+        self.assertIsNone(self.route(factory.get('/api/properties/'))[0]['property'])
+        factory = RequestFactory()
+        self.assertIsNone(self.route(factory.get('/api/properties/', **auth))[0]['property'])
+        other = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.tenant).access_token}'}
+        self.assertEqual(self.route(factory.get('/api/properties/', **other))[0]['property'], 'replica1')
+
+    def test_rejects_per_process_pin_cache(self):
+        with override_settings(REPLICA_PIN_CACHE_ALIAS='default'):
+            with self.assertRaisesMessage(ImproperlyConfigured, 'REPLICA_PIN_CACHE_ALIAS'):
+                ReplicaRoutingMiddleware(lambda request: HttpResponse())
+        with override_settings(REPLICA_PIN_CACHE_ALIAS='default', DATABASE_REPLICAS=[]):
+            ReplicaRoutingMiddleware(lambda request: HttpResponse())
+
+
+@override_settings(METRICS_SERVER_TIMING=True)
+class RequestMetricsTests(APITestCase):
+    def test_server_timing(self):
+        self.create_properties(2)
+        response = self.client.get('/api/properties/')
+        timing = response.headers['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('cache;desc="0 hit 1 miss"', timing)
+        self.assertRegex(timing, r'serialize;dur=[\d.]+, .*total;dur=[\d.]+')
+        self.assertIn('cache;desc="1 hit 0 miss"', self.client.get('/api/properties/').headers['Server-Timing'])
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0)
+    def test_slow_request_log(self):
+        with self.assertLogs('api.slow_requests', 'WARNING') as logs:
+            self.client.get('/api/properties/')
+        self.assertIn('Slow request GET /api/properties/ -> 200', logs.output[0])
+        self.assertIn('FROM "api_cachegeneration"', logs.output[0])
+
+    def test_histograms(self):
+        histogram = Histogram()
+        for ms in range(1, 101):
+            histogram.add(ms)
+        self.assertAlmostEqual(histogram.percentile(50), 50, delta=5)
+        self.assertAlmostEqual(histogram.percentile(99), 99, delta=5)
+
+        admin = self.create_user('admin', is_staff=True)
+        self.client.force_authenticate(admin)
+        self.client.delete('/api/metrics/')
+        for _ in range(3):
+            self.client.get('/api/properties/')
+        response = self.client.get('/api/metrics/')
+        row = next(row for row in response.data['endpoints'] if row['endpoint'] == 'GET /api/properties/')
+        self.assertEqual(row['count'], 3)
+        self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+        # The default locmem cache is per process.
+        self.assertFalse(response.data['shared'])
+
+    def test_histograms_merge_across_workers_through_shared_cache(self):
+        metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_dir, ignore_errors=True)
+        caches = {
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'metrics': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': metrics_dir},
+        }
+        with override_settings(CACHES=caches, METRICS_CACHE_ALIAS='metrics'):
+            for pid in (101, 102):
+                worker = MetricsRegistry()
+                worker.add('GET /api/properties/', 10, 2, 1.0)
+                with mock.patch('api.metrics.os.getpid', return_value=pid):
+                    worker.publish()
+            histograms, workers = MetricsRegistry().collect()
+            self.assertTrue(MetricsRegistry().shared())
+        self.assertEqual(workers, 3)
+        self.assertEqual(histograms['GET /api/properties/'].count, 2)
+        self.client.force_authenticate(self.tenant)
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+
+class BenchmarkCommandTests(APITestCase):
+    def test_generate_dataset(self):
+        call_command('generate_dataset', properties=40, users=20, messages=10, stdout=io.StringIO())
+        generated = User.objects.filter(username__startswith='gen-')
+        self.assertEqual(generated.count(), 20)
+        self.assertEqual(UserProfile.objects.filter(user__in=generated, is_landlord=True).count(), 4)
+        self.assertEqual(Property.objects.filter(landlord__in=generated).count(), 40)
+        self.assertEqual(ContactMessage.objects.count(), 10)
+        landlord = Property.objects.filter(landlord__in=generated).values_list('landlord', flat=True).first()
+        self.assertEqual(UserStats.objects.get(user=landlord).total_properties, Property.objects.filter(landlord=landlord).count())
+        self.assertEqual(self.client.get('/api/properties/?q=maseru').status_code, 200)
+
+        call_command('generate_dataset', properties=10, users=10, clear=True, stdout=io.StringIO())
+        self.assertEqual(Property.objects.count(), 10)
+
+    def test_bench_api_and_baseline(self):
+        call_command('generate_dataset', properties=20, users=10, stdout=io.StringIO())
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        baseline, current = os.path.join(tmpdir, 'baseline.json'), os.path.join(tmpdir, 'current.json')
+        options = {'requests': 2, 'warmup': 0, 'memory_samples': 1, 'only': ['property-detail', 'favorites add'], 'stderr': io.StringIO()}
+        call_command('bench_api', output=baseline, **options)
+        with open(baseline) as f:
+            results = json.load(f)
+        self.assertEqual(results['dataset']['properties'], 20)
+        detail = results['endpoints']['property-detail']
+        self.assertEqual((detail['route'], detail['requests'], detail['errors']), ('property-detail', 2, 0))
+        self.assertEqual(results['endpoints']['favorites add']['errors'], 0)
+        self.assertFalse(User.objects.filter(username__startswith='bench-').exists())
+        self.assertEqual(FavoriteProperty.objects.filter(user__username__startswith='gen-').count(),
+                         results['dataset']['favorites'])
+
+        results['endpoints']['property-detail']['queries'] = 0
+        with open(baseline, 'w') as f:
+            json.dump(results, f)
+        with self.assertRaisesMessage(CommandError, 'regression'):
+            call_command('bench_api', output=current, baseline=baseline, **options)
+
+
+class BackgroundLoggingTests(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.filename = os.path.join(self.tmpdir, 'app.jsonl')
+
+    def read_lines(self, path=None):
+        with open(path or self.filename) as f:
+            return [json.loads(line) for line in f]
+
+    def record(self, msg, *args, level=logging.INFO, **extra):
+        record = logging.LogRecord('api.views', level, __file__, 1, msg, args, None)
+        record.__dict__.update(extra)
+        return record
+
+    def test_writes_json_lines_in_the_background(self):
+        handler = BackgroundHandler(self.filename, console=False)
+        handler.handle(self.record('Image %s deleted by %s', 7, 'landlord', property_id=3))
+        handler.close()
+        [entry] = self.read_lines()
+        self.assertEqual(entry['message'], 'Image 7 deleted by landlord')
+        self.assertEqual((entry['level'], entry['logger'], entry['property_id']), ('INFO', 'api.views', 3))
+
+    def test_rotates_by_size(self):
+        handler = SizeTimeRotatingFileHandler(self.filename, max_bytes=200, backup_count=2)
+        handler.setFormatter(JSONFormatter())
+        for i in range(20):
+            handler.handle(self.record('Record number %s', i))
+        handler.close()
+        rotated = sorted(glob.glob(self.filename + '.*'))
+        self.assertEqual(len(rotated), 2)
+        self.assertLessEqual(os.path.getsize(rotated[-1]), 400)
+        self.assertEqual(self.read_lines()[-1]['message'], 'Record number 19')
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = BackgroundHandler(self.filename, console=False, queue_size=2)
+        handler.listener.stop()
+        for i in range(3):
+            handler.handle(self.record('Record number %s', i))
+        handler.start()
+        handler.queue.join()  # Room for the next record and the drop notice
+        handler.handle(self.record('After the burst'))
+        handler.close()
+        messages = [entry['message'] for entry in self.read_lines()]
+        self.assertEqual(messages, [
+            'Record number 0', 'Record number 1', 'After the burst', 'Logging queue full, 1 records dropped',
+        ])
+
+    def test_sampling(self):
+        self.assertFalse(SampleFilter(0).filter(self.record('Favorite added', sampled=True)))
+        self.assertTrue(SampleFilter(0).filter(self.record('Favorite added')))
+        self.assertTrue(SampleFilter(0).filter(self.record('Failed', level=logging.ERROR, sampled=True)))
+        kept = self.record('Favorite added', sampled=True)
+        self.assertTrue(SampleFilter(1).filter(kept))
+        self.assertEqual(kept.sample_rate, 1)
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.urls import path
+from .async_views import ASYNC_VIEWS
 from .views import (
     UserRegistrationView,
     UserLoginView,
@@ -8,30 +10,56 @@ from .views import (
     TenantDetailView,
     FavoritePropertyView,
     ContactMessageAPIView,
+    ContactMessageReadView,
     DashboardView,
     ProfileView,
     PropertyImageView,
     UserListView,
     UserDetailView,
     UserVerificationView,
-    ReportView
+    ReportView,
+    PropertyImportView,
+    PropertyExportView,
+    UserExportView,
+    FavoriteIdsView,
+    FavoriteBatchView,
+    PropertyClusterView,
+    PropertyFacetView,
+    MetricsView
 )
 
+
+def read_view(view_class):
+    # Under ASGI (ASYNC_READ_VIEWS) reads go to the async twin; see api.async_views.
+    if getattr(settings, 'ASYNC_READ_VIEWS', False):
+        view_class = ASYNC_VIEWS[view_class]
+    return view_class.as_view()
+
+
 urlpatterns = [
     path('register/', UserRegistrationView.as_view(), name='register'),
     path('token/', UserLoginView.as_view(), name='token'),
-    path('profile/', ProfileView.as_view(), name='profile'),
-    path('properties/', PropertyListView.as_view(), name='property-list'),
-    path('properties/<int:pk>/', PropertyDetailView.as_view(), name='property-detail'),
+    path('profile/', read_view(ProfileView), name='profile'),
+    path('properties/', read_view(PropertyListView), name='property-list'),
+    path('properties/facets/', PropertyFacetView.as_view(), name='property-facets'),
+    path('properties/clusters/', PropertyClusterView.as_view(), name='property-clusters'),
+    path('properties/import/', PropertyImportView.as_view(), name='property-import'),
+    path('properties/export/', PropertyExportView.as_view(), name='property-export'),
+    path('properties/<int:pk>/', read_view(PropertyDetailView), name='property-detail'),
     path('tenants/', TenantListView.as_view(), name='tenant-list'),
     path('tenants/<int:pk>/', TenantDetailView.as_view(), name='tenant-detail'),
-    path('favorites/', FavoritePropertyView.as_view(), name='favorites'),
+    path('favorites/', read_view(FavoritePropertyView), name='favorites'),
+    path('favorites/ids/', FavoriteIdsView.as_view(), name='favorite-ids'),
+    path('favorites/batch/', FavoriteBatchView.as_view(), name='favorite-batch'),
     path('contact/', ContactMessageAPIView.as_view(), name='contact'),
-    path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('contact/<int:pk>/read/', ContactMessageReadView.as_view(), name='contact-read'),
+    path('dashboard/', read_view(DashboardView), name='dashboard'),
     path('property-images/', PropertyImageView.as_view(), name='property-image-list'),
     path('property-images/<int:pk>/', PropertyImageView.as_view(), name='image-detail'),
     path('users/', UserListView.as_view(), name='user-list'),
+    path('users/export/', UserExportView.as_view(), name='user-export'),
     path('users/<int:pk>/', UserDetailView.as_view(), name='user-detail'),
     path('users/<int:pk>/verify/', UserVerificationView.as_view(), name='user-verify'),
     path('reports/', ReportView.as_view(), name='reports'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
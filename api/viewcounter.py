@@ -0,0 +1,134 @@
+"""
+Buffered property view counter.
+
+Detail-page hits only increment an in-process dict. A background thread
+flushes the buffer every VIEW_COUNTER_FLUSH_INTERVAL seconds as a single
+``INSERT ... ON CONFLICT DO UPDATE SET views = views + excluded.views`` into
+PropertyViewDaily, so a popular listing costs one row write per flush rather
+than one per request. The buffer is flushed again at interpreter exit and
+from gunicorn's ``worker_exit`` hook (gunicorn.conf.py), so a graceful
+shutdown loses nothing; a failed flush puts its counts back in the buffer.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from . import stats
+from .models import Property, PropertyViewDaily
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.wakeup = threading.Event()
+        self.stopped = False
+        self.thread = None
+
+    def record(self, property_id):
+        """Count one view of ``property_id`` for today."""
+        if self.add(property_id):
+            self.flush()
+
+    async def arecord(self, property_id):
+        if self.add(property_id):
+            await sync_to_async(self.flush)()
+
+    def add(self, property_id):
+        """Buffer one view; True when the caller has to flush because no thread will."""
+        key = (int(property_id), timezone.localdate())
+        with self.lock:
+            self.pending[key] += 1
+            size = len(self.pending)
+        self.ensure_thread()
+        if size >= getattr(settings, 'VIEW_COUNTER_MAX_PENDING', 5000):
+            # Flush early instead of letting the buffer grow without bound.
+            if self.thread is None:
+                return True
+            self.wakeup.set()
+        return False
+
+    def ensure_thread(self):
+        interval = getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', 10)
+        if self.thread is not None or self.stopped or interval <= 0:
+            return
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, args=(interval,), name='view-counter', daemon=True)
+                self.thread.start()
+
+    def run(self, interval):
+        while not self.stopped:
+            self.wakeup.wait(interval)
+            self.wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+    def take(self):
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+        return pending
+
+    def restore(self, pending):
+        with self.lock:
+            self.pending.update(pending)
+
+    def flush(self):
+        """Write buffered counts. Returns the number of views written."""
+        pending = self.take()
+        if not pending:
+            return 0
+        try:
+            written = write_views(pending)
+        except Exception as e:
+            self.restore(pending)
+            logger.error("View counter flush failed, %s views kept for retry: %s", sum(pending.values()), e)
+            return 0
+        logger.debug("Flushed %s property views in %s rows", written, len(pending))
+        return written
+
+    def shutdown(self):
+        self.stopped = True
+        self.wakeup.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+        self.flush()
+
+
+def write_views(pending):
+    """Upsert {(property_id, day): views} in one statement and credit landlords' stats."""
+    landlords = dict(
+        Property.objects.filter(pk__in={property_id for property_id, _day in pending})
+        .values_list('pk', 'landlord_id')
+    )
+    # Views of properties deleted since they were recorded are dropped.
+    rows = [(property_id, day, views) for (property_id, day), views in sorted(pending.items()) if property_id in landlords]
+    if not rows:
+        return 0
+    table = connection.ops.quote_name(PropertyViewDaily._meta.db_table)
+    placeholders = ', '.join(['(%s, %s, %s)'] * len(rows))
+    sql = (
+        f'INSERT INTO {table} (property_id, day, views) VALUES {placeholders} '
+        f'ON CONFLICT (property_id, day) DO UPDATE SET views = {table}.views + excluded.views'
+    )
+    per_landlord = defaultdict(int)
+    for property_id, _day, views in rows:
+        per_landlord[landlords[property_id]] += views
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [value for row in rows for value in row])
+        for landlord_id, views in per_landlord.items():
+            stats.adjust(landlord_id, property_views=views)
+    return sum(per_landlord.values())
+
+
+view_counter = ViewCounter()
+atexit.register(view_counter.shutdown)
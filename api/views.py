@@ -2,20 +2,34 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics, serializers
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
+from rest_framework.parsers import MultiPartParser
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
-from .serializers import UserSerializer, PropertySerializer, FavoritePropertySerializer, ContactMessageSerializer, PropertyImageSerializer
-from .models import Property, FavoriteProperty, ContactMessage, UserProfile, PropertyImage
-from django.core.mail import send_mail
-from django.conf import settings
+from .serializers import UserSerializer, PropertySerializer, FavoritePropertySerializer, ContactMessageSerializer, PropertyImageSerializer, ReportSnapshotSerializer, DistrictReportSerializer
+from .models import Property, FavoriteProperty, ContactMessage, UserProfile, PropertyImage, ReportSnapshot
+from . import facets, geo
+from .fieldsets import FieldsetMixin, parse_fieldset, trim_properties
+from .bulk import FORMATS, PropertyImporter, detect_format, export_properties, export_users, read_rows
+from .cache import CachedAnonymousReadMixin, LIST_GENERATION, property_generation
+from .fragments import fragment_cache
+from .metrics import registry as metrics_registry
+from .log import SAMPLED
+from .conditional import ConditionalGetMixin, favorites_state, make_etag, property_detail_state, property_list_state
+from .outbox import enqueue_contact_notification
+from .auth import search_users
+from .pagination import FavoriteCursorPagination, PropertyCursorPagination, UserCursorPagination
+from .reports import latest_snapshot, snapshot_is_stale
+from .search import search_properties
+from .stats import adjust as adjust_stats, get_user_stats, trend
+from .viewcounter import view_counter
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.utils.translation import gettext_lazy as _
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
 import logging
 
-# Add media serving view
-from django.views.static import serve
-
 logger = logging.getLogger(__name__)
 
 class UserRegistrationView(APIView):
@@ -29,7 +43,7 @@ class UserRegistrationView(APIView):
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
             }, status=status.HTTP_201_CREATED)
-        logger.error(f"Registration error: {serializer.errors}")
+        logger.error("Registration error: %s", serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class UserLoginView(APIView):
@@ -47,7 +61,10 @@ class UserLoginView(APIView):
 
         user = authenticate(request, username=username, password=password)
         if user:
-            UserProfile.objects.get_or_create(user=user, defaults={'is_landlord': False})
+            try:
+                user.profile  # Joined by EmailBackend, so normally no query
+            except UserProfile.DoesNotExist:
+                user.profile = UserProfile.objects.create(user=user, is_landlord=False)
             refresh = RefreshToken.for_user(user)
             return Response({
                 'refresh': str(refresh),
@@ -67,34 +84,45 @@ class UserLoginView(APIView):
 class ProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
-    def get(self, request):
-        user = request.user
-        return Response({
+    def get_data(self, user, profile):
+        return {
             'id': user.id,
             'username': user.username,
             'email': user.email,
-            'is_landlord': user.profile.is_landlord
-        })
+            'is_landlord': profile.is_landlord
+        }
 
-class PropertyListView(generics.ListCreateAPIView):
+    def get(self, request):
+        return Response(self.get_data(request.user, request.user.profile))
+
+class PropertyListView(FieldsetMixin, ConditionalGetMixin, CachedAnonymousReadMixin, generics.ListCreateAPIView):
     queryset = Property.objects.all()
     serializer_class = PropertySerializer
     permission_classes = [AllowAny]
-
-    def get_serializer_context(self):
-        return {'request': self.request}
-
-    def get_queryset(self):
-        queryset = Property.objects.all()
-        status = self.request.query_params.get('status')
-        district = self.request.query_params.get('district')
-        area = self.request.query_params.get('area')
-        min_amount = self.request.query_params.get('min_amount')
-        max_amount = self.request.query_params.get('max_amount')
-        landlord = self.request.query_params.get('landlord')
-        is_approved = self.request.query_params.get('is_approved')
-        limit = self.request.query_params.get('limit')
-        ordering = self.request.query_params.get('ordering', 'created_at')
+    pagination_class = PropertyCursorPagination
+    ordering_fields = ('created_at', 'updated_at', 'rental_amount', 'area', 'district', 'id')
+    search_limit = 100
+    default_radius_km = 5
+    cache_scope = 'property-list'
+
+    def get_cache_generation_names(self):
+        return [LIST_GENERATION]
+
+    def get_validator_state(self, request, *args, **kwargs):
+        generation = self.get_cache_generations()[LIST_GENERATION]
+        return property_list_state(self.get_queryset(), request.user, generation)
+
+    def filter_properties(self, queryset, ignore=()):
+        """Apply the listing filters from the query string, skipping parameters named in ``ignore``."""
+        params = {key: value for key, value in self.request.query_params.items() if key not in ignore}
+        status = params.get('status')
+        district = params.get('district')
+        area = params.get('area')
+        min_amount = params.get('min_amount')
+        max_amount = params.get('max_amount')
+        landlord = params.get('landlord')
+        is_approved = params.get('is_approved')
+        bbox = params.get('bbox')
 
         if status and status != 'all':
             queryset = queryset.filter(status=status)
@@ -107,32 +135,239 @@ class PropertyListView(generics.ListCreateAPIView):
         if max_amount:
             queryset = queryset.filter(rental_amount__lte=max_amount)
         if landlord == 'self' and self.request.user.is_authenticated:
-            logger.info(f"Filtering properties for user: {self.request.user.username}")
+            logger.info("Filtering properties for user: %s", self.request.user.username, extra=SAMPLED)
             queryset = queryset.filter(landlord=self.request.user)
         if is_approved is not None:
             queryset = queryset.filter(is_approved=is_approved.lower() == 'true')
-        if ordering:
-            queryset = queryset.order_by(ordering)
+        if bbox:
+            try:
+                queryset = geo.within_bbox(queryset, geo.parse_bbox(bbox))
+            except ValueError as e:
+                raise serializers.ValidationError({'bbox': [str(e)]})
+        return queryset
+
+    def get_near(self):
+        """(latitude, longitude, radius_km) from ?near=lat,lng&radius=km, or None."""
+        near = self.request.query_params.get('near')
+        if not near:
+            return None
+        try:
+            latitude, longitude = geo.parse_point(near)
+            radius = float(self.request.query_params.get('radius', self.default_radius_km))
+        except ValueError as e:
+            raise serializers.ValidationError({'near': [str(e)]})
+        return latitude, longitude, radius
+
+    def match_properties(self, queryset, rank=True):
+        """
+        Apply ``q`` and ``near``. With ``rank`` the matches are ordered by
+        relevance or distance; grouped queries such as the facets skip that.
+        """
+        query = self.request.query_params.get('q', '').strip()
+        if query:
+            queryset = search_properties(queryset, query, rank=rank)
+            return queryset.order_by('-search_rank', '-id') if rank else queryset
+        near = self.get_near()
+        if near:
+            # The distance annotation is also the radius filter, so it stays.
+            queryset = geo.near(queryset, *near)
+            return queryset if rank else queryset.order_by()
+        return queryset
+
+    def get_queryset(self):
+        limit = self.request.query_params.get('limit')
+        ordering = self.request.query_params.get('ordering', 'created_at')
+        query = self.request.query_params.get('q', '').strip()
+        near = self.get_near()
+
+        if ordering.lstrip('-') not in self.ordering_fields:
+            logger.error("Invalid ordering parameter: %s", ordering)
+            ordering = 'created_at'
+        # The ordering column is the cursor key, so it is loaded whatever the fieldset.
+        # Pagination has its own narrower set of orderings and falls back to created_at.
+        key = self.paginator.get_ordering(self.request) if self.is_paginated() else ordering
+        queryset = trim_properties(Property.objects.all(), self.get_fieldset(), keep=[key.lstrip('-')])
+        queryset = self.filter_properties(queryset)
+        if query or near:
+            # Search and distance results are ranked and capped rather than cursor-paginated.
+            queryset = self.match_properties(queryset)
+            limit = limit or self.search_limit
+        elif self.paginator.is_enabled(self.request):
+            # Cursor pagination applies its own (ordering, id) keyset instead of a limit.
+            return queryset
+        else:
+            queryset = queryset.order_by(ordering, '-id' if ordering.startswith('-') else 'id')
         if limit:
             try:
                 queryset = queryset[:int(limit)]
             except ValueError:
-                logger.error(f"Invalid limit parameter: {limit}")
+                logger.error("Invalid limit parameter: %s", limit)
         return queryset
 
+    def is_paginated(self):
+        # Search and distance results are capped instead (see get_queryset).
+        params = self.request.query_params
+        return self.paginator.is_enabled(self.request) and not (params.get('q', '').strip() or params.get('near'))
+
+    def paginate_queryset(self, queryset):
+        if not self.is_paginated():
+            return None
+        return super().paginate_queryset(queryset)
+
     def perform_create(self, serializer):
         if not self.request.user.profile.is_landlord:
-            logger.error(f"Non-landlord {self.request.user.username} attempted to create property")
+            logger.error("Non-landlord %s attempted to create property", self.request.user.username)
             raise serializers.ValidationError(_('Only landlords can create properties'))
         serializer.save(landlord=self.request.user)
 
-class PropertyDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Property.objects.all()
+class PropertyClusterView(PropertyListView):
+    """
+    Map clusters: listing counts per geohash cell for the viewport.
+
+    Takes the list filters plus ``bbox`` and ``zoom`` (0-20) or an explicit
+    ``precision`` (geohash length, 1-9).
+    """
+    http_method_names = ['get', 'head', 'options']
+    cache_scope = 'property-clusters'
+
+    def get_queryset(self):
+        return self.filter_properties(Property.objects.all())
+
+    def list(self, request, *args, **kwargs):
+        try:
+            if 'precision' in request.query_params:
+                precision = max(1, min(int(request.query_params['precision']), geo.GEOHASH_PRECISION))
+            else:
+                precision = geo.precision_for_zoom(request.query_params.get('zoom', 10))
+        except ValueError:
+            return Response({'error': 'zoom and precision must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'precision': precision, 'clusters': geo.clusters(self.get_queryset(), precision)})
+
+class PropertyFacetView(PropertyListView):
+    """
+    Counts per status and district plus a rental_amount histogram for the
+    listings matching the list filters, ``q`` and ``near``, in three grouped
+    queries.
+
+    Facets are the same for every user unless ``landlord=self`` is given,
+    so authenticated requests share the cached response too.
+    """
+    http_method_names = ['get', 'head', 'options']
+    cache_scope = 'property-facets'
+
+    def is_cacheable(self, request):
+        return request.query_params.get('landlord') != 'self'
+
+    def get_validator_state(self, request, *args, **kwargs):
+        # Every listing write bumps the list generation, so its token alone validates the facets.
+        generation = self.get_cache_generations()[LIST_GENERATION]
+        return (generation.token,), generation.changed_at
+
+    def get_queryset(self):
+        return self.match_properties(self.filter_properties(Property.objects.all()), rank=False)
+
+    def list(self, request, *args, **kwargs):
+        try:
+            bucket_size = max(facets.MIN_BUCKET_SIZE, int(request.query_params.get('bucket_size', facets.DEFAULT_BUCKET_SIZE)))
+        except ValueError:
+            return Response({'error': 'bucket_size must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        # Search and radius apply to every facet; only the list filters are left out per facet.
+        properties = self.match_properties(Property.objects.all(), rank=False)
+        statuses = facets.value_counts(self.filter_properties(properties, ignore=('status',)), 'status')
+        selected = request.query_params.get('status')
+        # The status facet covers every other filter, so the total needs no extra query.
+        total = sum(row['count'] for row in statuses if not selected or selected == 'all' or row['value'] == selected)
+        return Response({
+            'total': total,
+            'status': statuses,
+            'district': facets.value_counts(self.filter_properties(properties, ignore=('district',)), 'district'),
+            'rental_amount': facets.rent_histogram(
+                self.filter_properties(properties, ignore=('min_amount', 'max_amount')), bucket_size,
+            ),
+        })
+
+class PropertyImportView(APIView):
+    """Bulk-create properties from a CSV or NDJSON body (or a multipart ``file``)."""
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        user = request.user
+        if not (user.is_staff or user.profile.is_landlord):
+            logger.error("Non-landlord %s attempted a bulk import", user.username)
+            return Response({'error': _('Only landlords can import properties')}, status=status.HTTP_403_FORBIDDEN)
+        content_type = request.content_type or ''
+        if content_type.startswith('multipart/'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({'error': 'A file is required'}, status=status.HTTP_400_BAD_REQUEST)
+            fmt = request.query_params.get('type') or detect_format(upload.content_type or '', upload.name)
+            lines = upload
+        else:
+            fmt = request.query_params.get('type') or detect_format(content_type)
+            lines = request.stream or []
+        if fmt not in FORMATS:
+            return Response({'error': 'Send text/csv or application/x-ndjson'}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        dry_run = request.query_params.get('dry_run', '').lower() in ('1', 'true')
+        report = PropertyImporter(user, dry_run=dry_run).run(read_rows(lines, fmt))
+        if report['created'] and not dry_run:
+            response_status = status.HTTP_201_CREATED
+        elif report['failed']:
+            response_status = status.HTTP_400_BAD_REQUEST
+        else:
+            response_status = status.HTTP_200_OK
+        return Response(report, status=response_status)
+
+def streaming_export(rows, fmt, filename):
+    response = StreamingHttpResponse(rows, content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+class PropertyExportView(APIView):
+    """Stream properties as CSV or NDJSON: every listing for staff, otherwise the user's own."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        fmt = request.query_params.get('type', 'csv')
+        if fmt not in FORMATS:
+            return Response({'error': f"type must be one of: {', '.join(FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = Property.objects.all()
+        if not request.user.is_staff:
+            queryset = queryset.filter(landlord=request.user)
+        property_status = request.query_params.get('status')
+        if property_status and property_status != 'all':
+            queryset = queryset.filter(status=property_status)
+        return streaming_export(export_properties(queryset, fmt), fmt, 'properties')
+
+class UserExportView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        fmt = request.query_params.get('type', 'csv')
+        if fmt not in FORMATS:
+            return Response({'error': f"type must be one of: {', '.join(FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        return streaming_export(export_users(User.objects.all(), fmt), fmt, 'users')
+
+class PropertyDetailView(FieldsetMixin, ConditionalGetMixin, CachedAnonymousReadMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = PropertySerializer
     permission_classes = [AllowAny]
+    cache_scope = 'property-detail'
+
+    def get_cache_generation_names(self):
+        return [property_generation(self.kwargs['pk'])]
 
-    def get_serializer_context(self):
-        return {'request': self.request}
+    def get_validator_state(self, request, *args, **kwargs):
+        return property_detail_state(self.kwargs['pk'], request.user)
+
+    def get_queryset(self):
+        return trim_properties(Property.objects.all(), self.get_fieldset())
+
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            # Buffered in memory and flushed in batches; see api.viewcounter.
+            view_counter.record(self.kwargs['pk'])
+        return response
 
     def get_permissions(self):
         if self.request.method in ['PUT', 'PATCH', 'DELETE']:
@@ -141,13 +376,13 @@ class PropertyDetailView(generics.RetrieveUpdateDestroyAPIView):
 
     def perform_update(self, serializer):
         if self.request.user != serializer.instance.landlord:
-            logger.error(f"User {self.request.user.username} attempted unauthorized update")
+            logger.error("User %s attempted unauthorized update", self.request.user.username)
             raise serializers.ValidationError(_('You do not have permission to update this property'))
         serializer.save()
 
     def perform_destroy(self, instance):
         if self.request.user != instance.landlord:
-            logger.error(f"User {self.request.user.username} attempted unauthorized delete")
+            logger.error("User %s attempted unauthorized delete", self.request.user.username)
             raise serializers.ValidationError(_('You do not have permission to delete this property'))
         instance.delete()
 
@@ -157,189 +392,299 @@ class PropertyImageView(APIView):
     def post(self, request):
         property_id = request.data.get('property_id')
         if not property_id:
-            logger.error(f"Missing property_id for image upload by user {request.user.username}")
+            logger.error("Missing property_id for image upload by user %s", request.user.username)
             return Response({"error": "Property ID is required"}, status=status.HTTP_400_BAD_REQUEST)
         try:
             property = Property.objects.get(id=property_id)
         except Property.DoesNotExist:
-            logger.error(f"Property {property_id} not found for image upload")
+            logger.error("Property %s not found for image upload", property_id)
             return Response({"error": "Property not found"}, status=status.HTTP_404_NOT_FOUND)
         if property.landlord != request.user:
-            logger.error(f"User {request.user.username} attempted unauthorized image upload")
+            logger.error("User %s attempted unauthorized image upload", request.user.username)
             return Response({"error": "You do not have permission to add images to this property"}, status=status.HTTP_403_FORBIDDEN)
         if property.images.count() >= 3:
-            logger.error(f"Maximum images reached for property {property_id}")
+            logger.error("Maximum images reached for property %s", property_id)
             return Response({"error": "Maximum 3 images allowed per property"}, status=status.HTTP_400_BAD_REQUEST)
         serializer = PropertyImageSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save(property=property)
-            logger.info(f"Image uploaded for property {property_id} by {request.user.username}")
+            logger.info("Image uploaded for property %s by %s", property_id, request.user.username)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        logger.error(f"Image upload error: {serializer.errors}")
+        logger.error("Image upload error: %s", serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request, pk):
         try:
             image = PropertyImage.objects.get(id=pk)
         except PropertyImage.DoesNotExist:
-            logger.error(f"Image {pk} not found for deletion")
+            logger.error("Image %s not found for deletion", pk)
             return Response({"error": "Image not found"}, status=status.HTTP_404_NOT_FOUND)
         if image.property.landlord != request.user:
-            logger.error(f"User {request.user.username} attempted unauthorized image deletion")
+            logger.error("User %s attempted unauthorized image deletion", request.user.username)
             return Response({"error": "You do not have permission to delete this image"}, status=status.HTTP_403_FORBIDDEN)
         image.delete()
-        logger.info(f"Image {pk} deleted by {request.user.username}")
+        logger.info("Image %s deleted by %s", pk, request.user.username)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-class TenantListView(generics.ListAPIView):
+class UserDirectoryMixin:
+    """
+    User listings in cursor-paginated pages with the profile joined.
+
+    ``search`` matches a username or email prefix (see api.auth.search_users);
+    ``is_verified`` and ``is_landlord`` filter on the profile.
+    """
+    pagination_class = UserCursorPagination
+    boolean_filters = ('is_verified', 'is_landlord')
+
+    def get_users(self):
+        return User.objects.select_related('profile')
+
+    def get_queryset(self):
+        queryset = self.get_users()
+        params = self.request.query_params
+        for name in self.boolean_filters:
+            value = params.get(name)
+            if value is not None:
+                queryset = queryset.filter(**{f'profile__{name}': value.lower() == 'true'})
+        search = params.get('search', '').strip()
+        if search:
+            queryset = search_users(queryset, search)
+        return queryset
+
+class TenantListView(UserDirectoryMixin, generics.ListAPIView):
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
+    boolean_filters = ('is_verified',)
 
-    def get_queryset(self):
-        return User.objects.filter(profile__is_landlord=False)
+    def get_users(self):
+        return super().get_users().filter(profile__is_landlord=False)
 
 class TenantDetailView(generics.RetrieveAPIView):
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return User.objects.filter(profile__is_landlord=False)
+        return User.objects.select_related('profile').filter(profile__is_landlord=False)
 
-class FavoritePropertyView(APIView):
+class FavoritePropertyView(FieldsetMixin, APIView):
     permission_classes = [IsAuthenticated]
+    serializer_class = FavoritePropertySerializer
+    pagination_class = FavoriteCursorPagination
+
+    def get_queryset(self):
+        return trim_properties(
+            FavoriteProperty.objects.filter(user=self.request.user), self.get_fieldset(),
+            prefix='property__', keep=['id', 'user', 'property', 'created_at'],
+        )
 
     def get(self, request):
-        favorites = FavoriteProperty.objects.filter(user=request.user)
-        serializer = FavoritePropertySerializer(favorites, many=True, context={'request': request})
+        favorites = self.get_queryset()
+        # Keyset pages when the client asks for them (?page_size= / ?cursor=); otherwise everything.
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(favorites, request, view=self)
+        serializer = self.serializer_class(favorites if page is None else page, many=True, context=self.get_serializer_context())
+        if page is not None:
+            return paginator.get_paginated_response(serializer.data)
         return Response(serializer.data)
 
     def post(self, request):
         property_id = request.data.get('property')
         if not property_id:
-            logger.error(f"Missing property_id for user {request.user.username}")
+            logger.error("Missing property_id for user %s", request.user.username)
             return Response({'error': 'Property ID required'}, status=status.HTTP_400_BAD_REQUEST)
         if FavoriteProperty.objects.filter(user=request.user, property_id=property_id).exists():
-            logger.info(f"Property {property_id} already favorited by {request.user.username}")
+            logger.info("Property %s already favorited by %s", property_id, request.user.username, extra=SAMPLED)
             return Response({'message': 'Already favorited'}, status=status.HTTP_200_OK)
         data = {'property': property_id}
         serializer = FavoritePropertySerializer(data=data, context={'request': request})
         if serializer.is_valid():
             serializer.save(user=request.user)
-            logger.info(f"Favorite added by {request.user.username} for property {property_id}")
+            logger.info("Favorite added by %s for property %s", request.user.username, property_id, extra=SAMPLED)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        logger.error(f"Favorite creation error: {serializer.errors}")
+        logger.error("Favorite creation error: %s", serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request):
         property_id = request.data.get('property')
         if not property_id:
-            logger.error(f"Missing property_id for delete by user {request.user.username}")
+            logger.error("Missing property_id for delete by user %s", request.user.username)
             return Response({'error': 'Property ID required'}, status=status.HTTP_400_BAD_REQUEST)
         favorite = FavoriteProperty.objects.filter(user=request.user, property_id=property_id).first()
         if favorite:
             favorite.delete()
-            logger.info(f"Favorite removed by {request.user.username} for property {property_id}")
+            logger.info("Favorite removed by %s for property %s", request.user.username, property_id, extra=SAMPLED)
             return Response(status=status.HTTP_204_NO_CONTENT)
-        logger.error(f"Favorite not found for user {request.user.username}, property {property_id}")
+        logger.error("Favorite not found for user %s, property %s", request.user.username, property_id)
         return Response({'error': 'Favorite not found'}, status=status.HTTP_404_NOT_FOUND)
 
+class FavoriteIdsView(APIView):
+    """The user's favorite property ids, revalidated with If-None-Match against a version token."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        version = make_etag(*favorites_state(request.user))
+        not_modified = get_conditional_response(request._request, etag=version)
+        if not_modified is not None:
+            not_modified['ETag'] = version
+            return not_modified
+        ids = list(
+            FavoriteProperty.objects.filter(user=request.user).order_by('property_id').values_list('property_id', flat=True)
+        )
+        return Response({'ids': ids, 'version': version.strip('"')}, headers={'ETag': version})
+
+class FavoriteBatchView(APIView):
+    """Add and remove many favorites in one request: {"add": [ids], "remove": [ids]}."""
+    permission_classes = [IsAuthenticated]
+    max_batch = 500
+
+    def parse_ids(self, value):
+        if value in (None, ''):
+            return []
+        if not isinstance(value, list) or len(value) > self.max_batch:
+            raise serializers.ValidationError(f'Expected a list of at most {self.max_batch} property ids')
+        try:
+            return sorted({int(item) for item in value})
+        except (TypeError, ValueError):
+            raise serializers.ValidationError('Property ids must be integers')
+
+    def post(self, request):
+        try:
+            add = self.parse_ids(request.data.get('add'))
+            remove = self.parse_ids(request.data.get('remove'))
+        except serializers.ValidationError as e:
+            return Response({'error': e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        user = request.user
+        favorites = FavoriteProperty.objects.filter(user=user)
+        with transaction.atomic():
+            existing = set(Property.objects.filter(pk__in=add).values_list('pk', flat=True))
+            already = set(favorites.filter(property_id__in=add).values_list('property_id', flat=True))
+            added = sorted(existing - already)
+            FavoriteProperty.objects.bulk_create(
+                [FavoriteProperty(user=user, property_id=pk) for pk in added], ignore_conflicts=True,
+            )
+            removed = sorted(favorites.filter(property_id__in=remove).values_list('property_id', flat=True))
+            # post_delete (api.signals) decrements the counter for each removed row.
+            favorites.filter(property_id__in=removed).delete()
+            adjust_stats(user.pk, favorites=len(added))
+        logger.info("Favorites batch by %s: %s added, %s removed", user.username, len(added), len(removed), extra=SAMPLED)
+        return Response({
+            'added': added,
+            'removed': removed,
+            'invalid': sorted(set(add) - existing),
+            'version': make_etag(*favorites_state(user)).strip('"'),
+        })
+
 class ContactMessageAPIView(APIView):
     permission_classes = [AllowAny]
 
     def post(self, request):
         serializer = ContactMessageSerializer(data=request.data)
         if serializer.is_valid():
-            contact_message = serializer.save()
-            subject = _('New Contact Message')
-            message = f"""
-            From: {contact_message.tenant_name} ({contact_message.tenant_email})
-            Property ID: {contact_message.property.id}
-            Message: {contact_message.message}
-            """
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                ['info@lehae.com'],
-                fail_silently=True
-            )
-            logger.info(f"Contact message sent by {contact_message.tenant_name}")
+            # The notification is queued with the message and sent by `manage.py send_outbox`.
+            with transaction.atomic():
+                contact_message = serializer.save()
+                enqueue_contact_notification(contact_message)
+            logger.info("Contact message sent by %s", contact_message.tenant_name)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        logger.error(f"Contact message error: {serializer.errors}")
+        logger.error("Contact message error: %s", serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class ContactMessageReadView(APIView):
+    """The property's landlord marks a message read (POST) or unread again (DELETE)."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        return self.mark(request, pk, True)
+
+    def delete(self, request, pk):
+        return self.mark(request, pk, False)
+
+    def mark(self, request, pk, is_read):
+        message = get_object_or_404(ContactMessage, pk=pk, property__landlord=request.user)
+        if message.is_read != is_read:
+            message.is_read = is_read
+            # post_save (api.signals) moves the landlord's unread_messages counter.
+            message.save(update_fields=['is_read'])
+        return Response(ContactMessageSerializer(message).data)
+
 class DashboardView(APIView):
     permission_classes = [IsAuthenticated]
 
+    STAT_CARDS = {
+        'landlord': (
+            ('properties', 'total_properties', 'Total Properties', 'bg-blue-100', 'house'),
+            ('vacant', 'vacant_properties', 'Vacant Properties', 'bg-green-100', 'house-vacant'),
+            ('occupied', 'occupied_properties', 'Occupied Properties', 'bg-yellow-100', 'house-occupied'),
+            ('inactive', 'inactive_properties', 'Inactive Properties', 'bg-gray-100', 'house-inactive'),
+            ('messages', 'unread_messages', 'Unread Messages', 'bg-purple-100', 'envelope'),
+            ('views', 'property_views', 'Property Views', 'bg-indigo-100', 'eye'),
+        ),
+        'tenant': (
+            ('favorites', 'favorites', 'Favorite Properties', 'bg-red-100', 'heart'),
+        ),
+    }
+
+    def get_stats(self, user_stats, is_landlord):
+        return [
+            {
+                'id': stat_id,
+                'label': label,
+                'value': getattr(user_stats, counter),
+                'trend': trend(user_stats, counter),
+                'iconBg': icon_bg,
+                'icon': icon
+            } for stat_id, counter, label, icon_bg, icon in self.STAT_CARDS['landlord' if is_landlord else 'tenant']
+        ]
+
+    def get_recent_activity(self, user, is_landlord):
+        if is_landlord:
+            recent_activity = ContactMessage.objects.filter(property__landlord=user)
+        else:
+            recent_activity = ContactMessage.objects.filter(tenant_email=user.email)
+        return recent_activity.order_by('-created_at')[:5]
+
+    def activity_row(self, msg):
+        return {
+            'id': msg.id,
+            'is_read': msg.is_read,
+            'title': f"Message from {msg.tenant_name}",
+            'description': msg.message[:50] + ('...' if len(msg.message) > 50 else ''),
+            'time': msg.created_at.strftime('%Y-%m-%d %H:%M'),
+            'iconBg': 'bg-purple-100',
+            'icon': 'envelope'
+        }
+
     def get(self, request):
         try:
             user = request.user
-            UserProfile.objects.get_or_create(user=user, defaults={'is_landlord': False})
-            stats = []
-            if user.profile.is_landlord:
-                properties = Property.objects.filter(landlord=user)
-                stats.append({
-                    'id': 'properties',
-                    'label': 'Total Properties',
-                    'value': properties.count(),
-                    'trend': '0',
-                    'iconBg': 'bg-blue-100',
-                    'icon': 'house'
-                })
-                stats.append({
-                    'id': 'vacant',
-                    'label': 'Vacant Properties',
-                    'value': properties.filter(status='vacant').count(),
-                    'trend': '0',
-                    'iconBg': 'bg-green-100',
-                    'icon': 'house-vacant'
-                })
-            else:
-                favorites = FavoriteProperty.objects.filter(user=request.user)
-                stats.append({
-                    'id': 'favorites',
-                    'label': 'Favorite Properties',
-                    'value': favorites.count(),
-                    'trend': '0',
-                    'iconBg': 'bg-red-100',
-                    'icon': 'heart'
-                })
-            recent_activity = ContactMessage.objects.filter(property__landlord=user) if user.profile.is_landlord else ContactMessage.objects.filter(tenant_email=user.email)
-            recent_activity_data = [
-                {
-                    'id': msg.id,
-                    'title': f"Message from {msg.tenant_name}",
-                    'description': msg.message[:50] + ('...' if len(msg.message) > 50 else ''),
-                    'time': msg.created_at.strftime('%Y-%m-%d %H:%M'),
-                    'iconBg': 'bg-purple-100',
-                    'icon': 'envelope'
-                } for msg in recent_activity[:5]
-            ]
+            try:
+                profile = user.profile
+            except UserProfile.DoesNotExist:
+                profile = UserProfile.objects.create(user=user, is_landlord=False)
             return Response({
-                'stats': stats,
-                'recentActivity': recent_activity_data,
+                'stats': self.get_stats(get_user_stats(user), profile.is_landlord),
+                'recentActivity': [self.activity_row(msg) for msg in self.get_recent_activity(user, profile.is_landlord)],
                 'upcomingTasks': []
             })
         except Exception as e:
-            logger.error(f"Dashboard error for user {request.user.username}: {str(e)}")
+            logger.error("Dashboard error for user %s: %s", request.user.username, e)
             return Response({'error': 'Internal server error'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class UserListView(generics.ListCreateAPIView):
-    queryset = User.objects.all()
+class UserListView(UserDirectoryMixin, generics.ListCreateAPIView):
     serializer_class = UserSerializer
     permission_classes = [IsAdminUser]
 
 class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = User.objects.all()
+    queryset = User.objects.select_related('profile')
     serializer_class = UserSerializer
     permission_classes = [IsAdminUser]
 
     def perform_update(self, serializer):
         serializer.save()
-        logger.info(f"User {self.get_object().username} updated by admin {self.request.user.username}")
+        logger.info("User %s updated by admin %s", self.get_object().username, self.request.user.username)
 
     def perform_destroy(self, instance):
-        logger.info(f"User {instance.username} deleted by admin {self.request.user.username}")
+        logger.info("User %s deleted by admin %s", instance.username, self.request.user.username)
         instance.delete()
 
 class UserVerificationView(APIView):
@@ -350,24 +695,59 @@ class UserVerificationView(APIView):
         serializer = UserSerializer(user, data=request.data, partial=True, context={'request': request})
         if serializer.is_valid():
             serializer.save()
-            logger.info(f"User {user.username} verified by admin {request.user.username}")
+            logger.info("User %s verified by admin %s", user.username, request.user.username)
             return Response(serializer.data, status=status.HTTP_200_OK)
-        logger.error(f"User verification error for user {pk}: {serializer.errors}")
+        logger.error("User verification error for user %s: %s", pk, serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class ReportView(APIView):
+class MetricsView(APIView):
+    """
+    Per-endpoint latency percentiles merged across workers (see api.metrics),
+    plus this worker's fragment cache counters; DELETE resets the percentiles.
+    ``shared`` is false when the metrics cache is per process, so the figures
+    cover only the worker that answered.
+    """
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        properties = Property.objects.all()
-        most_viewed = properties.order_by('-updated_at')[:10]  # Placeholder: add 'views' field later
-        data = {
-            'most_viewed': PropertySerializer(most_viewed, many=True, context={'request': request}).data,
-            'total_properties': properties.count(),
-            'total_users': User.objects.count(),
-        }
-        return Response(data)
+        histograms, workers = metrics_registry.collect()
+        endpoints = [{'endpoint': endpoint, **histogram.summary()} for endpoint, histogram in histograms.items()]
+        endpoints.sort(key=lambda row: row['count'] * row['mean_ms'], reverse=True)
+        return Response({
+            'workers': workers, 'shared': metrics_registry.shared(),
+            'endpoints': endpoints, 'fragment_cache': fragment_cache.stats(),
+        })
+
+    def delete(self, request):
+        metrics_registry.reset()
+        logger.info("Request metrics reset by %s", request.user.username)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
-# Media serving view
-def serve_media(request, path):
-    return serve(request, path, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+class ReportView(APIView):
+    permission_classes = [IsAdminUser]
+    max_history = 365
+
+    def get(self, request):
+        fieldset = parse_fieldset(request)  # Applies to most_viewed
+        snapshot = latest_snapshot()
+        view_counts = dict(snapshot.most_viewed)
+        properties = trim_properties(Property.objects.all(), fieldset).in_bulk(view_counts)
+        most_viewed = [properties[pk] for pk in view_counts if pk in properties]
+        most_viewed_data = PropertySerializer(most_viewed, many=True, context={'request': request, 'fieldset': fieldset}).data
+        for row in most_viewed_data:
+            row['views'] = view_counts[row['id']]
+        data = ReportSnapshotSerializer(snapshot).data
+        data.update({
+            'stale': snapshot_is_stale(snapshot),
+            'most_viewed': most_viewed_data,
+            'districts': DistrictReportSerializer(snapshot.districts.all(), many=True).data,
+            'registrations': [{'date': day, 'count': count} for day, count in snapshot.registrations],
+        })
+        try:
+            history = min(int(request.query_params.get('history', 0)), self.max_history)
+        except ValueError:
+            return Response({'error': 'history must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if history > 0:
+            snapshots = ReportSnapshot.objects.order_by('-created_at')[:history]
+            data['history'] = ReportSnapshotSerializer(snapshots, many=True).data
+        return Response(data)
\ No newline at end of file
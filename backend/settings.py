@@ -7,7 +7,7 @@ Generated by 'django-admin startproject' using Django 4.2.16.
 from pathlib import Path
 import os
 from datetime import timedelta
-from decouple import config
+from decouple import Csv, config
 import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -32,12 +32,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.replicas.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -70,6 +72,44 @@ DATABASES = {
     )
 }
 
+# Read replicas (api.replicas): comma-separated DATABASE_REPLICA_URLS. GET requests
+# read listings, favorites and reports from a replica; a client that writes reads
+# from the primary for REPLICA_PIN_SECONDS. Locally, two SQLite files will do:
+# DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3 and `python manage.py sync_sqlite_replica`.
+# Pins for token clients live in the REPLICA_PIN_CACHE_ALIAS cache, which must be
+# shared by all workers: with replicas, CACHE_BACKEND has to be 'db' (or 'file'
+# on a single host); locmem is refused at startup.
+DATABASE_REPLICAS = []
+for index, url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv()), start=1):
+    DATABASES[f'replica{index}'] = dict(dj_database_url.parse(url), TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(f'replica{index}')
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+
+# Cache
+# CACHE_BACKEND selects the store: 'locmem' (per process), 'file' or 'db'
+# (run `python manage.py createcachetable` first). Cached responses stay
+# consistent across workers with any of them: see api.cache.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'lehae'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'cache')),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'api_cache'),
+}
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': config('CACHE_LOCATION', default=CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=5000, cast=int)},
+    }
+}
+PROPERTY_CACHE_ALIAS = 'default'
+REPLICA_PIN_CACHE_ALIAS = 'default'
+PROPERTY_CACHE_TIMEOUT = config('PROPERTY_CACHE_TIMEOUT', default=300, cast=int)
+# Per-process LRU of pre-rendered property JSON (see api.fragments); 0 turns it off.
+PROPERTY_FRAGMENT_CACHE_BYTES = config('PROPERTY_FRAGMENT_CACHE_BYTES', default=32 * 1024 * 1024, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -99,13 +139,50 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Media serving (api.media). MEDIA_OFFLOAD hands file bodies to the front-end
+# server: 'x-accel-redirect' (nginx, internal location at MEDIA_ACCEL_PREFIX
+# aliased to MEDIA_ROOT) or 'x-sendfile' (Apache/lighttpd). Empty streams
+# the file from the worker with sendfile(2).
+MEDIA_OFFLOAD = config('MEDIA_OFFLOAD', default='')
+MEDIA_ACCEL_PREFIX = config('MEDIA_ACCEL_PREFIX', default='/protected-media/')
+MEDIA_CACHE_MAX_AGE = config('MEDIA_CACHE_MAX_AGE', default=3600, cast=int)
+
+# Image variants (api.imaging): generated on a background thread pool after upload.
+IMAGE_VARIANTS_ASYNC = config('IMAGE_VARIANTS_ASYNC', default=True, cast=bool)
+IMAGE_VARIANT_WORKERS = config('IMAGE_VARIANT_WORKERS', default=2, cast=int)
+
+# Admin reports (api.reports): snapshots built by `python manage.py build_report_snapshot --loop`.
+REPORT_SNAPSHOT_INTERVAL = config('REPORT_SNAPSHOT_INTERVAL', default=900, cast=int)
+REPORT_SNAPSHOT_MAX_AGE = config('REPORT_SNAPSHOT_MAX_AGE', default=3600, cast=int)
+REPORT_SNAPSHOT_RETENTION_DAYS = config('REPORT_SNAPSHOT_RETENTION_DAYS', default=90, cast=int)
+REPORT_REGISTRATION_DAYS = 30
+REPORT_MOST_VIEWED_DAYS = 30
+
+# Bulk import (api.bulk): rows per bulk_create transaction, and how many row errors to report.
+BULK_IMPORT_CHUNK_SIZE = config('BULK_IMPORT_CHUNK_SIZE', default=500, cast=int)
+BULK_IMPORT_MAX_ERRORS = 1000
+
+# Property view counting (api.viewcounter): views are buffered per worker and
+# upserted every VIEW_COUNTER_FLUSH_INTERVAL seconds (0 disables the flush thread).
+VIEW_COUNTER_FLUSH_INTERVAL = config('VIEW_COUNTER_FLUSH_INTERVAL', default=10, cast=int)
+VIEW_COUNTER_MAX_PENDING = 5000
+
+# Async read views (api.async_views) for ASGI deployments. backend/asgi.py turns
+# this on; gunicorn.conf.py picks the matching worker class from SERVER_MODE.
+# Keep CONN_MAX_AGE at 0 under ASGI: async ORM calls run on per-request threads.
+ASYNC_READ_VIEWS = config('ASYNC_READ_VIEWS', default=False, cast=bool)
+
 # Default auto field
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.auth.CachedJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.fragments.FragmentJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -126,13 +203,23 @@ CORS_ALLOW_HEADERS = [
 ]
 
 # Email
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Contact notifications go through the outbox (api.outbox) and are delivered by
+# `python manage.py send_outbox --loop`. For local testing point the SMTP
+# settings at a stand-in, e.g. `python -m aiosmtpd -n -l localhost:1025` with
+# EMAIL_HOST=localhost EMAIL_PORT=1025 EMAIL_USE_TLS=False.
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
 EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
 EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='your-email@example.com')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default=None)
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=30, cast=int)
+CONTACT_FALLBACK_EMAIL = config('CONTACT_FALLBACK_EMAIL', default='info@lehae.com')
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=50, cast=int)
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=8, cast=int)
+OUTBOX_RETRY_BASE_SECONDS = config('OUTBOX_RETRY_BASE_SECONDS', default=30, cast=int)
+OUTBOX_LEASE_SECONDS = 300
 
 # JWT
 SIMPLE_JWT = {
@@ -141,54 +228,92 @@ SIMPLE_JWT = {
 }
 
 # Authentication
+# CachedJWTAuthentication keeps user/profile flags in a per-process LRU for
+# AUTH_USER_CACHE_TTL seconds (0 disables it); saves in this process evict at once.
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=60, cast=int)
+AUTH_USER_CACHE_SIZE = 10000
+# EmailBackend extends ModelBackend (username or email, case-insensitive); a
+# second ModelBackend would only repeat the lookup and the password hash.
 AUTHENTICATION_BACKENDS = [
     'api.auth.EmailBackend',
-    'django.contrib.auth.backends.ModelBackend',
 ]
 
-# Logging
+# Logging (api.log): request threads only enqueue records; a listener thread per
+# process writes them as JSON lines to LOG_FILE, rotated at LOG_MAX_BYTES or every
+# LOG_ROTATE_SECONDS, keeping LOG_BACKUP_COUNT old files. High-volume info events
+# (logged with extra=SAMPLED) are kept at LOG_SAMPLE_RATE.
 LOG_DIR = os.path.join(BASE_DIR, 'logs')
 os.makedirs(LOG_DIR, exist_ok=True)
-LOG_FILE = os.path.join(LOG_DIR, 'django.log')
+LOG_FILE = os.path.join(LOG_DIR, 'app.jsonl')
+SLOW_REQUEST_LOG_FILE = os.path.join(LOG_DIR, 'slow_requests.jsonl')
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+LOG_MAX_BYTES = config('LOG_MAX_BYTES', default=50 * 1024 * 1024, cast=int)
+LOG_ROTATE_SECONDS = config('LOG_ROTATE_SECONDS', default=24 * 60 * 60, cast=int)
+LOG_BACKUP_COUNT = config('LOG_BACKUP_COUNT', default=14, cast=int)
+LOG_QUEUE_SIZE = config('LOG_QUEUE_SIZE', default=10000, cast=int)
+LOG_SAMPLE_RATE = config('LOG_SAMPLE_RATE', default=0.1, cast=float)
+
+# Request metrics (api.metrics): per-endpoint latency histograms at /api/metrics/
+# (admins), Server-Timing headers when METRICS_SERVER_TIMING is on, and requests
+# slower than METRICS_SLOW_REQUEST_MS logged with their SQL to SLOW_REQUEST_LOG_FILE.
+METRICS_SERVER_TIMING = config('METRICS_SERVER_TIMING', default=DEBUG, cast=bool)
+METRICS_SLOW_REQUEST_MS = config('METRICS_SLOW_REQUEST_MS', default=500, cast=int)
+# Workers publish their histograms to METRICS_CACHE_ALIAS; the merge only spans
+# workers when that cache is shared ('db' or 'file' CACHE_BACKEND, not locmem).
+METRICS_CACHE_ALIAS = 'default'
+METRICS_PUBLISH_INTERVAL = 10
+METRICS_RETENTION = 3600
 
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
-    'formatters': {
-        'verbose': {
-            'format': '{levelname} [{asctime}] {module} {message}',
-            'style': '{',
+    'filters': {
+        'sample': {
+            '()': 'api.log.SampleFilter',
+            'rate': LOG_SAMPLE_RATE,
         },
     },
     'handlers': {
-        'file': {
-            'level': 'INFO',
-            'class': 'logging.FileHandler',
+        'background': {
+            '()': 'api.log.BackgroundHandler',
+            'filters': ['sample'],
             'filename': LOG_FILE,
-            'formatter': 'verbose',
+            'max_bytes': LOG_MAX_BYTES,
+            'interval': LOG_ROTATE_SECONDS,
+            'backup_count': LOG_BACKUP_COUNT,
+            'queue_size': LOG_QUEUE_SIZE,
         },
-        'console': {
-            'level': 'DEBUG',
-            'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
+        'slow_requests': {
+            '()': 'api.log.BackgroundHandler',
+            'level': 'WARNING',
+            'filename': SLOW_REQUEST_LOG_FILE,
+            'max_bytes': LOG_MAX_BYTES,
+            'interval': LOG_ROTATE_SECONDS,
+            'backup_count': LOG_BACKUP_COUNT,
+            'console': False,
         },
     },
     'loggers': {
         'django': {
-            'handlers': ['file', 'console'],
+            'handlers': ['background'],
             'level': 'INFO',
             'propagate': True,
         },
         'api': {
-            'handlers': ['file', 'console'],
-            'level': 'DEBUG',
+            'handlers': ['background'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+        'api.slow_requests': {
+            'handlers': ['slow_requests', 'background'],
+            'level': 'WARNING',
             'propagate': False,
         },
     },
 }
 
 # Security for Production
-SECURE_SSL_REDIRECT = True
+SECURE_SSL_REDIRECT = config('SECURE_SSL_REDIRECT', default=True, cast=bool)
 SESSION_COOKIE_SECURE = True
 CSRF_COOKIE_SECURE = True
 SECURE_HSTS_SECONDS = 31536000  # 1 year
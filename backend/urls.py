@@ -1,7 +1,7 @@
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from api.views import serve_media  # Ensure this import matches your app structure
+from api.media import serve_media
 
 urlpatterns = [
     path('api/', include('api.urls')),
@@ -0,0 +1,23 @@
+# Loaded automatically by gunicorn from the working directory.
+#
+# SERVER_MODE=wsgi (default) runs backend.wsgi on threaded sync workers.
+# SERVER_MODE=asgi runs backend.asgi on uvicorn workers: the async read views
+# (api.async_views) keep slow clients on the event loop instead of a thread.
+import os
+
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi')
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'backend.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'backend.wsgi:application'
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+
+def worker_exit(server, worker):
+    # Write buffered property views before the worker process goes away.
+    from api.viewcounter import view_counter
+
+    view_counter.shutdown()